@@ -7,6 +7,8 @@ class Config:
 
     # --- [相对] 子路径配置 ---
     REL_ATTACHMENT_DIR = r'【ATTACHMENT】'
+    REL_DAILY_NOTE_DIR = r'【DAILYNOTE】'  # 相对于附件目录
+    REL_TEMPLATES_LIB_DIR = r'「」InfoBox/「InfoManage」Updating OBlifeos/【Templates】'
 
     # 模版文件 (相对于根目录)
     REL_TEMPLATE_FILE = r'DayPlanTemplate.md'
@@ -16,7 +18,7 @@ class Config:
 
     # 1. 日记目录
     # 拼接: Root / Attachment / DailyNote
-    DAILY_NOTE_DIR = os.path.join(VAULT_ROOT, REL_ATTACHMENT_DIR, r'【DAILYNOTE】')
+    DAILY_NOTE_DIR = os.path.join(VAULT_ROOT, REL_ATTACHMENT_DIR, REL_DAILY_NOTE_DIR)
 
     # 2. 模版文件
     TEMPLATE_FILE = os.path.join(VAULT_ROOT, REL_TEMPLATE_FILE)
@@ -30,14 +32,14 @@ class Config:
     # --- [软排除] 仅归档，不同步 (NEW) ---
     # 系统会索引这些目录，允许任务归档进去，但不会主动扫描里面的任务同步回日记
     SYNC_IGNORE_DIRS = [
-        os.path.join(VAULT_ROOT, r'「」InfoBox/「InfoManage」Updating OBlifeos/【Templates】')
+        os.path.join(VAULT_ROOT, REL_TEMPLATES_LIB_DIR)
     ]
 
     # --- [NEW] 强制聚合/黑洞目录 ---
     # 定义：在此目录下的所有子文件夹，即使包含 Main 标签文件，也会被忽略项目属性。
     # 结果：其内部产生的所有流浪任务，都会强制向上冒泡，归档到此目录本身的 Main 文件中。
     FORCED_AGGREGATION_DIRS = [
-        os.path.join(VAULT_ROOT, r'「」InfoBox/「InfoManage」Updating OBlifeos/【Templates】')
+        os.path.join(VAULT_ROOT, REL_TEMPLATES_LIB_DIR)
     ]
 
     # 兼容旧代码的别名
@@ -47,6 +49,70 @@ class Config:
     STATE_FILE = os.path.join(DAILY_NOTE_DIR, ".sync_state.json")
     LOCK_FILE = os.path.join(DAILY_NOTE_DIR, ".fusion_sync_lock")
 
+    # --- [观测] 周期耗时与 I/O 统计 ---
+    METRICS_ENABLED = True
+    METRICS_HISTORY = 120  # 滚动窗口 (周期数)
+    METRICS_FILE = os.path.join(DAILY_NOTE_DIR, ".sync_metrics.json")
+    METRICS_PROM_FILE = os.path.join(DAILY_NOTE_DIR, ".sync_metrics.prom")  # 置空则不写 Prometheus textfile
+
+    # --- [诊断] 按需 Profile (kill -USR1 <pid> 或创建控制文件) ---
+    PROFILE_TICKS = 5  # 每次触发采样的周期数
+    PROFILE_CONTROL_FILE = os.path.join(DAILY_NOTE_DIR, ".sync_profile_request")  # 文件内容可写周期数
+    PROFILE_TOP_N = 40
+    PROFILE_TRACEMALLOC_FRAMES = 1
+
+    # --- [诊断] 周期录制 (离线重放: python scripts/replay.py <会话目录>；daemon --record DIR 可临时指定) ---
+    RECORD_DIR = ''  # 非空则把守护进程每个周期的输入 / 输出录制到该目录下的新会话 (有额外开销)
+
+    # --- [持久化] 写入模式 ---
+    # strict: 每个文件 fsync 后替换 | batched: 周期末统一 fsync + 替换 + 目录 fsync | relaxed: 不 fsync (tmpfs/CI)
+    WRITE_DURABILITY = 'strict'
+
+    # --- [防护] 写入循环检测 ---
+    WRITE_GUARD_ENABLED = True
+    WRITE_GUARD_WINDOW = 600  # 统计窗口 (秒)
+    WRITE_GUARD_MAX_WRITES = 12  # 窗口内 (无外部修改时) 单文件最多被改写的周期数
+    WRITE_GUARD_QUARANTINE_SECONDS = 1800  # 隔离时长，期间拒绝自动改写 (外部修改会提前解除)
+
+    # --- [调度] 日期分层 (hot: 今天 + 最近编辑 | warm: 最近几天 | cold: 更早) ---
+    SCHEDULER_ENABLED = True  # False = 每个周期处理全部日期
+    SCHEDULER_HOT_SECONDS = 600  # 日记在此时间内被编辑过即视为 hot，每个周期处理
+    SCHEDULER_WARM_DAYS = 7
+    SCHEDULER_WARM_INTERVAL = 60  # warm 日期的轮询间隔 (秒)
+    SCHEDULER_COLD_INTERVAL = 3600  # cold 日期的慢速轮询间隔 (秒)
+    SCHEDULER_COLD_BATCH = 5  # 每个周期最多轮询的 cold 日期数 (文件有变化的日期不受此限)
+
+    # --- [启动] 快速首次同步 ---
+    FAST_START = True  # 启动时先只同步今天 (及其引用的源文件) 并报告 Ready，其余日期转入后台补扫
+    BACKFILL_DATES_PER_TICK = 10  # 补扫期间每个周期最多处理的历史日期数
+
+    # --- [批处理] CLI 单次同步 / 历史补扫 (python main.py sync|backfill) ---
+    BATCH_SIZE = 20  # 每提交一次暂存写入的日期数
+
+    # --- [I/O] 源文件预读 (网络同步盘 / 冷缓存时读取延迟占主导) ---
+    IO_WORKERS = 4  # 扫描源文件时并发读取 + 解码的线程数；<= 1 为逐个读取
+
+    # --- [并行] 互不相交的日期分组多进程处理 (需 fork；backfill --jobs 可临时覆盖) ---
+    PARALLEL_DATES = 0  # 子进程数；<= 1 为逐个处理
+    PARALLEL_MIN_DATES = 8  # 一次待处理的日期少于此数时不启用 (进程池开销大于收益)
+
+    # --- [重启] 新旧实例热交接 (Unix socket，位于锁文件旁) ---
+    HANDOFF_ENABLED = True
+    HANDOFF_TIMEOUT = 20  # 新实例等待旧实例走完当前周期的最长时间 (秒)
+
+    # --- [启动] 热缓存快照 (退出时与周期性写入，冷启动时按 stat 校验后复用) ---
+    SNAPSHOT_ENABLED = True
+    SNAPSHOT_FILE = os.path.join(DAILY_NOTE_DIR, ".sync_snapshot.pickle")
+    SNAPSHOT_INTERVAL = 600  # 秒
+
+    # --- [多仓库] 单进程服务多个仓库 (为空则只服务 VAULT_ROOT) ---
+    # 元素为仓库路径，或 {'root': 路径, 'name': 日志显示名, <其他 Config 项>: 该仓库的覆盖值}
+    VAULTS = []
+
+    # --- [异步] asyncio 守护进程 (python main.py daemon --async；多仓库模式下不生效) ---
+    ASYNC_DAEMON = False
+    WATCH_INTERVAL = 1.0  # 轮询日记目录 mtime 的间隔 (秒)，外部编辑触发该日期的防抖同步
+
     # --- [战略] 时间门控 ---
     SYNC_START_DATE = "2025-12-08"
 
@@ -55,7 +121,34 @@ class Config:
     TYPING_COOLDOWN_SECONDS = 6
     IMAGE_PARAM_SUFFIX = "|L|200"
     DEBUG_MODE = True
+    # 日志由后台线程写出 (False = 直接 print，便于调试)
+    LOG_ASYNC = True
 
     # --- 范围限制 ---
     DAILY_NOTE_SECTIONS = ['# Day planner', '# Journey']
-    SOURCE_FILE_CALLOUTS = ['> [!note] Tasks', '> [!note]- Tasks', '> [!note]+ Tasks']
\ No newline at end of file
+    SOURCE_FILE_CALLOUTS = ['> [!note] Tasks', '> [!note]- Tasks', '> [!note]+ Tasks']
+
+    @classmethod
+    def use_vault(cls, vault_root):
+        """
+        [切换仓库] 指向另一个仓库根目录 (基准测试 / 仓库副本)，并重新派生上方所有绝对路径。
+        新增派生路径时，需同时在这里补上。
+        """
+        vault_root = os.path.abspath(vault_root)
+        cls.VAULT_ROOT = vault_root
+        cls.ROOT_DIR = vault_root
+        cls.DAILY_NOTE_DIR = os.path.join(vault_root, cls.REL_ATTACHMENT_DIR, cls.REL_DAILY_NOTE_DIR)
+        cls.TEMPLATE_FILE = os.path.join(vault_root, cls.REL_TEMPLATE_FILE)
+        cls.EXCLUDE_DIRS = [
+            os.path.join(vault_root, cls.REL_ATTACHMENT_DIR),
+            os.path.join(vault_root, r'.trash'),
+        ]
+        cls.SYNC_IGNORE_DIRS = [os.path.join(vault_root, cls.REL_TEMPLATES_LIB_DIR)]
+        cls.FORCED_AGGREGATION_DIRS = [os.path.join(vault_root, cls.REL_TEMPLATES_LIB_DIR)]
+        cls.STATE_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".sync_state.json")
+        cls.LOCK_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".fusion_sync_lock")
+        cls.METRICS_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".sync_metrics.json")
+        if cls.METRICS_PROM_FILE:
+            cls.METRICS_PROM_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".sync_metrics.prom")
+        cls.PROFILE_CONTROL_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".sync_profile_request")
+        cls.SNAPSHOT_FILE = os.path.join(cls.DAILY_NOTE_DIR, ".sync_snapshot.pickle")
\ No newline at end of file
@@ -2,15 +2,168 @@ import time
 import signal
 import os
 import sys
+import argparse
+import datetime
+import json
 
 # Add src to sys.path to allow importing dailynotes package
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from dailynotes.manager import FusionManager
+from dailynotes.async_manager import AsyncFusionManager
 from config import Config
 from dailynotes.utils import ProcessLock, Logger
+from dailynotes.handoff import Handoff
+from dailynotes.multi_vault import MultiVaultManager, VaultContext
 
-if __name__ == "__main__":
-    app = FusionManager()
+
+def try_handoff(app):
+    """[热交接] 请旧实例在周期间隙移交热缓存并释放锁，成功返回 True"""
+    Logger.info("🤝 请求原进程热交接...")
+    warm = Handoff.request()
+    if warm is None: return False
+    # 旧实例发送前已释放锁，这里只需短暂重试
+    for _ in range(40):
+        if ProcessLock.acquire(): break
+        time.sleep(0.05)
+    else:
+        Logger.info("⚠️  交接数据已收到，但锁仍被占用")
+        return False
+    if app.import_warm_state(warm):
+        app.warm = True
+        Logger.info("✅ 热交接完成，沿用原进程的索引与解析缓存。")
+    else:
+        Logger.info("✅ 已接管锁 (热缓存版本不匹配，冷启动)。")
+    return True
+
+
+def take_over_lock(app):
+    """获取当前仓库 (Config) 的锁：热交接优先，否则终止旧进程后强制接管。失败返回 False"""
+    # 第一次尝试获取锁
+    if ProcessLock.acquire() or try_handoff(app): return True
+
+    Logger.info(f"⚠️  检测到锁文件 ({Config.LOCK_FILE})")
+    old_pid = ProcessLock.read_pid()
+    
+    wait_seconds = 3
+    Logger.info(f"⏳ 等待原进程 ({old_pid if old_pid else 'Unknown'}) 执行完当前周期 ({wait_seconds}s)...")
+    time.sleep(wait_seconds)
+    
+    if old_pid:
+        Logger.info(f"🛑 发送终止信号 (SIGTERM) 给 PID: {old_pid}...")
+        try:
+            os.kill(old_pid, signal.SIGTERM)
+            
+            # [优雅关闭] 给它 3 秒时间保存状态并退出
+            for _ in range(30): # 30 * 0.1s = 3s
+                time.sleep(0.1)
+                try:
+                    os.kill(old_pid, 0) # 检查是否存活
+                except OSError:
+                    Logger.info("   原进程已优雅退出。")
+                    break
+            else:
+                Logger.info(f"💀 原进程未响应，强制关闭 (SIGKILL) PID: {old_pid}...")
+                os.kill(old_pid, signal.SIGKILL)
+        except ProcessLookupError:
+            Logger.info("   原进程已不存在。")
+        except Exception as e:
+            Logger.error_once("shutdown_fail", f"   关闭失败: {e}")
+    else:
+        Logger.info("⚠️  无法读取旧进程PID（可能是旧版代码遗留），尝试直接清理锁文件...")
+
+    # 清理可能残留的锁文件（虽然 os.kill 后系统可能会释放，但为了保险）
+    # 注意：这里主要依赖第二次 acquire 重新抢占
+    
+    Logger.info("🔄 正在重启服务...")
+    time.sleep(1) # 给系统一点回收资源的时间
+
+    # 第二次尝试获取锁
+    if not ProcessLock.acquire():
+        Logger.error_once("lock_fail", "❌ 无法获取锁，强制接管失败。请手动检查。")
+        return False
+    Logger.info("✅ 成功接管锁，服务已启动。")
+    return True
+
+
+def run_multi_vault():
+    """[Multi-Vault] Config.VAULTS 非空时：单进程服务多个仓库"""
+    multi = MultiVaultManager(Config.VAULTS)
+    Logger.info(f"=== Obsidian 融合守护进程 v5.4 (Multi-Vault x{len(multi.vaults)}) ===")
+    for vault in multi.vaults:
+        Logger.info(f"路径 [{vault.name}]: {vault.root}")
+    Logger.info("==========================================================")
+
+    try:
+        if not multi.acquire_locks(take_over_lock):
+            return 1
+        multi.run()
+    except KeyboardInterrupt:
+        Logger.info("\n停止服务...")
+    finally:
+        ProcessLock.release_all()
+    return 0
+
+
+def parse_date(text):
+    try:
+        datetime.datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD: {text}")
+    return text
+
+
+def parse_date_range(text):
+    """'A..B' / 'A..' / '..B' / 'A' (单日) -> (start, end)，缺省端为 None"""
+    start, sep, end = text.partition('..')
+    if not sep: end = start
+    start = parse_date(start) if start else None
+    end = parse_date(end) if end else None
+    if start and end and start > end:
+        raise argparse.ArgumentTypeError(f"日期区间起点晚于终点: {text}")
+    return start, end
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Obsidian 日记融合同步守护进程")
+    parser.add_argument('--vault', metavar='PATH', help="仓库根目录 (覆盖 Config.VAULT_ROOT / VAULTS)")
+    parser.add_argument('--no-lock', action='store_true',
+                        help="批处理时不获取进程锁 (仅用于仓库副本，切勿与守护进程同时写同一仓库)")
+    commands = parser.add_subparsers(dest='command', metavar='{daemon,sync,backfill,plan}')
+
+    daemon = commands.add_parser('daemon', help="常驻同步 (默认)")
+    daemon.add_argument('--async', dest='use_async', action='store_true',
+                        help="使用 asyncio 引擎 (日记编辑按文件防抖同步，SIGTERM 立即退出；见 ASYNC_DAEMON)")
+    daemon.add_argument('--record', metavar='DIR',
+                        help="把每个周期的输入 / 输出录制到 DIR，供 scripts/replay.py 离线重放 (见 RECORD_DIR)")
+
+    sync = commands.add_parser('sync', help="单次同步后退出 (cron / CI)")
+    scope = sync.add_mutually_exclusive_group(required=True)
+    scope.add_argument('--once', action='store_true', help="处理全部日期一次")
+    scope.add_argument('--dates', metavar='A..B', type=parse_date_range,
+                       help="只处理日期区间 (含两端，可省略一端，或只写一个日期)")
+    sync.add_argument('--jobs', type=int, default=None,
+                      help=f"并行处理互不相交日期组的进程数 (默认 PARALLEL_DATES={Config.PARALLEL_DATES}，1 为逐个处理)")
+
+    backfill = commands.add_parser('backfill', help="重处理全部历史日期，输出进度与吞吐")
+    backfill.add_argument('--since', metavar='YYYY-MM-DD', type=parse_date,
+                          help="本次运行的时间门控起点 (覆盖 SYNC_START_DATE，用于调整门控后的批量迁移)")
+    backfill.add_argument('--batch', type=int, default=Config.BATCH_SIZE,
+                          help=f"每提交一次写入的日期数 (默认 {Config.BATCH_SIZE})")
+    backfill.add_argument('--jobs', type=int, default=None,
+                          help=f"并行处理互不相交日期组的进程数 (默认 PARALLEL_DATES={Config.PARALLEL_DATES}，1 为逐个处理)")
+
+    plan = commands.add_parser('plan', help="演练一次同步：不写任何文件，输出预定操作、写入与耗时")
+    plan.add_argument('--dates', metavar='A..B', type=parse_date_range,
+                      help="只演练日期区间 (默认全部日期)")
+    plan.add_argument('--json', metavar='PATH', help="把完整计划 (逐条操作 / 按文件写入 / 阶段耗时) 写入 JSON 文件")
+    return parser
+
+
+def run_daemon():
+    if Config.VAULTS:
+        return run_multi_vault()
+
+    app = AsyncFusionManager() if Config.ASYNC_DAEMON else FusionManager()
     
     Logger.info(f"=== Obsidian 融合守护进程 v5.4 (Auto-Healing) ===")
     Logger.info(f"路径: {Config.ROOT_DIR}")
@@ -18,50 +171,11 @@ if __name__ == "__main__":
     Logger.info(f"频率: {Config.TICK_INTERVAL}s/次")
     Logger.info("==========================================================")
 
-    # 第一次尝试获取锁
-    if not ProcessLock.acquire():
-        Logger.info(f"⚠️  检测到锁文件 ({Config.LOCK_FILE})")
-        old_pid = ProcessLock.read_pid()
-        
-        wait_seconds = 3
-        Logger.info(f"⏳ 等待原进程 ({old_pid if old_pid else 'Unknown'}) 执行完当前周期 ({wait_seconds}s)...")
-        time.sleep(wait_seconds)
-        
-        if old_pid:
-            Logger.info(f"🛑 发送终止信号 (SIGTERM) 给 PID: {old_pid}...")
-            try:
-                os.kill(old_pid, signal.SIGTERM)
-                
-                # [优雅关闭] 给它 3 秒时间保存状态并退出
-                for _ in range(30): # 30 * 0.1s = 3s
-                    time.sleep(0.1)
-                    try:
-                        os.kill(old_pid, 0) # 检查是否存活
-                    except OSError:
-                        Logger.info("   原进程已优雅退出。")
-                        break
-                else:
-                    Logger.info(f"💀 原进程未响应，强制关闭 (SIGKILL) PID: {old_pid}...")
-                    os.kill(old_pid, signal.SIGKILL)
-            except ProcessLookupError:
-                Logger.info("   原进程已不存在。")
-            except Exception as e:
-                Logger.error_once("shutdown_fail", f"   关闭失败: {e}")
-        else:
-            Logger.info("⚠️  无法读取旧进程PID（可能是旧版代码遗留），尝试直接清理锁文件...")
-
-        # 清理可能残留的锁文件（虽然 os.kill 后系统可能会释放，但为了保险）
-        # 注意：这里主要依赖第二次 acquire 重新抢占
-        
-        Logger.info("🔄 正在重启服务...")
-        time.sleep(1) # 给系统一点回收资源的时间
-
-        # 第二次尝试获取锁
-        if not ProcessLock.acquire():
-            Logger.error_once("lock_fail", "❌ 无法获取锁，强制接管失败。请手动检查。")
-            exit(1)
-        else:
-            Logger.info("✅ 成功接管锁，服务已启动。")
+    if not take_over_lock(app):
+        return 1
+
+    if not app.warm:
+        app.load_snapshot()
 
     try:
         app.run() # 注意：manager.py 里的 run 方法不再需要处理锁的获取，只需处理循环
@@ -69,3 +183,75 @@ if __name__ == "__main__":
         Logger.info("\n停止服务...")
     finally:
         ProcessLock.release()
+    return 0
+
+
+def run_batch(args):
+    """[Batch] 对当前仓库 (Config) 执行一次 sync / backfill，返回退出码。不接管运行中的守护进程。"""
+    if args.command == 'backfill' and args.since:
+        Config.SYNC_START_DATE = args.since
+    if args.jobs is not None:
+        Config.PARALLEL_DATES = args.jobs
+    if not args.no_lock and not ProcessLock.acquire():
+        Logger.error_once("batch_lock", f"❌ 仓库正被守护进程占用 ({Config.LOCK_FILE})。"
+                                        f"请先停止守护进程，或对仓库副本使用 --no-lock。")
+        return 1
+    try:
+        app = FusionManager()
+        app.load_snapshot()
+        if args.command == 'backfill':
+            stats = app.run_batch(batch_size=args.batch, progress=True)
+        else:
+            start, end = args.dates if args.dates else (None, None)
+            stats = app.run_batch(start=start, end=end)
+        app.shutdown()
+    finally:
+        if not args.no_lock:
+            ProcessLock.release()
+    return 1 if stats['failed'] else 0
+
+
+def run_plan(args):
+    """[Plan] 对当前仓库 (Config) 演练一次同步。只读，不获取进程锁，可与守护进程同时运行"""
+    start, end = args.dates if args.dates else (None, None)
+    app = FusionManager()
+    app.load_snapshot()
+    plan = app.plan(start=start, end=end)
+    for line in plan.summary():
+        Logger.info(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(plan.report(), f, ensure_ascii=False, indent=2)
+        Logger.info(f"🧪 [Plan] 完整计划已写入 {args.json}")
+    return 1 if plan.failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.vault:
+        Config.use_vault(args.vault)
+        Config.VAULTS = []
+    if Config.LOG_ASYNC:
+        Logger.start_async_writer()
+
+    if getattr(args, 'use_async', False):
+        Config.ASYNC_DAEMON = True
+    if getattr(args, 'record', None):
+        Config.RECORD_DIR = os.path.abspath(args.record)
+
+    if args.command in (None, 'daemon'):
+        return run_daemon()
+
+    run = run_plan if args.command == 'plan' else run_batch
+    if not Config.VAULTS:
+        return run(args)
+    # 多仓库配置下逐个仓库执行 (各自的锁与状态)
+    code = 0
+    for spec in Config.VAULTS:
+        with VaultContext(spec).active():
+            code = max(code, run(args))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+[Benchmark Suite] 在多个规模的合成仓库上计时核心路径，结果落盘以便前后比对。
+
+计时对象:
+  scan_projects / scan_all_source_tasks / process_date (每个日期) /
+  inject_into_task_section / FormatCore.execute (每篇日记) /
+  scan_cold.io<N> (冷缓存全量解析，N 个预读线程；--read-latency 模拟网络盘的单次读取延迟)
+
+用法:
+  python scripts/bench.py                              # 默认三档规模
+  python scripts/bench.py --scales 10x20x14,80x50x90 --repeat 5
+  python scripts/bench.py --compare bench_results/bench-old.json
+  python scripts/bench.py --scales 40x40x60 --read-latency 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+sys.path.append(os.path.join(REPO_ROOT, 'src'))
+from config import Config
+from dailynotes.state_manager import StateManager
+from dailynotes.format_core import FormatCore
+from dailynotes.utils import FileUtils
+from dailynotes.sync import SyncCore
+from dailynotes.sync.discovery import scan_projects
+from dailynotes.sync.ingestion import scan_all_source_tasks
+from dailynotes.sync.rendering import inject_into_task_section
+from dailynotes.sync.cache import ParseCache
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from synth_vault import generate_vault
+
+DEFAULT_SCALES = "10x20x14,40x40x60,120x60x180"
+DEFAULT_OUT_DIR = os.path.join(REPO_ROOT, 'bench_results')
+
+
+def _parse_scales(text):
+    scales = []
+    for part in text.split(','):
+        p, t, d = (int(x) for x in part.strip().lower().split('x'))
+        scales.append((p, t, d))
+    return scales
+
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _time(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        'min_ms': round(min(samples) * 1000, 3),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'repeat': repeat,
+    }
+
+
+def _per_item(result, n):
+    if not n: return result
+    out = dict(result)
+    for k in ('min_ms', 'median_ms', 'mean_ms'):
+        out[k] = round(result[k] / n, 3)
+    out['items'] = n
+    return out
+
+
+def _configure(root):
+    Config.use_vault(root)
+    Config.SYNC_START_DATE = "2000-01-01"
+    Config.TYPING_COOLDOWN_SECONDS = 0
+    Config.DEBUG_MODE = False
+    Config.METRICS_ENABLED = False
+
+
+def _evict_page_cache(root):
+    """尽量让内核丢弃仓库文件的页缓存 (posix_fadvise，不支持的平台 / 文件系统上无效果)"""
+    if not hasattr(os, 'posix_fadvise'): return
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            try:
+                fd = os.open(os.path.join(dirpath, f), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+@contextlib.contextmanager
+def _read_latency(ms):
+    """给每次文件读取加上固定延迟，模拟网络同步盘 / 冷存储"""
+    if not ms:
+        yield
+        return
+    fetch = FileUtils.fetch_raw
+
+    def slow_fetch(filepath):
+        time.sleep(ms / 1000.0)
+        return fetch(filepath)
+
+    FileUtils.fetch_raw = staticmethod(slow_fetch)
+    try:
+        yield
+    finally:
+        FileUtils.fetch_raw = staticmethod(fetch)
+
+
+def bench_scale(projects, tasks, days, repeat, workdir, read_latency=0):
+    root = os.path.join(workdir, f"vault-{projects}x{tasks}x{days}")
+    info = generate_vault(root, projects=projects, tasks=tasks, days=days)
+    _configure(root)
+    random.seed(0)
+
+    sm = StateManager()
+    core = SyncCore(sm)
+    # 验证线程只打印调试快照，基准中关闭
+    core.trigger_delayed_verification = lambda *a, **k: None
+    dates = info['dates']
+    daily_paths = [os.path.join(Config.DAILY_NOTE_DIR, f"{d}.md") for d in dates]
+
+    def _full_pass():
+        data = core.scan_all_source_tasks()
+        for d in dates:
+            core.process_date(d, data.get(d, {}))
+        for p in daily_paths:
+            if os.path.exists(p): FormatCore.execute(p)
+        return data
+
+    results = {}
+    with _quiet():
+        # 预热两轮：首轮注册/格式化，次轮进入稳态 (无写入)
+        _full_pass()
+        data = _full_pass()
+
+        results['scan_projects'] = _time(scan_projects, repeat)
+        results['scan_all_source_tasks'] = _time(lambda: scan_all_source_tasks(core.project_map, sm), repeat)
+
+        per_date = _time(lambda: [core.process_date(d, data.get(d, {})) for d in dates], repeat)
+        results['process_date'] = _per_item(per_date, len(dates))
+
+        biggest = max(core.project_path_map.values(), key=os.path.getsize)
+        with open(biggest, encoding='utf-8') as f:
+            base_lines = f.readlines()
+        stem = os.path.splitext(os.path.basename(biggest))[0]
+        new_blocks = []
+        for k in range(20):
+            bid = f"zz{k:04d}"
+            new_blocks.append(f"- [ ] [[{dates[0]}#^{bid}|⮐]] injected task {k} ^{bid}\n")
+            new_blocks.append(f"\t- child of {k}\n")
+        results['inject_into_task_section'] = _time(
+            lambda: inject_into_task_section(list(base_lines), list(new_blocks), stem), repeat)
+
+        fmt = _time(lambda: [FormatCore.execute(p) for p in daily_paths], repeat)
+        results['FormatCore.execute'] = _per_item(fmt, len(daily_paths))
+
+        # 冷缓存：每轮前清空解析缓存并丢弃页缓存，逐个读取 vs 线程预读
+        def _cold():
+            ParseCache.clear()
+            _evict_page_cache(root)
+
+        workers = Config.IO_WORKERS
+        with _read_latency(read_latency):
+            for n in sorted({1, max(1, workers)}):
+                Config.IO_WORKERS = n
+                results[f'scan_cold.io{n}'] = _time(lambda: scan_all_source_tasks(core.project_map, sm), repeat, _cold)
+        Config.IO_WORKERS = workers
+
+    vault = {k: v for k, v in info.items() if k not in ('dates', 'root')}
+    return {'vault': vault, 'results': results}
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(old, new):
+    print(f"\n{'scale':<16}{'benchmark':<28}{'old ms':>12}{'new ms':>12}{'delta':>10}")
+    for label, scale in new['scales'].items():
+        old_scale = old.get('scales', {}).get(label)
+        if not old_scale: continue
+        for name, res in scale['results'].items():
+            prev = old_scale['results'].get(name)
+            if not prev: continue
+            a, b = prev['median_ms'], res['median_ms']
+            delta = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"{label:<16}{name:<28}{a:>12.3f}{b:>12.3f}{delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sync engine on synthetic vaults.")
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='comma list of PROJECTSxTASKSxDAYS')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', help='result JSON path (default: bench_results/bench-<time>-<rev>.json)')
+    parser.add_argument('--compare', help='previous result JSON to compare against')
+    parser.add_argument('--keep', action='store_true', help='keep generated vaults')
+    parser.add_argument('--read-latency', type=float, default=0.0,
+                        help='extra latency per file read in ms for the cold-scan benchmarks')
+    args = parser.parse_args()
+
+    rev = _git_rev()
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'git_rev': rev,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'io_workers': Config.IO_WORKERS,
+            'read_latency_ms': args.read_latency,
+        },
+        'scales': {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="dailynotes-bench-")
+    try:
+        for projects, tasks, days in _parse_scales(args.scales):
+            label = f"{projects}x{tasks}x{days}"
+            print(f"▶ {label} ...", flush=True)
+            report['scales'][label] = bench_scale(projects, tasks, days, args.repeat, workdir, args.read_latency)
+            for name, res in report['scales'][label]['results'].items():
+                print(f"   {name:<28}{res['median_ms']:>10.3f} ms (median)")
+    finally:
+        if args.keep:
+            print(f"vaults kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{rev}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nsaved -> {out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
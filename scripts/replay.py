@@ -0,0 +1,328 @@
+"""
+[Replay] 在临时目录中重放 TickRecorder 录制的周期 (Config.RECORD_DIR / daemon --record)，
+报告每个周期的耗时 (录制时 vs 重放) 与输出差异。
+
+每个周期: 虚拟时钟拨到录制时刻 -> 写入该周期的外部修改 (保留 mtime，含引擎在周期中途读到的修改) -> 以录制的种子重置随机数
+-> 调用同一个入口 (tick / fast_start / 单日同步) -> 与录制的输出逐文件比对 (完全一致 / 仅块 ID 不同 / 不同)
+与状态库增量比对 -> 把重放写出的文件 mtime 改回录制时的值，使下个周期的防抖与调度判断与录制时一致。
+
+- 时钟: time.time 与 date.today 换成虚拟时钟；输入冷却不真的睡眠，只拨快时钟。
+- 写入按 batched 模式暂存，周期内读到的 mtime 也是虚拟时刻。
+- 调度器与解析缓存从冷状态开始 (录制开始前的热缓存不随录制保存)：前几个周期可能多处理一些未变化的日期。
+- 周期中途的外部编辑按引擎读到的内容在周期开始前写入；引擎读取之后又被改动的文件不参与比对。并行处理 (--jobs) 的子进程各自播种，块 ID 只能按“仅块 ID 不同”比对。
+
+用法:
+  python scripts/replay.py recordings/20261019-093000-vault
+  python scripts/replay.py recordings --json replay.json     # 目录下有多个会话时取最新的
+  python scripts/replay.py recordings/... --limit 200 --keep --verbose
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import difflib
+import argparse
+import datetime
+import tempfile
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+sys.path.append(os.path.join(REPO_ROOT, 'src'))
+from config import Config
+from dailynotes.utils import FileUtils
+from dailynotes.metrics import Metrics
+from dailynotes.manager import FusionManager
+from dailynotes.recorder import TickRecorder, RECORD_SCHEMA
+
+BLOCK_ID_RE = re.compile(r'\^[a-z0-9]{6}')
+
+
+class VirtualClock:
+    """time.time() = 真实时间 + 偏移；set() 拨到录制时刻，advance() 代替睡眠"""
+
+    def __init__(self):
+        self._real = time.time
+        self.offset = 0.0
+
+    def time(self):
+        return self._real() + self.offset
+
+    def set(self, t):
+        self.offset = t - self._real()
+
+    def advance(self, seconds):
+        self.offset += seconds
+
+
+@contextlib.contextmanager
+def _virtual_clock(clock):
+    real_date = datetime.date
+
+    class _Date(real_date):
+        @classmethod
+        def today(cls):
+            return real_date.fromtimestamp(clock.time())
+
+    time.time = clock.time
+    datetime.date = _Date
+    try:
+        yield
+    finally:
+        time.time = clock._real
+        datetime.date = real_date
+
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _find_session(path):
+    """会话目录 (含 meta.json)；给的是录制根目录时取最新的会话"""
+    if os.path.exists(os.path.join(path, 'meta.json')): return path
+    sessions = sorted(d for d in os.listdir(path) if os.path.exists(os.path.join(path, d, 'meta.json')))
+    if not sessions: raise SystemExit(f"no recording found in {path}")
+    return os.path.join(path, sessions[-1])
+
+
+def _ticks(session):
+    with open(os.path.join(session, 'ticks.jsonl'), encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line: yield json.loads(line)
+
+
+def _configure(meta, scratch, jobs):
+    for k, v in meta['config'].items():
+        if hasattr(Config, k): setattr(Config, k, v)
+    Config.use_vault(scratch)
+    Config.VAULTS = []
+    Config.RECORD_DIR = ''
+    Config.METRICS_ENABLED = False
+    Config.SNAPSHOT_ENABLED = False
+    Config.DEBUG_MODE = False
+    Config.LOG_ASYNC = False
+    Config.WRITE_DURABILITY = 'batched'
+    if jobs is not None: Config.PARALLEL_DATES = jobs
+
+
+def _prepare(session, scratch):
+    """基线文件 (保留 mtime) + 状态库 -> 临时目录，返回 {相对路径: 内容} 作为期望内容的起点"""
+    base = os.path.join(session, 'base')
+    shutil.copytree(base, scratch, dirs_exist_ok=True)
+    os.makedirs(Config.DAILY_NOTE_DIR, exist_ok=True)
+    with open(os.path.join(session, 'state.json'), encoding='utf-8') as f:
+        state = {bid: TickRecorder.import_entry(e, scratch) for bid, e in json.load(f).items()}
+    with open(Config.STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    expected = {}
+    for rel in TickRecorder.scan(scratch):
+        with open(os.path.join(scratch, rel), 'rb') as f:
+            expected[rel] = f.read()
+    return expected
+
+
+def _apply_inputs(scratch, inputs, expected):
+    for rel, entry in inputs.items():
+        path = os.path.join(scratch, rel)
+        if entry is None:
+            expected.pop(rel, None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        data = TickRecorder.decode(entry)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        os.utime(path, ns=(entry['mtime_ns'], entry['mtime_ns']))
+        expected[rel] = data
+
+
+def _state_key(entry):
+    return {k: v for k, v in entry.items() if k != 'last_seen'} if entry else None
+
+
+def _compare(actual, wanted, diff_lines):
+    """(状态, diff 行)：identical / masked (仅块 ID 不同) / diff"""
+    if actual == wanted: return 'identical', []
+    a = (actual or b'').decode('utf-8', 'replace')
+    w = (wanted or b'').decode('utf-8', 'replace')
+    if BLOCK_ID_RE.sub('^ID', a) == BLOCK_ID_RE.sub('^ID', w): return 'masked', []
+    diff = list(difflib.unified_diff(w.splitlines(), a.splitlines(), 'recorded', 'replay', lineterm='', n=1))
+    return 'diff', diff[:diff_lines]
+
+
+def _run_tick(app, rec):
+    kind = rec['kind']
+    if kind == 'fast_start':
+        app.fast_start()
+    elif kind == 'sync_now':
+        with app._tick_scope():
+            app.process_all_dates(dates=rec['dates'])
+    else:
+        app.tick()
+
+
+def replay(session, scratch, limit=None, jobs=None, verbose=False, diff_lines=40):
+    with open(os.path.join(session, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('schema') != RECORD_SCHEMA:
+        raise SystemExit(f"unsupported recording schema: {meta.get('schema')}")
+    _configure(meta, scratch, jobs)
+    expected = _prepare(session, scratch)
+
+    clock = VirtualClock()
+    is_async = meta.get('engine') == 'AsyncFusionManager'
+    results = []
+    with _virtual_clock(clock), _quiet(not verbose):
+        app = FusionManager()
+        app.sync_core.trigger_delayed_verification = lambda *args, **kwargs: None
+
+        def cooldown(daily_path, wait_time):
+            # 同步引擎睡满冷却后继续处理；异步引擎跳过该日期，交给随后录制的单日同步
+            if is_async: return False
+            clock.advance(wait_time)
+            FileUtils.invalidate_stat(daily_path)
+            return True
+
+        app.cooldown = cooldown
+
+        for rec in _ticks(session):
+            if limit is not None and len(results) >= limit: break
+            clock.set(rec['time'])
+            _apply_inputs(scratch, rec['inputs'], expected)
+            _apply_inputs(scratch, rec.get('read_inputs', {}), expected)
+            before_sigs = TickRecorder.scan(scratch)
+            before_state = dict(app.sm.state)
+            random.seed(rec['seed'])
+
+            t0 = time.perf_counter()
+            _run_tick(app, rec)
+            elapsed = time.perf_counter() - t0
+            last = Metrics.last_tick()
+
+            after_sigs = TickRecorder.scan(scratch)
+            outputs = rec.get('outputs', {})
+            changed = {rel for rel, sig in after_sigs.items() if before_sigs.get(rel) != sig}
+            files = {}
+            for rel in sorted(changed | set(outputs)):
+                out = outputs.get(rel)
+                if out is not None and out.get('external'): continue
+                wanted = TickRecorder.decode(out) if out is not None else expected.get(rel)
+                try:
+                    with open(os.path.join(scratch, rel), 'rb') as f:
+                        actual = f.read()
+                except OSError:
+                    actual = None
+                status, diff = _compare(actual, wanted, diff_lines)
+                files[rel] = {'status': status, 'diff': diff} if diff else {'status': status}
+                if wanted is not None: expected[rel] = wanted
+
+            # 重放写出的文件按录制时的 mtime 回填 (虚拟时钟与磁盘时间一致)，并重新登记内容指纹
+            for rel in changed:
+                path = os.path.join(scratch, rel)
+                out = outputs.get(rel)
+                mtime_ns = out['mtime_ns'] if out and 'mtime_ns' in out else int(clock.time() * 1e9)
+                digest = FileUtils.known_digest(path)
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+                FileUtils.invalidate_stat(path)
+                if digest: FileUtils.remember(path, os.stat(path), digest)
+
+            state = app.sm.state
+            delta = {bid: TickRecorder.export_entry(e, scratch) for bid, e in state.items()
+                     if before_state.get(bid) is not e}
+            delta.update((bid, None) for bid in before_state if bid not in state)
+            recorded = rec.get('state', {})
+            state_diff = sorted(bid for bid in set(delta) | set(recorded)
+                                if _state_key(delta.get(bid)) != _state_key(recorded.get(bid)))
+
+            statuses = [f['status'] for f in files.values()]
+            results.append({
+                'tick': rec['tick'], 'kind': rec['kind'], 'time': rec['time'],
+                # 冷却等待不计入 (重放只拨时钟不睡眠)
+                'recorded_ms': round((rec['elapsed'] - rec.get('spans', {}).get('cooldown_wait', 0.0)) * 1000, 3),
+                'replay_ms': round(elapsed * 1000, 3),
+                'spans': last['spans'] if last else {},
+                'files': len(files), 'identical': statuses.count('identical'),
+                'masked': statuses.count('masked'), 'diff': statuses.count('diff'),
+                'state_diff': state_diff, 'diffs': {rel: f for rel, f in files.items() if f['status'] != 'identical'},
+            })
+    return meta, results
+
+
+def _summary(meta, results):
+    rec_total = sum(r['recorded_ms'] for r in results)
+    rep_total = sum(r['replay_ms'] for r in results)
+    diverged = [r['tick'] for r in results if r['diff'] or r['state_diff']]
+    return {
+        'vault': meta['vault'],
+        'ticks': len(results),
+        'recorded_ms': round(rec_total, 3),
+        'replay_ms': round(rep_total, 3),
+        'files_compared': sum(r['files'] for r in results),
+        'files_masked': sum(r['masked'] for r in results),
+        'files_diff': sum(r['diff'] for r in results),
+        'ticks_diverged': len(diverged),
+        'first_divergence': diverged[0] if diverged else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded daemon ticks against a scratch copy.")
+    parser.add_argument('session', help='recording session directory (or RECORD_DIR: the latest session is used)')
+    parser.add_argument('--limit', type=int, help='replay only the first N ticks')
+    parser.add_argument('--jobs', type=int, help='override PARALLEL_DATES for the replay')
+    parser.add_argument('--json', help='write per-tick results (timings, spans, diffs) to this JSON file')
+    parser.add_argument('--workdir', help='scratch directory (default: a new temp dir)')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch vault')
+    parser.add_argument('--verbose', action='store_true', help='show engine logs')
+    parser.add_argument('--diff-lines', type=int, default=40, help='max unified diff lines kept per file')
+    args = parser.parse_args()
+
+    session = _find_session(args.session)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dailynotes-replay-")
+    scratch = os.path.join(workdir, 'vault')
+    try:
+        meta, results = replay(session, scratch, args.limit, args.jobs, args.verbose, args.diff_lines)
+    finally:
+        if args.keep or args.workdir:
+            print(f"scratch vault kept in {scratch}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'tick':>6} {'kind':<11}{'recorded ms':>13}{'replay ms':>11}{'delta':>9}  files (same/ids/diff)  state")
+    for r in results:
+        a, b = r['recorded_ms'], r['replay_ms']
+        delta = f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+        files = f"{r['identical']}/{r['masked']}/{r['diff']}"
+        state = f"{len(r['state_diff'])} bid" if r['state_diff'] else "ok"
+        print(f"{r['tick']:>6} {r['kind']:<11}{a:>13.1f}{b:>11.1f}{delta:>9}  {files:<21}  {state}")
+        for rel, f in r['diffs'].items():
+            if f['status'] != 'diff': continue
+            print(f"         ! {rel}")
+            for line in f.get('diff', []):
+                print(f"           {line}")
+
+    summary = _summary(meta, results)
+    print(f"\n{summary['ticks']} ticks | recorded {summary['recorded_ms']:.0f} ms | replay {summary['replay_ms']:.0f} ms | "
+          f"{summary['files_compared']} files compared, {summary['files_masked']} differ only in block ids, "
+          f"{summary['files_diff']} differ | first divergence: {summary['first_divergence']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'session': session, 'summary': summary, 'ticks': results}, f, ensure_ascii=False, indent=2)
+        print(f"saved -> {args.json}")
+    return 1 if summary['ticks_diverged'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+[Synthetic Vault] 生成可复现的合成仓库，用于基准测试与回归比对。
+
+结构:
+  <root>/DayPlanTemplate.md
+  <root>/Projects/P000/P000.md          项目主文件 (frontmatter 含 main)，# Tasks 区按日期分组
+  <root>/Projects/P000/note_00.md       纯文本笔记 (无任务)
+  <root>/【ATTACHMENT】/【DAILYNOTE】/YYYY-MM-DD.md   Day planner + Journey
+
+用法:
+  python scripts/synth_vault.py /tmp/vault --projects 50 --tasks 40 --days 60
+"""
+import os
+import sys
+import random
+import string
+import argparse
+import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+WORDS = ("review draft plan sync fix write read call email design refactor deploy test "
+         "meeting notes budget report outline sketch research archive backup clean").split()
+
+
+def _bid(rnd):
+    return ''.join(rnd.choices(string.ascii_lowercase + string.digits, k=6))
+
+
+def _text(rnd, n_min=3, n_max=9):
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(n_min, n_max)))
+
+
+def _children(rnd, child_ratio, image_ratio):
+    out = []
+    if rnd.random() < child_ratio:
+        for _ in range(rnd.randint(1, 3)):
+            out.append(f"\t- {_text(rnd, 2, 6)}\n")
+            if rnd.random() < 0.3:
+                out.append(f"\t\t- {_text(rnd, 2, 5)}\n")
+    if rnd.random() < image_ratio:
+        out.append(f"\t- ![[img_{_bid(rnd)}.png{Config.IMAGE_PARAM_SUFFIX}]]\n")
+    return out
+
+
+def generate_vault(root, projects=10, tasks=20, days=14, prose_notes=3, child_ratio=0.4,
+                   image_ratio=0.15, journey_new=2, seed=1, today=None):
+    """
+    生成合成仓库，返回统计信息 dict。
+    每个项目 `tasks` 个任务，均匀分布在最近 `days` 天；日记中镜像对应任务 (已同步状态)，
+    并在 Journey 区追加 `journey_new` 个待注册的新任务。
+    """
+    rnd = random.Random(seed)
+    today = today or datetime.date.today()
+    dates = [(today - datetime.timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days)]
+
+    daily_dir = os.path.join(root, Config.REL_ATTACHMENT_DIR, Config.REL_DAILY_NOTE_DIR)
+    os.makedirs(daily_dir, exist_ok=True)
+    with open(os.path.join(root, Config.REL_TEMPLATE_FILE), 'w', encoding='utf-8') as f:
+        f.write("# Day planner\n\n# Journey\n\n")
+
+    planner = {d: [] for d in dates}
+    journey = {d: [] for d in dates}
+    names = [f"P{i:03d}" for i in range(projects)]
+    n_tasks = 0
+
+    for p_idx, name in enumerate(names):
+        p_dir = os.path.join(root, 'Projects', name)
+        os.makedirs(p_dir, exist_ok=True)
+        by_date = {}
+        for _ in range(tasks):
+            d = rnd.choice(dates)
+            bid = _bid(rnd)
+            status = 'x' if rnd.random() < 0.3 else ' '
+            has_time = rnd.random() < 0.4
+            time_part = f"{rnd.randint(6, 22):02d}:{rnd.choice(('00', '30'))} " if has_time else ""
+            text = _text(rnd)
+            children = _children(rnd, child_ratio, image_ratio)
+            by_date.setdefault(d, []).append((bid, status, time_part, text, children))
+            planner[d].append(
+                f"- [{status}] {time_part}[[{name}#^{bid}|⮐]] [[{name}]] {text} ^{bid}\n" + "".join(children))
+            n_tasks += 1
+
+        tags = "tags: main\n" if p_idx % 2 else "tags:\n  - main\n  - project\n"
+        lines = ["---\n", tags, "---\n", "\n", "# Tasks\n", "\n"]
+        for d in sorted(by_date, reverse=True):
+            lines.append(f"## [[{d}]]\n")
+            lines.append("\n")
+            for bid, status, time_part, text, children in by_date[d]:
+                lines.append(f"- [{status}] [[{d}#^{bid}|⮐]] {time_part}{text} ^{bid}\n")
+                lines.extend(children)
+            lines.append("\n")
+        lines.append("----------\n\n")
+        lines.append(f"# {name}\n\n" + "".join(f"{_text(rnd, 8, 20)}\n\n" for _ in range(5)))
+        with open(os.path.join(p_dir, f"{name}.md"), 'w', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+        for k in range(prose_notes):
+            body = "".join(f"{_text(rnd, 10, 30)}\n\n" for _ in range(rnd.randint(5, 40)))
+            with open(os.path.join(p_dir, f"note_{k:02d}.md"), 'w', encoding='utf-8') as f:
+                f.write(f"# Note {k}\n\n{body}")
+
+    for d in dates:
+        for _ in range(journey_new if names else 0):
+            journey[d].append(f"- [ ] {_text(rnd)} [[{rnd.choice(names)}]]\n")
+        body = ["# Day planner\n", "\n"] + planner[d] + ["\n", "# Journey\n", "\n"] + journey[d]
+        body += ["\n", "# Log\n", "\n", f"{_text(rnd, 10, 40)}\n"]
+        path = os.path.join(daily_dir, f"{d}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("".join(body))
+        # 日记 mtime 置于冷却期之前，避免触发防抖等待
+        old = (datetime.datetime.now() - datetime.timedelta(hours=1)).timestamp()
+        os.utime(path, (old, old))
+
+    return {'projects': projects, 'tasks': n_tasks, 'days': days, 'dates': dates,
+            'notes': projects * prose_notes, 'root': os.path.abspath(root)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Obsidian vault for benchmarks.")
+    parser.add_argument('root')
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=20, help='tasks per project')
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--prose-notes', type=int, default=3, help='task-free notes per project')
+    parser.add_argument('--child-ratio', type=float, default=0.4)
+    parser.add_argument('--image-ratio', type=float, default=0.15)
+    parser.add_argument('--journey-new', type=int, default=2, help='unregistered journey tasks per daily note')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    info = generate_vault(args.root, args.projects, args.tasks, args.days, args.prose_notes,
+                          args.child_ratio, args.image_ratio, args.journey_new, args.seed)
+    print(f"Generated {info['tasks']} tasks in {info['projects']} projects over {info['days']} days -> {info['root']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import time
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from .utils import Logger, FileUtils
+from .handoff import Handoff
+from .profiling import Profiler
+from .manager import FusionManager, DAILY_NAME_RE
+
+
+class AsyncFusionManager(FusionManager):
+    """
+    [Async Engine] asyncio 版守护进程 (daemon --async / Config.ASYNC_DAEMON)。
+
+    事件循环中的任务：
+    - ticker: 自适应间隔的完整周期 (cycle)，与同步版相同；
+    - watcher: 每 WATCH_INTERVAL 秒在 I/O 线程中轮询日记目录，外部编辑 (签名与最近一次读写时登记的不同)
+      开始该日记的防抖计时；
+    - 防抖计时器 (每个日记一个)：最后一次编辑后冷却 TYPING_COOLDOWN_SECONDS，再只同步这一个日期。
+      周期中遇到仍在冷却的日记也交给它的计时器 (cooldown())，不再在周期内睡眠、阻塞其他日期；
+    - verifier: 写入源文件后的延迟校验快照，取代每次写入一个 sleep 线程；
+    - 热交接 socket 注册为可读回调。
+    并发范围 (没有按文件加锁)：同步引擎依赖进程级缓存 (FileUtils 的暂存 / stat / 内容指纹、Metrics 的周期统计、
+    状态库、解析缓存)，这些都不是线程安全的，因此周期与单日同步都在唯一的引擎线程中依次执行，引擎调用之间无需加锁。
+    并行的只有事件循环中的等待：各日记的冷却计时、目录轮询与校验读取 (只读，在 I/O 线程中) 互不阻塞。
+    限制：不相关日期的同步并不真正并发——防抖到期的单日同步排在进行中的完整周期之后，
+    一个耗时很长的周期会推迟所有到期的单日同步 (延迟上限约为一个周期的耗时)。
+    SIGTERM / SIGINT 立即取消全部任务 (不必睡满间隔)，等进行中的引擎调用结束后落盘退出。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._loop = None
+        self._engine = None  # 单线程：所有同步引擎调用
+        self._io = None      # 目录轮询 / 校验读取
+        self._stop = None
+        self._timers = {}    # 日记路径 -> 仍在计时的防抖任务
+        self._verify = {}    # path -> 校验到期时间 (monotonic)
+        self._verify_wake = None
+        self._handoff_task = None
+
+    # ---------- 引擎线程 ----------
+
+    def _guarded(self, fn, *args):
+        # 已移交给新实例：锁已释放，排在交接之后的引擎调用一律放弃
+        if self.handed_off: return None
+        return fn(*args)
+
+    async def _call(self, fn, *args):
+        """在引擎线程中执行同步调用 (取消只会丢弃尚未开始的调用)"""
+        return await self._loop.run_in_executor(self._engine, self._guarded, fn, *args)
+
+    def cooldown(self, daily_path, wait_time):
+        """[Async] 不在引擎线程中睡眠：本周期跳过该日期，冷却结束后由它的防抖计时器单独同步"""
+        self._loop.call_soon_threadsafe(self._arm, daily_path, wait_time)
+        return False
+
+    def sync_now(self, date_str):
+        """防抖到期：只同步这一个日期 (完整的周期框架，源任务照常经解析缓存扫描)"""
+        with self._recording('sync_now', [date_str]), self._tick_scope():
+            self.process_all_dates(dates=[date_str])
+        self.last_active_time = time.time()
+
+    def trigger_verification(self, filepath, delay=10):
+        """取代 SyncCore.trigger_delayed_verification：登记到校验队列，同一文件以最后一次写入为准"""
+        self._loop.call_soon_threadsafe(self._queue_verify, filepath, delay)
+
+    def _finish(self):
+        Handoff.close()
+        if not self.handed_off:
+            Profiler.stop()
+        self.shutdown()
+
+    # ---------- 事件循环 ----------
+
+    def _arm(self, daily_path, delay):
+        """(重新) 开始该日记的防抖计时；已交给引擎线程的同步照常执行，新计时器的同步在引擎线程上排在它之后"""
+        timer = self._timers.get(daily_path)
+        if timer is not None: timer.cancel()
+        self._timers[daily_path] = self._loop.create_task(self._debounced(daily_path, delay))
+
+    async def _debounced(self, daily_path, delay):
+        await asyncio.sleep(delay)
+        if self._timers.get(daily_path) is asyncio.current_task(): del self._timers[daily_path]
+        date_str = DAILY_NAME_RE.match(os.path.basename(daily_path)).group(1)
+        try:
+            await self._call(self.sync_now, date_str)
+        except Exception as e:
+            Logger.error_once(f"async_sync_{date_str}", f"同步异常 [{date_str}]: {e}")
+
+    async def _ticker(self):
+        interval = 0.0
+        if Config.FAST_START and not self.warm:
+            await self._call(self.fast_start)
+            interval = self.MIN_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            interval = await self._call(self.cycle)
+            if interval is None: return
+
+    @staticmethod
+    def _scan_daily_dir():
+        """I/O 线程：日记目录中各日记的 (mtime_ns, size)，不经 FileUtils 的周期缓存"""
+        sigs = {}
+        try:
+            with os.scandir(Config.DAILY_NOTE_DIR) as it:
+                for entry in it:
+                    if not DAILY_NAME_RE.match(entry.name): continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    sigs[entry.path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return sigs
+
+    async def _watcher(self):
+        seen = None
+        while True:
+            sigs = await self._loop.run_in_executor(self._io, self._scan_daily_dir)
+            if seen is not None:
+                for path, sig in sigs.items():
+                    # 我们自己的读写会登记签名，只有外部编辑才与之不同
+                    if seen.get(path) != sig and FileUtils.read_signature(path) != sig:
+                        self.last_active_time = time.time()
+                        self._arm(path, Config.TYPING_COOLDOWN_SECONDS)
+            seen = sigs
+            await asyncio.sleep(Config.WATCH_INTERVAL)
+
+    def _queue_verify(self, filepath, delay):
+        self._verify[filepath] = time.monotonic() + delay
+        self._verify_wake.set()
+
+    @staticmethod
+    def _read_lines(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.readlines()
+        except (OSError, UnicodeDecodeError):
+            return []
+
+    async def _verifier(self):
+        while True:
+            self._verify_wake.clear()
+            if not self._verify:
+                await self._verify_wake.wait()
+                continue
+            path, due = min(self._verify.items(), key=lambda kv: kv[1])
+            wait = due - time.monotonic()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._verify_wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            del self._verify[path]
+            if not Config.DEBUG_MODE: continue
+            content = await self._loop.run_in_executor(self._io, self._read_lines, path)
+            Logger.debug_block(f"VERIFICATION Snapshot: {os.path.basename(path)}", content)
+
+    def _listen_handoff(self):
+        fd = Handoff.fileno()
+        if fd is not None: self._loop.add_reader(fd, self._on_handoff_request)
+
+    def _on_handoff_request(self):
+        self._loop.remove_reader(Handoff.fileno())
+        self._handoff_task = self._loop.create_task(self._serve_handoff())
+
+    async def _serve_handoff(self):
+        if await self._call(Handoff.serve, self._handoff_export):
+            self._stop.set()
+        else:
+            self._listen_handoff()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._verify_wake = asyncio.Event()
+        self._engine = ThreadPoolExecutor(max_workers=1, thread_name_prefix='engine')
+        self._io = ThreadPoolExecutor(max_workers=max(1, Config.IO_WORKERS), thread_name_prefix='io')
+        self.sync_core.trigger_delayed_verification = self.trigger_verification
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            self._loop.add_signal_handler(sig, self._stop.set)
+        Profiler.install()
+        Handoff.listen()
+        self._listen_handoff()
+
+        Logger.info(f"🚀 启动异步引擎: 活跃 {self.MIN_INTERVAL}s <-> 静默 {self.MAX_INTERVAL}s，"
+                    f"日记轮询 {Config.WATCH_INTERVAL}s，防抖 {Config.TYPING_COOLDOWN_SECONDS}s")
+        tasks = [self._loop.create_task(self._ticker(), name='ticker'),
+                 self._loop.create_task(self._watcher(), name='watcher'),
+                 self._loop.create_task(self._verifier(), name='verifier')]
+        stop = self._loop.create_task(self._stop.wait(), name='stop')
+        try:
+            done, _ = await asyncio.wait(tasks + [stop], return_when=asyncio.FIRST_COMPLETED)
+            # 工作任务异常退出时与同步版一致：收尾后向上抛出
+            for task in done:
+                if task is not stop and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            pending = tasks + [stop] + list(self._timers.values())
+            if self._handoff_task is not None: pending.append(self._handoff_task)
+            for task in pending: task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            fd = Handoff.fileno()
+            if fd is not None: self._loop.remove_reader(fd)
+            # 排在进行中的引擎调用之后：落盘 / 提交写入时不会与周期交错
+            await self._loop.run_in_executor(self._engine, self._finish)
+            self._engine.shutdown()
+            self._io.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        asyncio.run(self._main())
@@ -207,7 +207,7 @@ class FormatCore:
 
     @classmethod
     def execute(cls, filepath: str) -> bool:
-        if not os.path.exists(filepath): return False
+        if not FileUtils.exists(filepath): return False
         content = FileUtils.read_content(filepath)
         if not content: return False
 
@@ -235,14 +235,14 @@ class FormatCore:
 
         if orig_hash != new_hash:
             Logger.info(f"✨ [Format] 优化日记排版与间距: {fname}")
-            return FileUtils.write_file(filepath, c)
+            return FileUtils.write_file(filepath, c, stage="format")
         return False
 
     @staticmethod
     def fix_broken_tab_bullets_global():
         if not os.path.exists(Config.DAILY_NOTE_DIR): return
         pattern = re.compile(r'(?m)^(\t+)-(?![ \t])')
-        for filename in os.listdir(Config.DAILY_NOTE_DIR):
+        for filename in FileUtils.list_dir(Config.DAILY_NOTE_DIR):
             if not filename.endswith('.md'): continue
             filepath = os.path.join(Config.DAILY_NOTE_DIR, filename)
             try:
@@ -250,7 +250,7 @@ class FormatCore:
                 if not content: continue
                 new_content = pattern.sub(r'\1- ', content)
                 if new_content != content:
-                    FileUtils.write_file(filepath, new_content)
+                    FileUtils.write_file(filepath, new_content, stage="tab_fix")
                     Logger.info(f"🔧 [Fix] 修复列表缩进格式: {filename}")
             except Exception as e:
                 Logger.debug(f"Global Fix Error {filename}: {e}")
\ No newline at end of file
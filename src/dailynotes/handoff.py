@@ -0,0 +1,149 @@
+import os
+import time
+import errno
+import struct
+import pickle
+import select
+import socket
+import hashlib
+import tempfile
+from config import Config
+from .utils import Logger, ProcessLock
+
+
+class Handoff:
+    """
+    [Warm Handoff] 新旧守护进程之间的热交接 (Unix socket，位于 LOCK_FILE 旁)。
+
+    旧实例 (持锁) 在周期间隙监听；新实例连接后发送请求，旧实例:
+      落盘状态 -> 提交暂存写入 -> 序列化热缓存 -> 释放锁 -> 发送数据 -> 退出
+    新实例导入缓存后直接进入主循环，无需冷启动全量重扫。
+    协议: 客户端发送 b"HANDOFF <ver>\\n"；服务端回复 8 字节长度 + pickle 数据。
+    socket 文件权限为 0600，客户端连接前校验属主，避免接收他人伪造的数据。
+    """
+    PROTOCOL = 1
+    _server = None
+    _path = None
+
+    @staticmethod
+    def socket_path():
+        path = Config.LOCK_FILE + ".sock"
+        # AF_UNIX 路径上限约 104~108 字节 (macOS / Linux)，仓库路径过长时改用临时目录
+        if len(os.fsencode(path)) <= 100:
+            return path
+        digest = hashlib.md5(os.fsencode(Config.LOCK_FILE)).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), f"dailynotes-{digest}.sock")
+
+    @classmethod
+    def listen(cls):
+        """持锁后调用：残留的 socket 文件必然是过期的，直接替换"""
+        if not Config.HANDOFF_ENABLED or not hasattr(socket, 'AF_UNIX'): return False
+        path = cls.socket_path()
+        try:
+            if os.path.exists(path): os.remove(path)
+            srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            old_umask = os.umask(0o077)
+            try:
+                srv.bind(path)
+            finally:
+                os.umask(old_umask)
+            srv.listen(1)
+            srv.setblocking(False)
+            cls._server, cls._path = srv, path
+            return True
+        except OSError as e:
+            Logger.error_once("handoff_listen", f"热交接 socket 创建失败 ({path}): {e}")
+            return False
+
+    @classmethod
+    def close(cls):
+        if cls._server is None: return
+        try:
+            cls._server.close()
+        except OSError:
+            pass
+        try:
+            os.remove(cls._path)
+        except OSError:
+            pass
+        cls._server = None
+
+    @classmethod
+    def fileno(cls):
+        """监听 socket 的文件描述符 (供事件循环注册可读回调)，未监听时为 None"""
+        return cls._server.fileno() if cls._server is not None else None
+
+    @classmethod
+    def wait(cls, timeout):
+        """代替周期间的 sleep：有交接请求到达返回 True，否则睡满 timeout 返回 False"""
+        if cls._server is None:
+            time.sleep(timeout)
+            return False
+        try:
+            readable, _, _ = select.select([cls._server], [], [], timeout)
+        except (OSError, ValueError):
+            time.sleep(timeout)
+            return False
+        return bool(readable)
+
+    @staticmethod
+    def _recv_exact(conn, n):
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = conn.recv(min(1 << 20, n - len(buf)))
+            if not chunk: raise ConnectionError("handoff connection closed early")
+            buf.extend(chunk)
+        return bytes(buf)
+
+    @classmethod
+    def serve(cls, export_fn):
+        """
+        处理一次交接请求。export_fn() 负责落盘并返回要交接的热状态。
+        成功返回 True (调用方应立即退出，不再写任何文件)；请求无效返回 False。
+        """
+        try:
+            conn, _ = cls._server.accept()
+        except (BlockingIOError, InterruptedError):
+            return False
+        with conn:
+            conn.settimeout(5)
+            try:
+                request = conn.recv(64)
+            except OSError:
+                return False
+            if request.strip() != f"HANDOFF {cls.PROTOCOL}".encode():
+                return False
+            Logger.info("🤝 [Handoff] 收到新实例的交接请求，正在移交...")
+            data = pickle.dumps(export_fn(), protocol=pickle.HIGHEST_PROTOCOL)
+            cls.close()
+            # 先释放锁再发送：新实例收到数据时即可立即拿锁
+            ProcessLock.release()
+            try:
+                conn.sendall(struct.pack('>Q', len(data)) + data)
+            except OSError as e:
+                Logger.error_once("handoff_send", f"热交接数据发送失败: {e}")
+            Logger.info(f"🤝 [Handoff] 已移交 ({len(data) / 1024:.0f} KiB)，旧实例退出")
+            return True
+
+    @classmethod
+    def request(cls, timeout=None):
+        """新实例调用：向持锁的旧实例请求交接，成功返回热状态，否则 None"""
+        if not Config.HANDOFF_ENABLED or not hasattr(socket, 'AF_UNIX'): return None
+        path = cls.socket_path()
+        try:
+            if os.stat(path).st_uid != os.getuid(): return None
+        except (OSError, AttributeError):
+            return None
+        timeout = timeout or Config.HANDOFF_TIMEOUT
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                # 旧实例只在周期间隙响应，等待时间需覆盖一个完整周期 (含输入冷却)
+                conn.settimeout(timeout)
+                conn.connect(path)
+                conn.sendall(f"HANDOFF {cls.PROTOCOL}\n".encode())
+                size = struct.unpack('>Q', cls._recv_exact(conn, 8))[0]
+                return pickle.loads(cls._recv_exact(conn, size))
+        except (OSError, ConnectionError, pickle.UnpicklingError, EOFError, struct.error) as e:
+            if getattr(e, 'errno', None) not in (errno.ENOENT, errno.ECONNREFUSED):
+                Logger.info(f"⚠️  [Handoff] 热交接失败，改为常规接管: {e}")
+            return None
@@ -1,25 +1,103 @@
 import os
+import re
 import time
 import datetime
 import signal
 import math
+from contextlib import contextmanager, nullcontext
 from config import Config
 from config import Config
-from .utils import Logger, FileUtils
+from .utils import Logger, FileUtils, WriteGuard
+from .handoff import Handoff
+from .snapshot import Snapshot
+from .metrics import Metrics
+from .profiling import Profiler
 from .format_core import FormatCore
 from .state_manager import StateManager
+from .scheduler import DateScheduler
+from .parallel import ParallelDates
+from .planner import SyncPlan
+from .recorder import TickRecorder
 from .sync import SyncCore
+from .sync.cache import ParseCache
+
+# 热状态格式版本：导出结构变化时递增，旧版本数据直接丢弃
+WARM_STATE_VERSION = 3
+
+DAILY_NAME_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.md$')
 
 
 class FusionManager:
     def __init__(self):
         self.sm = StateManager()
         self.sync_core = SyncCore(self.sm)
+        self.scheduler = DateScheduler()
         # [状态] 上一次检测到活跃的时间 (用于计算惰性)
         self.last_active_time = time.time()
+        # [热交接] 已从旧实例导入缓存 (跳过快速启动) / 已移交给新实例 (退出时不再写状态)
+        self.warm = False
+        self.handed_off = False
+        self.last_snapshot = time.time()
+        # [Record] 周期录制 (Config.RECORD_DIR)
+        self.recorder = TickRecorder(self, Config.RECORD_DIR) if Config.RECORD_DIR else None
+
+    def export_warm_state(self):
+        """可跨进程复用的热缓存：仓库索引、解析缓存、内容指纹、日期调度指纹"""
+        core = self.sync_core
+        return {
+            'version': WARM_STATE_VERSION,
+            'vault': Config.VAULT_ROOT,
+            'index': (core.project_map, core.project_path_map, core.file_path_map),
+            'parse_cache': ParseCache.export(Config.VAULT_ROOT),
+            'content_cache': FileUtils.export_content_cache(Config.VAULT_ROOT),
+            'scheduler': self.scheduler.export_state(),
+        }
+
+    def import_warm_state(self, data):
+        if not isinstance(data, dict) or data.get('version') != WARM_STATE_VERSION: return False
+        if data.get('vault') != Config.VAULT_ROOT: return False
+        core = self.sync_core
+        core.set_index(*data['index'])
+        ParseCache.load(data['parse_cache'])
+        FileUtils.load_content_cache(data['content_cache'])
+        self.scheduler.load_state(data['scheduler'])
+        # 旧实例交接前已落盘，重新加载以拿到最新状态
+        self.sm.load()
+        return True
+
+    def load_snapshot(self):
+        """[冷启动] 载入上次退出时的热缓存快照，丢弃停机期间变化的文件条目"""
+        if not Config.SNAPSHOT_ENABLED: return False
+        t0 = time.perf_counter()
+        warm = Snapshot.load()
+        if warm is None or not self.import_warm_state(warm): return False
+        kept, total = ParseCache.prune_stale()
+        Logger.info(f"♻️ [Snapshot] 载入启动快照: {kept}/{total} 个文件的解析结果仍有效，"
+                    f"耗时 {time.perf_counter() - t0:.2f}s")
+        return True
+
+    def save_snapshot(self):
+        if not Config.SNAPSHOT_ENABLED: return False
+        self.last_snapshot = time.time()
+        with Metrics.span('snapshot'):
+            return Snapshot.save(self.export_warm_state())
+
+    def _handoff_export(self):
+        """交接前收尾：结束采样、提交暂存写入、落盘状态，再导出热缓存"""
+        Profiler.stop()
+        FileUtils.commit_staged()
+        self.sm.save()
+        self.handed_off = True
+        return self.export_warm_state()
+
+    def _idle(self, seconds):
+        """周期间隙：等待期间若有新实例请求热交接则移交并返回 True"""
+        return Handoff.wait(seconds) and Handoff.serve(self._handoff_export)
 
     def check_debounce(self, filepath):
-        if not os.path.exists(filepath): return False
+        # 输入冷却按当前 mtime 判断：周期内才开始的编辑不能被周期开始时的 stat 缓存掩盖
+        FileUtils.invalidate_stat(filepath)
+        if not FileUtils.exists(filepath): return False
         mtime = FileUtils.get_mtime(filepath)
         idle = time.time() - mtime
         return idle >= Config.TYPING_COOLDOWN_SECONDS
@@ -33,7 +111,7 @@ class FusionManager:
         today_str = datetime.date.today().strftime('%Y-%m-%d')
         daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{today_str}.md")
 
-        if os.path.exists(daily_path):
+        if FileUtils.exists(daily_path):
             mtime = FileUtils.get_mtime(daily_path)
             # 如果文件在过去 60秒内被修改过，视为用户正处于"心流"状态
             if time.time() - mtime < 60:
@@ -41,18 +119,35 @@ class FusionManager:
 
         return False
 
-    def process_all_dates(self):
+    def process_all_dates(self, dates=None, source_data_by_date=None):
+        """
+        dates / source_data_by_date 供快速启动与批处理使用：指定日期与已扫描的源数据，跳过调度。
+        返回 (已处理日期, 失败日期)。
+        """
         today_str = datetime.date.today().strftime('%Y-%m-%d')
         all_dates = {today_str}
 
         # 1. 获取源任务数据 (SyncCore 内部也会过滤，这里拿到的都是合法的)
-        source_data_by_date = self.sync_core.scan_all_source_tasks()
+        if source_data_by_date is None:
+            source_data_by_date = self.sync_core.scan_all_source_tasks()
 
         # 2. 合并涉及的所有日期
         all_dates.update(source_data_by_date.keys())
 
-        # 3. 遍历处理所有日期
-        for date_str in list(all_dates):  # 使用 list 副本以防迭代中修改
+        # 3. [调度] 只处理本周期到期/有变化的日期 (见 DateScheduler)
+        if dates is not None:
+            due_dates = list(dates)
+        elif Config.SCHEDULER_ENABLED:
+            gated = [d for d in all_dates if d >= Config.SYNC_START_DATE]
+            due_dates = self.scheduler.plan(gated, source_data_by_date, today_str)
+        else:
+            due_dates = list(all_dates)
+
+        processed, failed = [], []
+        # [Parallel] 日期足够多时，通过检查的日期先收集起来，按互不相交的分组多进程处理
+        parallel = ParallelDates.enabled(len(due_dates))
+        ready = []
+        for date_str in due_dates:
 
             # --- [TIME GATE] 时间门控拦截 ---
             # 如果日期早于设定值，直接忽略，不读不写不处理
@@ -62,70 +157,293 @@ class FusionManager:
 
             daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{date_str}.md")
 
-            if os.path.exists(daily_path):
+            FileUtils.invalidate_stat(daily_path)
+            if FileUtils.exists(daily_path):
                 idle_duration = time.time() - FileUtils.get_mtime(daily_path)
                 wait_time = Config.TYPING_COOLDOWN_SECONDS - idle_duration
-                if wait_time > 0: time.sleep(wait_time)
-
-            if self.check_debounce(daily_path) or (not os.path.exists(daily_path) and date_str in source_data_by_date):
-                try:
-                    tasks_for_date = source_data_by_date.get(date_str, {})
-                    self.sync_core.process_date(date_str, tasks_for_date)
-                except Exception as e:
-                    Logger.error_once(f"sync_fail_{date_str}", f"同步异常 [{date_str}]: {e}")
+                if wait_time > 0 and not self.cooldown(daily_path, wait_time):
+                    continue
 
-                # [RESTORED] 恢复日记格式化
-                # 注意：FormatCore 现已更新为"靶向格式化"，只会触碰 # Day planner 和 # Journey
-                # 其他区域（如 Log, Sport）会被安全忽略。
-                if os.path.exists(daily_path):
-                    FormatCore.execute(daily_path)
+            if self.check_debounce(daily_path) or (not FileUtils.exists(daily_path) and date_str in source_data_by_date):
+                if parallel:
+                    ready.append(date_str)
+                    continue
+                tasks_for_date = source_data_by_date.get(date_str, {})
+                ok = self.sync_date(date_str, tasks_for_date)
+                (processed if ok else failed).append(date_str)
 
-    def run(self):
-        def _term_handler(signum, frame):
-            raise SystemExit("Received SIGTERM")
+                # 失败或正在输入 (未处理) 的日期不记录指纹，下个周期继续重试
+                if ok and Config.SCHEDULER_ENABLED:
+                    self.scheduler.done(date_str, tasks_for_date, today_str)
 
-        signal.signal(signal.SIGTERM, _term_handler)
+        if ready:
+            outcome = ParallelDates.run(self, ready, source_data_by_date)
+            for date_str in ready:
+                ok = outcome[date_str]
+                (processed if ok else failed).append(date_str)
+                if ok and Config.SCHEDULER_ENABLED:
+                    self.scheduler.done(date_str, source_data_by_date.get(date_str, {}), today_str)
+        return processed, failed
 
-        # --- [Adaptive Engine] 变速箱参数 ---
-        MIN_INTERVAL = 3.0  # 战斗模式：3秒 (0~1分钟)
-        MAX_INTERVAL = 15.0  # 巡航模式：15秒 (30分钟后)
-        RAMP_UP_TIME = 1800  # 爬坡时间：30分钟 (1800秒)
+    def cooldown(self, daily_path, wait_time):
+        """日记仍在输入冷却期：等满 wait_time 秒后继续处理该日期 (返回 True)；返回 False 则本周期跳过"""
+        with Metrics.span('cooldown_wait'):
+            time.sleep(wait_time)
+        # 等待期间用户可能继续编辑，mtime 需重新读取
+        FileUtils.invalidate_stat(daily_path)
+        return True
 
-        # 对数增长模型: I(t) = A + B * ln(t + 1)
-        A = MIN_INTERVAL
-        B = (MAX_INTERVAL - MIN_INTERVAL) / math.log(RAMP_UP_TIME + 1)
+    def sync_date(self, date_str, tasks_for_date):
+        """同步单个日期并格式化其日记，返回是否成功 (并行模式下在子进程中调用)"""
+        daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{date_str}.md")
+        ok = False
+        try:
+            with Metrics.span('process_date', date_str):
+                self.sync_core.process_date(date_str, tasks_for_date)
+            ok = True
+        except Exception as e:
+            Logger.error_once(f"sync_fail_{date_str}", f"同步异常 [{date_str}]: {e}")
 
-        Logger.info(f"🚀 启动自适应变速引擎: 活跃 {MIN_INTERVAL}s <-> 静默 {MAX_INTERVAL}s")
+        # [RESTORED] 恢复日记格式化
+        # 注意：FormatCore 现已更新为"靶向格式化"，只会触碰 # Day planner 和 # Journey
+        # 其他区域（如 Log, Sport）会被安全忽略。
+        if FileUtils.exists(daily_path):
+            with Metrics.span('format'):
+                FormatCore.execute(daily_path)
+        return ok
 
+    @contextmanager
+    def _tick_scope(self):
+        """周期框架：采样 / 统计 / 写入检测 / stat 缓存 / Tasks 区结构缓存，结束时提交暂存写入"""
+        Profiler.before_tick()
+        Metrics.begin_tick()
+        WriteGuard.next_tick()
+        FileUtils.begin_stat_cache()
+        self.sync_core.begin_tick()
         try:
-            while True:
-                # 1. 执行核心任务
+            yield
+        finally:
+            with Metrics.span('commit'):
+                FileUtils.commit_staged()
+                self.scheduler.settle()
+            FileUtils.end_stat_cache()
+            Metrics.end_tick()
+            Profiler.after_tick()
+
+    def _recording(self, kind, dates=None):
+        """[Record] 录制开启时记录这个周期的输入与输出 (见 TickRecorder)"""
+        if self.recorder is None: return nullcontext()
+        return self.recorder.tick(kind, dates)
+
+    def tick(self):
+        """单个同步周期：全局缩进修复 -> 全日期同步 -> 再次修复，并记录周期统计"""
+        with self._recording('tick'), self._tick_scope():
+            with Metrics.span('tab_fix'):
                 FormatCore.fix_broken_tab_bullets_global()
-                self.process_all_dates()
+            self.process_all_dates()
+            with Metrics.span('tab_fix'):
                 FormatCore.fix_broken_tab_bullets_global()
 
-                # 2. [感知] 用户还在吗？
-                if self.is_user_active():
-                    # 发现编辑动作！重置计时器，瞬间拉回战斗模式
-                    self.last_active_time = time.time()
+    def fast_start(self):
+        """
+        [Fast Start] 启动后先只同步今天：项目索引 + 状态库 -> 今日日记引用的源文件 -> 处理今天 -> Ready。
+        其余历史日期交给调度器在后续周期低优先级补扫 (每周期 BACKFILL_DATES_PER_TICK 个)。
+        若今日日记中有任务不在其记录的源文件里 (可能被移动/删除)，局部扫描无法判断，退回完整周期。
+        """
+        t0 = time.perf_counter()
+        today_str = datetime.date.today().strftime('%Y-%m-%d')
+        daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{today_str}.md")
+        fast = False
+        with self._recording('fast_start'):
+            with self._tick_scope():
+                self.sync_core.scan_projects()
+                bids, paths = self.sync_core.referenced_sources(daily_path)
+                source_data = self.sync_core.scan_all_source_tasks(only_paths=paths)
+                found = set()
+                for tasks in source_data.values():
+                    found.update(tasks)
+                missing = [b for b in bids if b not in found and
+                           Config.DAILY_NOTE_DIR not in self.sm.state.get(b, {}).get('source_path', Config.DAILY_NOTE_DIR)]
+                if missing:
+                    Logger.info(f"⚡ [FastStart] 今日日记中 {len(missing)} 个任务不在记录的源文件中，改为完整同步")
+                else:
+                    with Metrics.span('tab_fix'):
+                        FormatCore.fix_broken_tab_bullets_global()
+                    self.process_all_dates(dates=[today_str], source_data_by_date=source_data)
+                    fast = True
 
-                # 3. [计算] 下一次睡多久
-                idle_seconds = time.time() - self.last_active_time
+            if fast:
+                self.scheduler.begin_backfill()
+            else:
+                self.tick()
+        elapsed = time.perf_counter() - t0
+        Logger.info(f"⚡ [Ready] 首次同步完成 ({today_str}，{len(paths)} 个源文件{'，其余日期后台补扫' if fast else ''})，"
+                    f"耗时 {elapsed:.2f}s")
+        return fast
 
-                if idle_seconds < 60:
-                    # 0~1分钟：保持最高警惕
-                    dynamic_interval = MIN_INTERVAL
-                else:
-                    # 1分钟后：开始对数退避
-                    dynamic_interval = A + B * math.log(idle_seconds + 1)
+    def batch_dates(self, source_data_by_date, start=None, end=None):
+        """[Batch] 候选日期：源任务涉及的日期 + 日记目录中已有的日记，按 [start, end] 与时间门控过滤，升序"""
+        dates = set(source_data_by_date)
+        for name in FileUtils.list_dir(Config.DAILY_NOTE_DIR):
+            m = DAILY_NAME_RE.match(name)
+            if m: dates.add(m.group(1))
+        start = max(start or Config.SYNC_START_DATE, Config.SYNC_START_DATE)
+        return sorted(d for d in dates if d >= start and (end is None or d <= end))
+
+    def run_batch(self, start=None, end=None, batch_size=None, progress=False):
+        """
+        [Batch] 一次性处理 [start, end] 内的全部日期 (不走调度与主循环)，供 CLI 单次同步 / 历史补扫使用。
+        源任务只扫描一次 (等价于关闭调度时的一个完整周期)；每 batch_size 个日期提交一次暂存写入。
+        返回统计 dict: dates / processed / failed / files_written / bytes_out / elapsed。
+        """
+        t0 = time.perf_counter()
+        batch_size = max(1, batch_size or Config.BATCH_SIZE)
+        with self._tick_scope():
+            with Metrics.span('tab_fix'):
+                FormatCore.fix_broken_tab_bullets_global()
+            source_data = self.sync_core.scan_all_source_tasks()
+            dates = self.batch_dates(source_data, start, end)
+        if progress:
+            Logger.info(f"📦 [Batch] {len(dates)} 个日期待处理 ({dates[0] if dates else '-'} .. {dates[-1] if dates else '-'})")
+
+        stats = {'dates': len(dates), 'processed': 0, 'failed': [], 'files_written': 0, 'bytes_out': 0}
+
+        def _collect():
+            counters = Metrics.last_tick()['counters']
+            stats['files_written'] += counters.get('files_written', 0)
+            stats['bytes_out'] += counters.get('bytes_out', 0)
+
+        _collect()
+        for i in range(0, len(dates), batch_size):
+            with self._tick_scope():
+                processed, failed = self.process_all_dates(dates=dates[i:i + batch_size],
+                                                           source_data_by_date=source_data)
+            _collect()
+            stats['processed'] += len(processed)
+            stats['failed'].extend(failed)
+            if progress:
+                done = min(i + batch_size, len(dates))
+                elapsed = time.perf_counter() - t0
+                rate = done / elapsed if elapsed > 0 else 0.0
+                eta = (len(dates) - done) / rate if rate > 0 else 0.0
+                Logger.info(f"📦 [Batch] {done}/{len(dates)} ({done * 100 // len(dates)}%) | {rate:.1f} 日期/s | "
+                            f"写入 {stats['files_written']} 个文件 | 剩余约 {eta:.0f}s")
+
+        with self._tick_scope():
+            with Metrics.span('tab_fix'):
+                FormatCore.fix_broken_tab_bullets_global()
+        _collect()
+
+        stats['elapsed'] = time.perf_counter() - t0
+        rate = stats['processed'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
+        Logger.info(f"✅ [Batch] 完成: 处理 {stats['processed']}/{stats['dates']} 个日期，失败 {len(stats['failed'])}，"
+                    f"写入 {stats['files_written']} 个文件 ({stats['bytes_out'] / 1024:.0f} KiB)，"
+                    f"耗时 {stats['elapsed']:.2f}s，吞吐 {rate:.1f} 日期/s")
+        return stats
+
+    def plan(self, start=None, end=None):
+        """
+        [Plan] 演练 run_batch(start, end)：完整执行一遍，但写入只进入内存覆盖层、状态库与统计文件不落盘，
+        返回记录了全部预定操作与耗时的 SyncPlan。覆盖层内容在返回前丢弃，仓库保持原样。
+        演练后进程内缓存 (解析缓存 / 块位置等) 可能反映了未落盘的内容，仅用于一次性的 CLI 进程。
+        """
+        core = self.sync_core
+        plan = SyncPlan()
+        metrics_enabled = Config.METRICS_ENABLED
+        verify = core.trigger_delayed_verification
+        ticks = []
+        core.plan = plan
+        self.sm.read_only = True
+        Config.METRICS_ENABLED = False
+        core.trigger_delayed_verification = lambda *args, **kwargs: None
+        FileUtils.begin_overlay(plan.write)
+        try:
+            with self._tick_scope():
+                with Metrics.span('tab_fix'):
+                    FormatCore.fix_broken_tab_bullets_global()
+                source_data = core.scan_all_source_tasks()
+                dates = self.batch_dates(source_data, start, end)
+            ticks.append(Metrics.last_tick())
+            with self._tick_scope():
+                processed, failed = self.process_all_dates(dates=dates, source_data_by_date=source_data)
+            ticks.append(Metrics.last_tick())
+            with self._tick_scope():
+                with Metrics.span('tab_fix'):
+                    FormatCore.fix_broken_tab_bullets_global()
+            ticks.append(Metrics.last_tick())
+            plan.finish(dates, processed, failed, ticks)
+        finally:
+            FileUtils.end_overlay()
+            core.trigger_delayed_verification = verify
+            core.plan = None
+            self.sm.read_only = False
+            Config.METRICS_ENABLED = metrics_enabled
+        return plan
+
+    # --- [Adaptive Engine] 变速箱参数 ---
+    MIN_INTERVAL = 3.0  # 战斗模式：3秒 (0~1分钟)
+    MAX_INTERVAL = 15.0  # 巡航模式：15秒 (30分钟后)
+    RAMP_UP_TIME = 1800  # 爬坡时间：30分钟 (1800秒)
+
+    def cycle(self):
+        """执行一个周期并返回距下个周期的间隔 (秒)：周期 -> 定期快照 -> 活跃检测 -> 自适应间隔"""
+        # 1. 执行核心任务
+        self.tick()
+        if time.time() - self.last_snapshot >= Config.SNAPSHOT_INTERVAL:
+            self.save_snapshot()
 
-                # 封顶限制 (防止睡死)
-                if dynamic_interval > MAX_INTERVAL:
-                    dynamic_interval = MAX_INTERVAL
+        # 2. [感知] 用户还在吗？
+        if self.is_user_active():
+            # 发现编辑动作！重置计时器，瞬间拉回战斗模式
+            self.last_active_time = time.time()
 
-                time.sleep(dynamic_interval)
+        # 3. [计算] 下一次睡多久
+        # 对数增长模型: I(t) = A + B * ln(t + 1)
+        A = self.MIN_INTERVAL
+        B = (self.MAX_INTERVAL - self.MIN_INTERVAL) / math.log(self.RAMP_UP_TIME + 1)
+        idle_seconds = time.time() - self.last_active_time
+
+        if idle_seconds < 60:
+            # 0~1分钟：保持最高警惕
+            dynamic_interval = self.MIN_INTERVAL
+        else:
+            # 1分钟后：开始对数退避
+            dynamic_interval = A + B * math.log(idle_seconds + 1)
+
+        # 封顶限制 (防止睡死)
+        return min(dynamic_interval, self.MAX_INTERVAL)
+
+    def shutdown(self):
+        """退出前落盘：状态 + 启动快照 (已热交接则什么都不写)"""
+        if self.handed_off: return
+        self.sm.save()
+        self.save_snapshot()
+
+    @staticmethod
+    def install_signal_handlers():
+        def _term_handler(signum, frame):
+            raise SystemExit("Received SIGTERM")
+
+        signal.signal(signal.SIGTERM, _term_handler)
+        Profiler.install()
+
+    def run(self):
+        self.install_signal_handlers()
+        Handoff.listen()
+
+        Logger.info(f"🚀 启动自适应变速引擎: 活跃 {self.MIN_INTERVAL}s <-> 静默 {self.MAX_INTERVAL}s")
+
+        try:
+            if Config.FAST_START and not self.warm:
+                self.fast_start()
+                if self._idle(self.MIN_INTERVAL): return
+            while True:
+                if self._idle(self.cycle()): return
 
         except KeyboardInterrupt:
             raise
         finally:
-            self.sm.save()
\ No newline at end of file
+            Handoff.close()
+            if not self.handed_off:
+                Profiler.stop()
+            self.shutdown()
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+
+
+class Metrics:
+    """
+    [Tick Instrumentation] 每个周期的阶段耗时 (span) 与 I/O 计数器。
+
+    - span: 墙钟耗时，同名累加 (如 process_date 每个日期一次)，可嵌套 (discovery 内含 walk)。
+    - counter: stat / read / write / fsync 次数与字节数。
+    周期结束时写入滚动统计 (JSON + 可选 Prometheus textfile)，位于日记目录的隐藏状态区。
+    多仓库模式下按统计文件 (即仓库) 分别累计。
+    """
+    _tick = None
+    _series = {}  # METRICS_FILE -> {'history': deque, 'totals': {}, 'ticks': int}
+
+    @classmethod
+    def _current(cls):
+        series = cls._series.get(Config.METRICS_FILE)
+        if series is None:
+            series = {'history': deque(maxlen=Config.METRICS_HISTORY), 'totals': {}, 'ticks': 0}
+            cls._series[Config.METRICS_FILE] = series
+        return series
+
+    @classmethod
+    def last_tick(cls):
+        history = cls._current()['history']
+        return history[-1] if history else None
+
+    @classmethod
+    def begin_tick(cls):
+        cls._tick = {'start': time.time(), 't0': time.perf_counter(), 'spans': {}, 'calls': {},
+                     'counters': {}, 'dates': {}}
+
+    @classmethod
+    def active(cls):
+        return cls._tick is not None
+
+    @classmethod
+    def add_time(cls, name, seconds):
+        tick = cls._tick
+        if tick is None: return
+        tick['spans'][name] = tick['spans'].get(name, 0.0) + seconds
+        tick['calls'][name] = tick['calls'].get(name, 0) + 1
+
+    @classmethod
+    @contextmanager
+    def span(cls, name, date_str=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            cls.add_time(name, elapsed)
+            if date_str and cls._tick is not None:
+                cls._tick['dates'][date_str] = cls._tick['dates'].get(date_str, 0.0) + elapsed
+
+    @classmethod
+    def timed_iter(cls, name, iterable):
+        """只统计迭代器自身 (如 os.walk) 的耗时，不含调用方处理每一项的时间"""
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                cls.add_time(name, time.perf_counter() - t0)
+                return
+            cls.add_time(name, time.perf_counter() - t0)
+            yield item
+
+    @classmethod
+    def count(cls, name, n=1):
+        tick = cls._tick
+        if tick is None: return
+        tick['counters'][name] = tick['counters'].get(name, 0) + n
+
+    @classmethod
+    def detach(cls):
+        """取出进行中的周期统计 (不写入滚动统计)，供子进程交回主进程 merge()"""
+        tick, cls._tick = cls._tick, None
+        return tick
+
+    @classmethod
+    def merge(cls, tick):
+        """把 detach() 的结果累加到当前周期 (span 耗时 / 调用次数 / 计数器 / 按日期耗时)"""
+        current = cls._tick
+        if current is None or not tick: return
+        for key in ('spans', 'calls', 'counters', 'dates'):
+            dst = current[key]
+            for k, v in tick[key].items():
+                dst[k] = dst.get(k, 0) + v
+
+    @classmethod
+    def end_tick(cls):
+        tick = cls._tick
+        if tick is None: return None
+        cls._tick = None
+        record = {
+            'start': round(tick['start'], 3),
+            'total': round(time.perf_counter() - tick['t0'], 6),
+            'spans': {k: round(v, 6) for k, v in tick['spans'].items()},
+            'calls': tick['calls'],
+            'counters': tick['counters'],
+            'dates': {k: round(v, 6) for k, v in tick['dates'].items()},
+        }
+        series = cls._current()
+        series['history'].append(record)
+        series['ticks'] += 1
+        totals = series['totals']
+        for k, v in tick['counters'].items():
+            totals[k] = totals.get(k, 0) + v
+        if Config.METRICS_ENABLED:
+            cls.dump()
+        return record
+
+    @staticmethod
+    def _summarize(values):
+        vals = sorted(values)
+        n = len(vals)
+        if not n: return {}
+        return {
+            'last': values[-1],
+            'mean': round(sum(vals) / n, 6),
+            'p50': vals[n // 2],
+            'p95': vals[min(n - 1, int(n * 0.95))],
+            'max': vals[-1],
+        }
+
+    @classmethod
+    def snapshot(cls):
+        series = cls._current()
+        history = list(series['history'])
+        span_names = sorted({k for r in history for k in r['spans']})
+        counter_names = sorted({k for r in history for k in r['counters']})
+        return {
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ticks': series['ticks'],
+            'window': len(history),
+            'tick_total': cls._summarize([r['total'] for r in history]),
+            'spans': {k: cls._summarize([r['spans'].get(k, 0.0) for r in history]) for k in span_names},
+            'counters': {k: cls._summarize([r['counters'].get(k, 0) for r in history]) for k in counter_names},
+            'totals': dict(series['totals']),
+            'last_tick': history[-1] if history else None,
+        }
+
+    @classmethod
+    def _prometheus_text(cls, snap):
+        out = [
+            "# HELP dailynotes_tick_seconds Wall-clock seconds per sync tick.",
+            "# TYPE dailynotes_tick_seconds gauge",
+        ]
+        for stat, v in snap['tick_total'].items():
+            out.append(f'dailynotes_tick_seconds{{stat="{stat}"}} {v}')
+        out += [
+            "# HELP dailynotes_phase_seconds Wall-clock seconds per phase and tick.",
+            "# TYPE dailynotes_phase_seconds gauge",
+        ]
+        for name, stats in snap['spans'].items():
+            for stat, v in stats.items():
+                out.append(f'dailynotes_phase_seconds{{phase="{name}",stat="{stat}"}} {v}')
+        out += [
+            "# HELP dailynotes_io_total I/O operations and bytes since daemon start.",
+            "# TYPE dailynotes_io_total counter",
+        ]
+        for name, v in sorted(snap['totals'].items()):
+            out.append(f'dailynotes_io_total{{counter="{name}"}} {v}')
+        out += [
+            "# HELP dailynotes_ticks_total Completed sync ticks since daemon start.",
+            "# TYPE dailynotes_ticks_total counter",
+            f"dailynotes_ticks_total {snap['ticks']}",
+        ]
+        return "\n".join(out) + "\n"
+
+    @staticmethod
+    def _write_atomic(path, text):
+        # 统计文件不走 FileUtils.write_file：不计入 I/O 计数，也无需 fsync
+        dir_name = os.path.dirname(path) or '.'
+        tf = tempfile.NamedTemporaryFile('w', dir=dir_name, delete=False, encoding='utf-8')
+        try:
+            with tf:
+                tf.write(text)
+            os.replace(tf.name, path)
+        except BaseException:
+            # 写入或替换失败 (磁盘满 / 权限)：清掉临时文件，避免每个 tick 在状态目录留下 tmpXXXX
+            try: os.unlink(tf.name)
+            except OSError: pass
+            raise
+
+    @classmethod
+    def dump(cls):
+        try:
+            if not os.path.isdir(os.path.dirname(Config.METRICS_FILE)): return False
+            snap = cls.snapshot()
+            cls._write_atomic(Config.METRICS_FILE, json.dumps(snap, ensure_ascii=False, indent=2))
+            if Config.METRICS_PROM_FILE:
+                cls._write_atomic(Config.METRICS_PROM_FILE, cls._prometheus_text(snap))
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,106 @@
+import os
+import time
+from contextlib import contextmanager
+from config import Config
+from .utils import Logger
+from .profiling import Profiler
+from .manager import FusionManager
+
+
+class VaultContext:
+    """
+    一个仓库的配置与管理器。
+    Config 是进程级的类属性，activate() 把它切到本仓库 (派生路径 + 覆盖项)，deactivate() 还原覆盖项。
+    """
+
+    def __init__(self, spec):
+        if isinstance(spec, str): spec = {'root': spec}
+        self.root = os.path.abspath(spec['root'])
+        self.name = spec.get('name') or os.path.basename(self.root.rstrip(os.sep))
+        self.overrides = {k: v for k, v in spec.items() if k not in ('root', 'name')}
+        self.manager = None
+        self.next_run = 0.0
+        self.busy_seconds = 0.0  # 累计周期耗时，用于公平调度
+        self._saved = {}
+
+    def activate(self):
+        self._saved = {k: getattr(Config, k) for k in self.overrides}
+        # 覆盖项先于 use_vault 生效 (如 REL_* 子路径)，之后再覆盖一次 (如显式指定的派生路径)
+        for k, v in self.overrides.items(): setattr(Config, k, v)
+        Config.use_vault(self.root)
+        for k, v in self.overrides.items(): setattr(Config, k, v)
+        Logger.scope = self.name
+
+    def deactivate(self):
+        for k, v in self._saved.items(): setattr(Config, k, v)
+        self._saved = {}
+        Logger.scope = None
+
+    @contextmanager
+    def active(self):
+        self.activate()
+        try:
+            yield self
+        finally:
+            self.deactivate()
+
+
+class MultiVaultManager:
+    """
+    [Multi-Vault] 单进程服务 Config.VAULTS 中的多个仓库。
+
+    - 隔离: 每个仓库独立的 FusionManager (状态库 / 日期调度)、锁文件、统计文件、启动快照。
+    - 共享: 进程内的解析缓存 / 内容指纹 / 写入检测、周期调度循环 (及后续的线程/进程池)。
+    - 调度: 每次取下一个到期的仓库执行一个周期 (各自的自适应间隔)；
+      同时到期时优先累计耗时最少的仓库，避免一个大仓库的补扫饿死其他仓库。
+    某个仓库的周期异常只记录错误，不影响其他仓库。
+    """
+
+    def __init__(self, specs):
+        self.vaults = [VaultContext(spec) for spec in specs]
+        for vault in self.vaults:
+            with vault.active():
+                vault.manager = FusionManager()
+
+    def acquire_locks(self, take_over):
+        """take_over(manager) 在仓库上下文中获取 (或接管) 该仓库的锁，任何一个失败返回 False"""
+        for vault in self.vaults:
+            with vault.active():
+                if not take_over(vault.manager): return False
+                if not vault.manager.warm:
+                    vault.manager.load_snapshot()
+        return True
+
+    def _next_vault(self):
+        now = time.time()
+        return min(self.vaults, key=lambda v: (max(v.next_run, now), v.busy_seconds))
+
+    def run(self):
+        FusionManager.install_signal_handlers()
+        Logger.info(f"🚀 多仓库模式: {', '.join(v.name for v in self.vaults)}")
+        try:
+            for vault in self.vaults:
+                with vault.active():
+                    if Config.FAST_START and not vault.manager.warm:
+                        vault.manager.fast_start()
+                vault.next_run = time.time() + FusionManager.MIN_INTERVAL
+
+            while True:
+                vault = self._next_vault()
+                wait = vault.next_run - time.time()
+                if wait > 0: time.sleep(wait)
+
+                t0 = time.perf_counter()
+                with vault.active():
+                    try:
+                        interval = vault.manager.cycle()
+                    except Exception as e:
+                        Logger.error_once(f"vault_cycle_{vault.root}", f"仓库周期异常 [{vault.name}]: {e}")
+                        interval = FusionManager.MAX_INTERVAL
+                vault.busy_seconds += time.perf_counter() - t0
+                vault.next_run = time.time() + interval
+        finally:
+            Profiler.stop()
+            for vault in self.vaults:
+                with vault.active():
+                    vault.manager.shutdown()
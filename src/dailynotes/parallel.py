@@ -0,0 +1,180 @@
+import os
+import re
+import sys
+import random
+import signal
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from .utils import Logger, FileUtils
+from .metrics import Metrics
+
+# 日记中的任务回链 [[源文件#^bid|...]] (与 process_date 识别日记任务的规则一致)
+BID_LINK_RE = re.compile(r'#\^([a-zA-Z0-9]{6,})\|')
+
+
+class ParallelDates:
+    """
+    [Parallel Dates] 多进程处理互不相交的日期组 (批处理 / 历史补扫 / 首次全量同步)。
+
+    日期的“足迹”= 日记本身 + 该日期源任务所在的文件 + 日记中的块 ID (及状态库记录的源文件)
+    + 日记中链接 / 项目标题指向的文件，即 process_date 可能读改写的全部文件与状态条目。
+    足迹有交集的日期经并查集合并为一组：组内按原顺序处理，组与组在 fork 出的子进程中并行。
+    子进程的写入只暂存不提交，连同状态增量与周期统计交回主进程；
+    主进程按组顺序合并状态、统一组提交写入、失效相关缓存。子进程失败的组退回主进程逐个重做。
+    """
+    # (manager, groups, source_data)：创建进程池前设置，子进程经 fork 直接继承，不经 pickle
+    _job = None
+
+    @staticmethod
+    def available():
+        return 'fork' in multiprocessing.get_all_start_methods()
+
+    @classmethod
+    def enabled(cls, n_dates):
+        # 演练 (FileUtils 覆盖层) 的写入只存在于本进程内存中，不能分给子进程
+        return (Config.PARALLEL_DATES > 1 and n_dates >= Config.PARALLEL_MIN_DATES and cls.available()
+                and not FileUtils.in_overlay())
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    @classmethod
+    def footprint(cls, core, date_str, tasks_for_date):
+        """日期可能触及的文件 (规范化路径) 与块 ID ('^' 前缀)"""
+        daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{date_str}.md")
+        keys = {cls._key(daily_path)}
+        for bid, sd in (tasks_for_date or {}).items():
+            keys.add('^' + bid)
+            keys.add(cls._key(sd['path']))
+        text = FileUtils.read_content(daily_path) or ""
+        for bid in BID_LINK_RE.findall(text):
+            keys.add('^' + bid)
+            source_path = core.sm.state.get(bid, {}).get('source_path')
+            if source_path: keys.add(cls._key(source_path))
+        for line in text.splitlines():
+            for _, _, name, path in core.routing.links(line):
+                name = name.strip()
+                for target in (path, core.project_path_map.get(name), core.file_path_map.get(name)):
+                    if target: keys.add(cls._key(target))
+        return keys
+
+    @classmethod
+    def partition(cls, core, dates, source_data):
+        """按足迹的交集把日期分组 (并查集)，组按首个日期排列，组内保持 dates 的顺序"""
+        parent = {}
+
+        def find(k):
+            root = k
+            while parent.setdefault(root, root) != root: root = parent[root]
+            while parent[k] != root: parent[k], k = root, parent[k]
+            return root
+
+        anchors = []
+        for date_str in dates:
+            keys = iter(cls.footprint(core, date_str, source_data.get(date_str)))
+            anchor = find(next(keys))
+            for k in keys:
+                root = find(k)
+                if root != anchor: parent[root] = anchor
+            anchors.append(anchor)
+        groups = {}
+        for date_str, anchor in zip(dates, anchors):
+            groups.setdefault(find(anchor), []).append(date_str)
+        return list(groups.values())
+
+    @classmethod
+    def run(cls, manager, dates, source_data):
+        """处理 dates (已通过冷却 / 防抖检查)，返回 {date: 是否成功}；写入在返回前已提交"""
+        groups = cls.partition(manager.sync_core, dates, source_data)
+        Metrics.count('parallel_groups', len(groups))
+        if len(groups) < 2:
+            return {d: manager.sync_date(d, source_data.get(d, {})) for d in dates}
+
+        workers = min(Config.PARALLEL_DATES, len(groups))
+        Logger.info(f"🧩 [Parallel] {len(dates)} 个日期分为 {len(groups)} 组，{workers} 个进程并行")
+        # 子进程直接读磁盘，且不能继承未提交的暂存 (各自重新暂存时会删掉对方的临时文件)
+        FileUtils.commit_staged()
+        results = [None] * len(groups)
+        cls._job = (manager, groups, source_data)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=cls._init_worker) as pool:
+                # 大组先提交，缩短最后一个组的拖尾
+                order = sorted(range(len(groups)), key=lambda i: -len(groups[i]))
+                futures = [(i, pool.submit(cls._run_group, i)) for i in order]
+                for i, future in futures:
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        Logger.error_once(f"parallel_group_{groups[i][0]}",
+                                          f"并行处理失败，改为逐个处理 [{groups[i][0]} 等 {len(groups[i])} 个日期]: {e}")
+        except Exception as e:
+            Logger.error_once("parallel_pool", f"进程池不可用，改为逐个处理: {e}")
+        finally:
+            cls._job = None
+
+        outcome = {}
+        for group, result in zip(groups, results):
+            if result is None:
+                for d in group: outcome[d] = manager.sync_date(d, source_data.get(d, {}))
+            else:
+                cls._merge(manager, result)
+                outcome.update(result['dates'])
+        manager.sm.save()
+        with Metrics.span('commit'):
+            FileUtils.commit_staged()
+        return outcome
+
+    @classmethod
+    def _init_worker(cls):
+        # fork 继承了父进程的随机状态：不重新播种则各组会生成相同的块 ID
+        random.seed()
+        Logger.use_sync_output()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由主进程处理并关闭进程池
+        # 写入只暂存 (交回主进程提交)，状态只在主进程合并后保存
+        Config.WRITE_DURABILITY = 'batched'
+        cls._job[0].sm.save = lambda: None
+
+    @classmethod
+    def _run_group(cls, index):
+        """子进程：逐个处理一组日期，交回 (结果, 状态增量, 暂存写入, 写入前的文件内容, 统计)"""
+        manager, groups, source_data = cls._job
+        core, state = manager.sync_core, manager.sm.state
+        before = dict(state)
+        known_documents = set(core.documents)
+        Metrics.begin_tick()
+        try:
+            done = {d: manager.sync_date(d, source_data.get(d, {})) for d in groups[index]}
+        except BaseException:
+            FileUtils.take_staged(discard=True)
+            raise
+        finally:
+            tick = Metrics.detach()
+            sys.stdout.flush()
+        staged = FileUtils.take_staged()
+        written = {os.path.abspath(e['path']) for e in staged}
+        # update_task 每次都创建新的条目，按对象身份即可找出变化
+        delta = {bid: entry for bid, entry in state.items() if before.get(bid) is not entry}
+        delta.update((bid, None) for bid in before if bid not in state)
+        documents = {p: lines for p, lines in core.documents.items()
+                     if p not in known_documents and os.path.abspath(p) in written}
+        return {'dates': done, 'state': delta, 'staged': staged, 'documents': documents, 'metrics': tick}
+
+    @staticmethod
+    def _merge(manager, result):
+        state = manager.sm.state
+        for bid, entry in result['state'].items():
+            if entry is None: state.pop(bid, None)
+            else: state[bid] = entry
+        core = manager.sync_core
+        FileUtils.adopt_staged(result['staged'])
+        for e in result['staged']:
+            # 块位置 / Tasks 区结构以子进程写入前的内容为准，已失效
+            core.blocks.forget(e['path'])
+            core.sections.pop(e['path'], None)
+        for path, lines in result['documents'].items():
+            core.documents.setdefault(path, lines)
+        Metrics.merge(result['metrics'])
@@ -0,0 +1,134 @@
+import os
+import re
+import time
+from config import Config
+
+DAILY_FILE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})\.md$')
+
+
+class SyncPlan:
+    """
+    [Dry-Run Plan] 演练一次同步 (FusionManager.plan)：发现 -> 扫描 -> 分发 -> process_date -> 格式化全部照常执行，
+    但写入只进入 FileUtils 的内存覆盖层，状态库不落盘。这里收集其间的全部操作：
+
+    - 同步操作 (SyncCore.record): s2d / d2s / conflict / graduate / delete / append / dispatch / register，
+      每条带日期、块 ID、目标文件、涉及的块字节数与发生时刻 (相对演练开始的秒数)；
+    - 重排格式 (reformat): format / tab_fix / ingestion 阶段对文件的改写；
+    - 按文件的写入: 次数、写出字节、触发阶段、改写前后的大小。
+    周期耗时 (各阶段 span 与每个日期的 process_date 耗时) 取自 Metrics 的周期统计。
+    """
+    REFORMAT_STAGES = ('format', 'tab_fix', 'ingestion')
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.ops = []
+        self.writes = {}  # 相对路径 -> {'writes', 'bytes', 'stages', 'size_before', 'size_after', 'first_at'}
+        self.dates = []
+        self.processed = []
+        self.failed = []
+        self.spans = {}
+        self.date_seconds = {}
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _rel(path):
+        try:
+            return os.path.relpath(os.path.abspath(path), Config.ROOT_DIR)
+        except ValueError:
+            return path
+
+    def _at(self):
+        return round(time.perf_counter() - self.t0, 6)
+
+    def op(self, kind, date_str, bid, path, lines=()):
+        if callable(lines): lines = lines()
+        nbytes = sum(len(l.encode('utf-8')) for l in (lines or ()) if l is not None)
+        self.ops.append({'kind': kind, 'date': date_str, 'bid': (bid or '').lstrip('^') or None,
+                         'path': self._rel(path), 'bytes': nbytes, 'at': self._at()})
+
+    def write(self, path, stage, nbytes):
+        """FileUtils 覆盖层的写入回调"""
+        rel = self._rel(path)
+        w = self.writes.get(rel)
+        if w is None:
+            try:
+                size_before = os.path.getsize(path)
+            except OSError:
+                size_before = None  # 新建文件
+            w = self.writes[rel] = {'writes': 0, 'bytes': 0, 'stages': [], 'size_before': size_before,
+                                    'size_after': 0, 'first_at': self._at()}
+        w['writes'] += 1
+        w['bytes'] += nbytes
+        w['size_after'] = nbytes
+        if stage not in w['stages']: w['stages'].append(stage)
+        if stage in self.REFORMAT_STAGES:
+            m = DAILY_FILE_RE.match(os.path.basename(path))
+            self.op('reformat', m.group(1) if m else None, None, path)
+            self.ops[-1].update(bytes=nbytes, stage=stage)
+
+    def finish(self, dates, processed, failed, ticks):
+        """ticks: 演练期间各周期的 Metrics 统计 (end_tick 的返回值)"""
+        self.elapsed = round(time.perf_counter() - self.t0, 6)
+        self.dates, self.processed, self.failed = list(dates), list(processed), list(failed)
+        for tick in ticks:
+            if not tick: continue
+            for k, v in tick['spans'].items():
+                self.spans[k] = round(self.spans.get(k, 0.0) + v, 6)
+            for k, v in tick['dates'].items():
+                self.date_seconds[k] = round(self.date_seconds.get(k, 0.0) + v, 6)
+
+    def report(self):
+        by_kind = {}
+        per_date = {}
+        for o in self.ops:
+            k = by_kind.setdefault(o['kind'], {'count': 0, 'bytes': 0})
+            k['count'] += 1
+            k['bytes'] += o['bytes']
+            if o['date']:
+                d = per_date.setdefault(o['date'], {'ops': {}, 'bytes': 0})
+                d['ops'][o['kind']] = d['ops'].get(o['kind'], 0) + 1
+                d['bytes'] += o['bytes']
+        for date_str, seconds in self.date_seconds.items():
+            per_date.setdefault(date_str, {'ops': {}, 'bytes': 0})['seconds'] = seconds
+        return {
+            'vault': Config.ROOT_DIR,
+            'dates': self.dates,
+            'processed': len(self.processed),
+            'failed': self.failed,
+            'ops': self.ops,
+            'by_kind': by_kind,
+            'per_date': dict(sorted(per_date.items())),
+            'writes': dict(sorted(self.writes.items())),
+            'totals': {
+                'files_written': len(self.writes),
+                'writes': sum(w['writes'] for w in self.writes.values()),
+                'bytes_out': sum(w['bytes'] for w in self.writes.values()),
+                'elapsed': self.elapsed,
+                'spans': self.spans,
+            },
+        }
+
+    def summary(self, top=10):
+        """供日志输出的摘要行"""
+        rep = self.report()
+        totals = rep['totals']
+        dates = rep['dates']
+        lines = [f"🧪 [Plan] {len(dates)} 个日期 ({dates[0] if dates else '-'} .. {dates[-1] if dates else '-'})，"
+                 f"处理 {rep['processed']}，失败 {len(rep['failed'])}，演练耗时 {totals['elapsed']:.2f}s"]
+        if rep['by_kind']:
+            lines.append("   操作: " + "，".join(f"{k} {v['count']} ({v['bytes']} B)"
+                                                for k, v in sorted(rep['by_kind'].items())))
+        else:
+            lines.append("   操作: 无")
+        lines.append(f"   写入: {totals['files_written']} 个文件，{totals['writes']} 次，"
+                     f"{totals['bytes_out'] / 1024:.1f} KiB")
+        for rel, w in sorted(rep['writes'].items(), key=lambda kv: -kv[1]['bytes'])[:top]:
+            before = '新建' if w['size_before'] is None else f"{w['size_before']} B"
+            lines.append(f"     {rel}: {w['writes']} 次 [{', '.join(str(s) for s in w['stages'])}] "
+                         f"{before} -> {w['size_after']} B")
+        if len(rep['writes']) > top:
+            lines.append(f"     ... 其余 {len(rep['writes']) - top} 个文件见 --json")
+        slow = sorted(self.date_seconds.items(), key=lambda kv: -kv[1])[:5]
+        if slow:
+            lines.append("   最慢日期: " + "，".join(f"{d} {s * 1000:.0f}ms" for d, s in slow))
+        return lines
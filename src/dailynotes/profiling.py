@@ -0,0 +1,149 @@
+import os
+import io
+import time
+import signal
+import pstats
+import cProfile
+import tracemalloc
+from config import Config
+from .utils import Logger
+
+
+class Profiler:
+    """
+    [On-Demand Profiling] 不重启守护进程，对接下来的 N 个周期开启 cProfile + tracemalloc。
+
+    触发方式 (任选其一):
+      - kill -USR1 <pid>                  -> 采样 Config.PROFILE_TICKS 个周期
+      - 在日记目录创建控制文件 (内容可写 N) -> 采样 N 个周期，文件读取后即删除
+    结果写入 .sync_state.json 同目录的带时间戳文件:
+      .sync_profile_<ts>.pstats (可用 pstats / snakeviz 打开) 与 .sync_profile_<ts>.txt (摘要)。
+    """
+    _requested = 0     # 信号处理器只写这个整数，其他工作都在主循环里做
+    _remaining = 0
+    _profile = None
+    _started_at = None
+    _ticks_done = 0
+    _tick_seconds = 0.0
+    _tick_t0 = None
+    _owns_tracemalloc = False  # tracemalloc 由本次采样启动 (PYTHONTRACEMALLOC 等已在跟踪时结束采样不停止它)
+
+    @classmethod
+    def install(cls):
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, cls._signal_handler)
+
+    @classmethod
+    def _signal_handler(cls, signum, frame):
+        cls._requested = Config.PROFILE_TICKS
+
+    @classmethod
+    def request(cls, ticks=None):
+        cls._requested = ticks or Config.PROFILE_TICKS
+
+    @classmethod
+    def is_running(cls):
+        return cls._profile is not None
+
+    @classmethod
+    def _poll_control_file(cls):
+        path = Config.PROFILE_CONTROL_FILE
+        if not path or not os.path.exists(path): return
+        ticks = Config.PROFILE_TICKS
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = f.read().strip()
+            if raw: ticks = max(1, int(raw))
+        except (OSError, ValueError):
+            pass
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        cls._requested = ticks
+
+    @classmethod
+    def before_tick(cls):
+        cls._poll_control_file()
+        if cls._requested and cls._profile is None:
+            cls._start(cls._requested)
+        cls._requested = 0
+        if cls._profile is not None:
+            cls._tick_t0 = time.perf_counter()
+            cls._profile.enable()
+
+    @classmethod
+    def after_tick(cls):
+        if cls._profile is None or cls._tick_t0 is None: return
+        cls._profile.disable()
+        cls._tick_seconds += time.perf_counter() - cls._tick_t0
+        cls._tick_t0 = None
+        cls._ticks_done += 1
+        cls._remaining -= 1
+        if cls._remaining <= 0:
+            cls.stop()
+
+    @classmethod
+    def _start(cls, ticks):
+        Logger.info(f"🔬 [Profile] 开始采样接下来 {ticks} 个周期 (cProfile + tracemalloc)")
+        cls._profile = cProfile.Profile()
+        cls._remaining = ticks
+        cls._ticks_done = 0
+        cls._tick_seconds = 0.0
+        cls._started_at = time.time()
+        cls._owns_tracemalloc = not tracemalloc.is_tracing()
+        if cls._owns_tracemalloc:
+            tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+
+    @classmethod
+    def stop(cls):
+        """结束采样并落盘 (周期数用尽或进程退出时调用)"""
+        prof = cls._profile
+        if prof is None: return None
+        if cls._tick_t0 is not None:
+            prof.disable()
+            cls._tick_t0 = None
+        cls._profile = None
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if cls._owns_tracemalloc:
+            tracemalloc.stop()
+            cls._owns_tracemalloc = False
+
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(cls._started_at))
+        base = os.path.join(os.path.dirname(Config.STATE_FILE), f".sync_profile_{stamp}")
+        try:
+            prof.dump_stats(base + ".pstats")
+            report = cls._build_report(prof, snapshot, current, peak)
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(report)
+            Logger.info(f"🔬 [Profile] 采样结束 ({cls._ticks_done} 个周期)，峰值内存 {peak / 1048576:.1f} MiB -> {base}.txt")
+            return base
+        except Exception as e:
+            Logger.error_once(f"profile_dump_{stamp}", f"Profile 落盘失败: {e}")
+            return None
+
+    @classmethod
+    def _build_report(cls, prof, snapshot, current, peak):
+        top_n = Config.PROFILE_TOP_N
+        out = io.StringIO()
+        out.write(f"# Profile {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cls._started_at))}\n")
+        out.write(f"ticks: {cls._ticks_done}\n")
+        out.write(f"profiled wall time: {cls._tick_seconds:.3f}s\n")
+        out.write(f"traced memory: current {current / 1048576:.2f} MiB, peak {peak / 1048576:.2f} MiB\n")
+
+        for sort_key in ('cumulative', 'tottime'):
+            out.write(f"\n## Hottest functions (by {sort_key})\n")
+            stats = pstats.Stats(prof, stream=out)
+            stats.strip_dirs().sort_stats(sort_key).print_stats(top_n)
+
+        out.write("\n## Top allocation sites (by size)\n")
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        for stat in snapshot.statistics('lineno')[:top_n]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
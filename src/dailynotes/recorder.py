@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import base64
+import random
+import shutil
+import hashlib
+from contextlib import contextmanager
+from config import Config
+from .utils import Logger, FileUtils
+from .metrics import Metrics
+
+# 录制格式版本：结构变化时递增，重放工具拒绝不认识的版本
+RECORD_SCHEMA = 1
+
+# 指向仓库内的派生路径与仓库列表：重放时由 Config.use_vault(临时目录) 重新派生，不随录制保存
+VAULT_KEYS = ('VAULT_ROOT', 'ROOT_DIR', 'VAULTS', 'RECORD_DIR')
+
+
+class TickRecorder:
+    """
+    [Record] 录制守护进程每个周期的输入与输出，供 scripts/replay.py 在临时目录中离线重放。
+
+    会话目录 (RECORD_DIR/<时间>-<仓库名>/):
+      meta.json   - 仓库路径、引擎类型、Config 取值 (仓库路径除外)
+      base/       - 第一个周期开始前的全部 Markdown 文件 (保留 mtime)
+      state.json  - 同一时刻的状态库 (源文件路径改为相对仓库)
+      ticks.jsonl - 每个周期一行：
+          time / kind (tick | fast_start | sync_now) / dates / seed (本周期的随机种子，块 ID 由它生成)
+          inputs  - 上个周期结束后被外部修改的文件: 相对路径 -> {text | b64, mtime_ns}，删除为 null
+          read_inputs - 周期开始后才被外部修改、又被引擎在本周期读到的文件：引擎读到的内容 (格式同 inputs)，
+                    重放时在周期开始前写入
+          outputs - 本周期有变化的文件 (自身写入，或读到后未再改动的 read_inputs): 相对路径 -> {md5, mtime_ns, text | b64}；
+                    引擎读取之后又被外部修改、无法比对的文件为 {external: true}
+          state   - 状态库增量: bid -> 条目 (删除为 null)
+          elapsed / spans - 录制时的周期耗时
+    输入 / 输出按 (mtime_ns, size) 判定：周期前后各遍历一次仓库，只读取有变化的文件；
+    自身写入的判定依据是 FileUtils 在写入时登记的签名。周期内的读取经 FileUtils.observe_reads 观察：
+    读到的签名既不是周期开始时的、也不是先前读取 / 写入时登记的，即为周期中途的外部修改。
+    并行处理 (--jobs) 子进程中的读取不被观察。录制有额外开销 (两次遍历 + 变化文件的内容)，只用于诊断。
+    """
+
+    def __init__(self, manager, record_dir):
+        self.manager = manager
+        self.root = Config.VAULT_ROOT
+        name = os.path.basename(self.root.rstrip(os.sep)) or 'vault'
+        self.dir = os.path.join(record_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}")
+        self.sigs = None  # 相对路径 -> (mtime_ns, size)：重放目录此刻应有的文件
+        self.depth = 0
+        self.count = 0
+        self.read_inputs = {}  # 本周期中途的外部修改 (引擎读到的内容)
+        self.reread = set()    # 引擎读取之后又被外部修改的文件
+
+    # ---------- 仓库遍历 ----------
+
+    @staticmethod
+    def _included_dir(path):
+        """排除目录中只保留日记目录及其上级 (附件目录默认被排除，日记目录在其中)"""
+        if not FileUtils.is_excluded(path): return True
+        daily = os.path.normpath(Config.DAILY_NOTE_DIR)
+        path = os.path.normpath(path)
+        return daily == path or daily.startswith(path + os.sep)
+
+    @classmethod
+    def scan(cls, root):
+        """仓库 (Config 当前指向的仓库) 中同步引擎会读取的 Markdown 文件: 相对路径 -> (mtime_ns, size)"""
+        sigs = {}
+        daily = os.path.normpath(Config.DAILY_NOTE_DIR)
+        for dirpath, dirnames, files in os.walk(root):
+            dirnames[:] = [d for d in dirnames
+                           if not d.startswith('.') and cls._included_dir(os.path.join(dirpath, d))]
+            if FileUtils.is_excluded(dirpath) and os.path.normpath(dirpath) != daily: continue
+            for f in files:
+                if not f.endswith('.md'): continue
+                path = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                sigs[os.path.relpath(path, root)] = (st.st_mtime_ns, st.st_size)
+        return sigs
+
+    @staticmethod
+    def encode(data):
+        """文件内容 -> JSON 条目 (非 UTF-8 内容用 base64)"""
+        try:
+            return {'text': data.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'b64': base64.b64encode(data).decode('ascii')}
+
+    @staticmethod
+    def decode(entry):
+        if 'b64' in entry:
+            return base64.b64decode(entry['b64'])
+        return entry['text'].encode('utf-8')
+
+    def _read(self, rel):
+        try:
+            with open(os.path.join(self.root, rel), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # ---------- 状态库 ----------
+
+    @staticmethod
+    def export_entry(entry, root):
+        """状态条目 -> 可移植形式 (源文件路径相对仓库)"""
+        entry = dict(entry)
+        if entry.get('source_path'): entry['source_path'] = os.path.relpath(entry['source_path'], root)
+        return entry
+
+    @staticmethod
+    def import_entry(entry, root):
+        entry = dict(entry)
+        if entry.get('source_path'):
+            entry['source_path'] = os.path.normcase(os.path.abspath(os.path.join(root, entry['source_path'])))
+        return entry
+
+    # ---------- 录制 ----------
+
+    def _config_values(self):
+        values = {}
+        for k, v in vars(Config).items():
+            if not k.isupper() or k in VAULT_KEYS: continue
+            if isinstance(v, str) and v.startswith(self.root): continue
+            if isinstance(v, list) and any(isinstance(x, str) and x.startswith(self.root) for x in v): continue
+            try:
+                json.dumps(v)
+            except (TypeError, ValueError):
+                continue
+            values[k] = v
+        return values
+
+    def _start(self):
+        """第一个周期之前：保存仓库文件基线、状态库与配置"""
+        os.makedirs(os.path.join(self.dir, 'base'), exist_ok=True)
+        self.sigs = self.scan(self.root)
+        for rel in self.sigs:
+            dst = os.path.join(self.dir, 'base', rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(os.path.join(self.root, rel), dst)
+        state = {bid: self.export_entry(e, self.root) for bid, e in self.manager.sm.state.items()}
+        with open(os.path.join(self.dir, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        meta = {'schema': RECORD_SCHEMA, 'vault': self.root, 'created': time.time(),
+                'engine': type(self.manager).__name__, 'config': self._config_values()}
+        with open(os.path.join(self.dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        Logger.info(f"⏺️ [Record] 录制周期输入到 {self.dir} ({len(self.sigs)} 个文件基线)")
+
+    def _inputs(self):
+        """上个周期结束后的外部修改 (新增 / 修改 / 删除)"""
+        current = self.scan(self.root)
+        inputs = {}
+        for rel, sig in current.items():
+            if self.sigs.get(rel) == sig: continue
+            data = self._read(rel)
+            if data is None: continue
+            inputs[rel] = dict(self.encode(data), mtime_ns=sig[0])
+            self.sigs[rel] = sig
+        for rel in [r for r in self.sigs if r not in current]:
+            inputs[rel] = None
+            del self.sigs[rel]
+        return inputs
+
+    def _on_read(self, path, st, raw):
+        """FileUtils 读取回调：记录引擎在本周期读到的、周期开始后才出现的外部内容"""
+        path = os.path.abspath(path)
+        if not path.endswith('.md') or not path.startswith(os.path.join(os.path.abspath(self.root), '')): return
+        rel = os.path.relpath(path, self.root)
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig == self.sigs.get(rel) or sig == FileUtils.read_signature(path): return
+        if rel in self.read_inputs:
+            # 同一周期内第二次读到新的外部内容：重放只能在周期开始前写入一次，不参与比对
+            self.reread.add(rel)
+            return
+        self.read_inputs[rel] = dict(self.encode(raw), mtime_ns=sig[0])
+
+    def _outputs(self):
+        """本周期有变化的文件：与写入 / 读取时登记的签名一致的是引擎看到的内容，其余留给下个周期作为输入"""
+        outputs = {}
+        for rel, sig in self.scan(self.root).items():
+            if self.sigs.get(rel) == sig: continue
+            if rel in self.reread or FileUtils.read_signature(os.path.join(self.root, rel)) != sig:
+                outputs[rel] = {'external': True}
+                continue
+            data = self._read(rel)
+            if data is None: continue
+            outputs[rel] = dict(self.encode(data), md5=hashlib.md5(data).hexdigest(), mtime_ns=sig[0])
+            self.sigs[rel] = sig
+        return outputs
+
+    @contextmanager
+    def tick(self, kind, dates=None):
+        """包住一个周期 (嵌套调用只记录最外层，如快速启动退回完整周期)"""
+        self.depth += 1
+        if self.depth > 1:
+            try:
+                yield
+            finally:
+                self.depth -= 1
+            return
+        record = None
+        try:
+            if self.sigs is None: self._start()
+            state = self.manager.sm.state
+            before = dict(state)
+            inputs = self._inputs()
+            record = {'tick': self.count, 'time': time.time(), 'kind': kind, 'dates': dates,
+                      'seed': int.from_bytes(os.urandom(8), 'big'), 'inputs': inputs}
+        except Exception as e:
+            Logger.error_once("record_begin", f"录制失败，本周期不录制: {e}")
+        try:
+            if record is not None:
+                random.seed(record['seed'])
+                self.read_inputs, self.reread = {}, set()
+                FileUtils.observe_reads(self._on_read)
+            t0 = time.perf_counter()
+            yield
+        finally:
+            self.depth -= 1
+            if record is not None:
+                FileUtils.observe_reads(None)
+                record['elapsed'] = round(time.perf_counter() - t0, 6)
+                record['read_inputs'] = self.read_inputs
+                self._finish(record, before)
+
+    def _finish(self, record, before):
+        try:
+            state = self.manager.sm.state
+            # update_task 每次都创建新的条目，按对象身份即可找出变化
+            delta = {bid: self.export_entry(e, self.root) for bid, e in state.items() if before.get(bid) is not e}
+            delta.update((bid, None) for bid in before if bid not in state)
+            last = Metrics.last_tick()
+            record.update(outputs=self._outputs(), state=delta, spans=last['spans'] if last else {})
+            with open(os.path.join(self.dir, 'ticks.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.count += 1
+        except Exception as e:
+            Logger.error_once("record_write", f"录制写入失败: {e}")
@@ -0,0 +1,205 @@
+import os
+import time
+import heapq
+import hashlib
+import datetime
+from config import Config
+from .utils import Logger, FileUtils
+from .metrics import Metrics
+
+
+class DateScheduler:
+    """
+    [Tiered Scheduler] 决定本周期处理哪些日期，避免周期耗时随历史长度线性增长。
+
+    分层:
+      hot  - 今天 + 最近 SCHEDULER_HOT_SECONDS 内被外部编辑过的日记: 每个周期都处理
+      warm - 距今 SCHEDULER_WARM_DAYS 天内: 每 SCHEDULER_WARM_INTERVAL 秒一次
+      cold - 更早的日期: 每 SCHEDULER_COLD_INTERVAL 秒慢速轮询，每周期最多 SCHEDULER_COLD_BATCH 个
+    任何层级的日期只要指纹变化 (日记 mtime/size 或该日期源任务内容) 就立即处理。
+
+    实现为最小堆 (到期时间, 层级, 新近度, 日期)，过期堆项惰性丢弃。
+
+    补扫 (快速启动之后): 从未处理过的非 hot 日期每周期最多 BACKFILL_DATES_PER_TICK 个，
+    排在 hot 与已知变化的日期之后，直到全部日期都处理过一次。
+    """
+    HOT, WARM, COLD = 0, 1, 2
+    TIER_NAMES = ('hot', 'warm', 'cold')
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}           # date -> 当前有效堆项的到期时间
+        self._fingerprints = {}  # date -> 上次成功处理后的指纹
+        self._edited_at = {}     # date -> 最近一次发现日记被外部修改的时间 (自身写入已计入指纹，不算)
+        self._unsettled = set()  # 处理完成时日记仍是暂存写入的日期：指纹中的日记 mtime 待提交后补上
+        self._backfill = None    # 补扫进度 {'start', 'done'}，None 表示未在补扫
+
+    @staticmethod
+    def _daily_path(date_str):
+        return os.path.join(Config.DAILY_NOTE_DIR, f"{date_str}.md")
+
+    @staticmethod
+    def fingerprint(date_str, tasks_for_date):
+        """
+        日记 (mtime, 是否存在) + 该日期全部源任务 (bid / 内容哈希 / 路径 / 日期标记) 的摘要。
+        日记有未提交的暂存写入时 mtime 尚未确定，记为 None (见 settle)。
+        """
+        daily_path = DateScheduler._daily_path(date_str)
+        if FileUtils.is_staged(daily_path):
+            daily_sig = None
+        else:
+            daily_sig = FileUtils.get_mtime(daily_path) if FileUtils.exists(daily_path) else None
+        h = hashlib.md5()
+        for bid in sorted(tasks_for_date or {}):
+            t = tasks_for_date[bid]
+            h.update(f"{bid}\0{t.get('hash')}\0{t.get('path')}\0{t.get('dates')}\0{t.get('indent')}\n".encode('utf-8'))
+        return (daily_sig, h.hexdigest())
+
+    def tier(self, date_str, today_str, now=None):
+        if date_str == today_str: return self.HOT
+        now = now or time.time()
+        if now - self._edited_at.get(date_str, 0) < Config.SCHEDULER_HOT_SECONDS:
+            return self.HOT
+        try:
+            age = abs((datetime.date.fromisoformat(date_str) - datetime.date.fromisoformat(today_str)).days)
+        except ValueError:
+            return self.COLD
+        return self.WARM if age <= Config.SCHEDULER_WARM_DAYS else self.COLD
+
+    @staticmethod
+    def _interval(tier):
+        if tier == DateScheduler.HOT: return 0
+        if tier == DateScheduler.WARM: return Config.SCHEDULER_WARM_INTERVAL
+        return Config.SCHEDULER_COLD_INTERVAL
+
+    @staticmethod
+    def _recency(date_str):
+        # 同一到期时间与层级内，越新的日期越先处理
+        return -int(date_str.replace('-', '')) if date_str[:4].isdigit() else 0
+
+    def _push(self, date_str, due, tier):
+        self._due[date_str] = due
+        heapq.heappush(self._heap, (due, tier, self._recency(date_str), date_str))
+
+    def plan(self, candidates, source_data_by_date, today_str=None, now=None):
+        """返回本周期应处理的日期 (按优先级排序)，同时记录本周期各层的计数"""
+        now = now or time.time()
+        today_str = today_str or datetime.date.today().strftime('%Y-%m-%d')
+        candidates = set(candidates)
+        tiers = {}
+
+        for date_str in candidates:
+            fp = self.fingerprint(date_str, source_data_by_date.get(date_str))
+            prev = self._fingerprints.get(date_str)
+            # 上次的日记 mtime 未确定 (暂存写入尚未提交) 时无从判断是否被外部修改
+            if prev is not None and fp[0] != prev[0] and date_str not in self._unsettled:
+                self._edited_at[date_str] = now
+            tier = self.tier(date_str, today_str, now)
+            tiers[date_str] = tier
+            if tier == self.HOT or fp != prev:
+                if self._due.get(date_str) != 0: self._push(date_str, 0, tier)
+            elif date_str not in self._due:
+                self._push(date_str, now, tier)
+
+        selected, deferred = [], []
+        cold_swept = 0
+        backfilled = 0
+        while self._heap and self._heap[0][0] <= now:
+            due, tier, _, date_str = heapq.heappop(self._heap)
+            if self._due.get(date_str) != due: continue  # 已被更新的旧堆项
+            if date_str not in candidates:
+                del self._due[date_str]
+                continue
+            tier = tiers[date_str]
+            if self._backfill is not None and tier != self.HOT and date_str not in self._fingerprints:
+                # 补扫限量，其余保持到期状态留给后续周期
+                if backfilled >= Config.BACKFILL_DATES_PER_TICK:
+                    deferred.append((date_str, due, tier))
+                    continue
+                backfilled += 1
+            elif due > 0 and tier == self.COLD:
+                # 慢速轮询 (无变化的冷日期) 限量，剩余的留到下个周期
+                if cold_swept >= Config.SCHEDULER_COLD_BATCH:
+                    deferred.append((date_str, due, tier))
+                    continue
+                cold_swept += 1
+            del self._due[date_str]
+            selected.append(date_str)
+        for date_str, due, tier in deferred:
+            self._push(date_str, due, tier)
+
+        if self._backfill is not None:
+            self._backfill['done'] += backfilled
+            Metrics.count('dates_backfilled', backfilled)
+            if not deferred and all(d in self._fingerprints or d in selected for d in candidates):
+                elapsed = time.time() - self._backfill['start']
+                done = self._backfill['done']
+                Logger.info(f"📚 [Backfill] 历史日期补扫完成: {done} 个日期，用时 {elapsed:.1f}s "
+                            f"({done / elapsed if elapsed > 0 else 0:.1f} 日期/s)")
+                self._backfill = None
+
+        Metrics.count('dates_candidates', len(candidates))
+        Metrics.count('dates_scheduled', len(selected))
+        for date_str in selected:
+            Metrics.count(f'dates_scheduled.{self.TIER_NAMES[tiers[date_str]]}')
+        return selected
+
+    def begin_backfill(self):
+        self._backfill = {'start': time.time(), 'done': 0}
+
+    def backfilling(self):
+        return self._backfill is not None
+
+    def done(self, date_str, tasks_for_date, today_str=None):
+        """日期处理成功后调用：记录处理后的指纹，并按层级安排下一次轮询"""
+        today_str = today_str or datetime.date.today().strftime('%Y-%m-%d')
+        now = time.time()
+        self._fingerprints[date_str] = self.fingerprint(date_str, tasks_for_date)
+        if FileUtils.is_staged(self._daily_path(date_str)):
+            self._unsettled.add(date_str)
+        else:
+            self._unsettled.discard(date_str)
+        tier = self.tier(date_str, today_str, now)
+        self._push(date_str, now + self._interval(tier), tier)
+
+    def settle(self):
+        """
+        暂存写入提交之后调用 (周期结束)：为处理时日记仍在暂存的日期补上提交后的真实 mtime。
+        提交失败 (磁盘内容不是我们写出的) 的日期丢弃指纹，下个周期重新处理；演练覆盖层中的写入不会提交，保持待定。
+        """
+        for date_str in list(self._unsettled):
+            daily_path = self._daily_path(date_str)
+            if FileUtils.is_staged(daily_path): continue
+            self._unsettled.discard(date_str)
+            fp = self._fingerprints.get(date_str)
+            if fp is None: continue
+            if FileUtils.known_digest(daily_path) is None:
+                del self._fingerprints[date_str]
+            else:
+                self._fingerprints[date_str] = (FileUtils.get_mtime(daily_path), fp[1])
+
+    def export_state(self):
+        return {'fingerprints': dict(self._fingerprints), 'edited_at': dict(self._edited_at),
+                'due': dict(self._due), 'backfill': dict(self._backfill) if self._backfill else None}
+
+    def load_state(self, data):
+        """导入 export_state() 的结果 (热交接)：已处理过的日期按原到期时间继续轮询，不会被当作新日期重扫"""
+        self._fingerprints = dict(data.get('fingerprints') or {})
+        self._edited_at = dict(data.get('edited_at') or {})
+        self._backfill = data.get('backfill')
+        self._unsettled = set()
+        self._due = {}
+        self._heap = []
+        for date_str, due in (data.get('due') or {}).items():
+            self._push(date_str, due, self.WARM)
+
+    def forget(self, date_str=None):
+        """丢弃指纹 (全部或单个日期)，使其下个周期被重新处理"""
+        if date_str is None:
+            self._fingerprints.clear()
+            self._edited_at.clear()
+            self._unsettled.clear()
+        else:
+            self._fingerprints.pop(date_str, None)
+            self._edited_at.pop(date_str, None)
+            self._unsettled.discard(date_str)
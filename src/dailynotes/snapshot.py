@@ -0,0 +1,78 @@
+import os
+import time
+import pickle
+import tempfile
+from config import Config
+from .utils import Logger
+
+# 快照文件格式版本：结构变化时递增，旧快照直接忽略 (冷启动)
+SNAPSHOT_SCHEMA = 1
+
+
+class Snapshot:
+    """
+    [Warm-Start Snapshot] 把热缓存 (仓库索引 / 解析缓存 / 内容指纹 / 调度指纹) 持久化到日记目录，
+    退出时与周期性写入；冷启动时载入，按文件 stat 校验后只重新解析停机期间变化的文件。
+    内容即 FusionManager.export_warm_state()，外加 schema 版本与 .sync_state.json 的签名。
+    """
+
+    @staticmethod
+    def _state_sig():
+        try:
+            st = os.stat(Config.STATE_FILE)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def save(warm_state):
+        path = Config.SNAPSHOT_FILE
+        if not path or not os.path.isdir(os.path.dirname(path)): return False
+        payload = {'schema': SNAPSHOT_SCHEMA, 'created': time.time(), 'state_sig': Snapshot._state_sig(),
+                   'warm': warm_state}
+        temp_name = None
+        try:
+            # 与统计文件一样不走 FileUtils：不计入 I/O 计数，丢失也只是退化为冷启动
+            with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), delete=False) as tf:
+                temp_name = tf.name
+                pickle.dump(payload, tf, protocol=pickle.HIGHEST_PROTOCOL)
+            # 载入时会 unpickle：只允许本用户读写
+            os.chmod(temp_name, 0o600)
+            os.replace(temp_name, path)
+            return True
+        except Exception as e:
+            Logger.error_once("snapshot_save", f"启动快照写入失败: {e}")
+            if temp_name and os.path.exists(temp_name):
+                try:
+                    os.remove(temp_name)
+                except OSError:
+                    pass
+            return False
+
+    @staticmethod
+    def _trusted(st):
+        """pickle 可执行任意代码：只载入本用户拥有、且组 / 其他用户不可写的快照 (无 getuid 的平台不检查)"""
+        if not hasattr(os, 'getuid'): return True
+        return st.st_uid == os.getuid() and st.st_mode & 0o022 == 0
+
+    @staticmethod
+    def load():
+        """返回快照中的热状态；不存在 / 版本不符 / 损坏 / 权限不可信时返回 None"""
+        path = Config.SNAPSHOT_FILE
+        if not path or not os.path.exists(path): return None
+        try:
+            with open(path, 'rb') as f:
+                if not Snapshot._trusted(os.fstat(f.fileno())):
+                    Logger.error_once("snapshot_untrusted", f"启动快照属主或权限不可信，忽略: {path}")
+                    return None
+                payload = pickle.load(f)
+        except Exception as e:
+            Logger.error_once("snapshot_load", f"启动快照损坏，忽略: {e}")
+            return None
+        if not isinstance(payload, dict) or payload.get('schema') != SNAPSHOT_SCHEMA: return None
+        warm = payload.get('warm')
+        if not isinstance(warm, dict): return None
+        if payload.get('state_sig') != Snapshot._state_sig():
+            # 状态库在快照之后被改动 (或被替换)：日期调度指纹不再可信，全部日期重新处理
+            warm = dict(warm, scheduler={})
+        return warm
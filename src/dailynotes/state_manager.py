@@ -7,20 +7,25 @@ import shutil
 import unicodedata
 from config import Config
 from .utils import Logger
+from .metrics import Metrics
 
 
 class StateManager:
     def __init__(self):
         self.state = {}
+        # 创建时绑定当前仓库的状态文件 (多仓库模式下 Config 会在仓库之间切换)
+        self.state_file = Config.STATE_FILE
+        # [Plan] 演练时只在内存中更新，不落盘
+        self.read_only = False
         self.load()
 
     def load(self):
-        backup_file = Config.STATE_FILE + ".bak"
+        backup_file = self.state_file + ".bak"
 
         # 1. 尝试主文件
-        if os.path.exists(Config.STATE_FILE):
+        if os.path.exists(self.state_file):
             try:
-                with open(Config.STATE_FILE, 'r', encoding='utf-8') as f:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
                     self.state = json.load(f)
                 return
             except Exception:
@@ -37,22 +42,27 @@ class StateManager:
                 Logger.error_once("state_load_bak", "备份文件也损坏！")
 
         # 3. 完全失败 -> 重置
-        if os.path.exists(Config.STATE_FILE) or os.path.exists(backup_file):
+        if os.path.exists(self.state_file) or os.path.exists(backup_file):
             Logger.info("\033[91m[CRITICAL] 状态文件严重损坏，且无法恢复！已重置为空状态。\033[0m")
 
         self.state = {}
 
     def save(self):
+        if self.read_only: return
+        with Metrics.span('state_save'):
+            self._save()
+
+    def _save(self):
         try:
             # 1. 先创建备份（安全保障）
-            if os.path.exists(Config.STATE_FILE):
+            if os.path.exists(self.state_file):
                 try:
-                    shutil.copy2(Config.STATE_FILE, Config.STATE_FILE + ".bak")
+                    shutil.copy2(self.state_file, self.state_file + ".bak")
                 except OSError:
                     pass
 
             # 2. 写入新状态
-            with open(Config.STATE_FILE, 'w', encoding='utf-8') as f:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(self.state, f, ensure_ascii=False, indent=2)
         except Exception as e:
             Logger.error_once("state_save", f"状态保存失败: {e}")
@@ -0,0 +1,148 @@
+import re
+from ..utils import FileUtils
+from ..metrics import Metrics
+from .parsing import capture_block
+
+# 与 process_date 逐行扫描源文件时的块 ID 识别规则一致
+BID_RE = re.compile(r'\^([a-zA-Z0-9]{6,})\s*$')
+CONNECT_BID_RE = re.compile(r'\(connect::.*?\^([a-zA-Z0-9]{6,})\)')
+DATE_HEADER_RE = re.compile(r'^#+\s*\[\[\s*(\d{4}-\d{2}-\d{2})\s*\]\]')
+
+
+def line_bid(line):
+    m = BID_RE.search(line) or CONNECT_BID_RE.search(line)
+    return m.group(1) if m else None
+
+
+class BlockIndex:
+    """
+    [Block Index] 块 ID -> 在源文件中的位置 (path, start, length, date, hash)。
+
+    - ingestion 解析 (含解析缓存命中) 时按文件登记；
+    - 我们自己回写源文件后按写入内容重新登记 (reindex)。
+    位置只是提示：locate() 会在当前文件内容上逐块校验 (起始行的块 ID + capture_block 长度)，
+    任何一块对不上 (文件在别处被改动 / 同一文件内重复 ID / 未登记) 都返回 None，
+    调用方退回逐行扫描，因此索引过期不会影响正确性。
+    另记录我们写出的“规范化”内容 (inject_into_task_section 的不动点) 的指纹：
+    文件仍是这份内容时，可直接在 Tasks 区结构上增删块 (rendering.TaskSection)。
+    """
+
+    def __init__(self):
+        self._blocks = {}   # bid -> (path, start, length, date, hash)
+        self._by_path = {}  # path -> {bid}
+        self._unsafe = set()  # 含重复 ID 的文件：只能逐行扫描
+        self._canonical = {}  # path -> 规范化内容的 md5
+
+    def forget(self, path):
+        for bid in self._by_path.pop(path, ()):
+            if self._blocks.get(bid, (None,))[0] == path:
+                del self._blocks[bid]
+        self._unsafe.discard(path)
+
+    def clear(self):
+        self._blocks.clear()
+        self._by_path.clear()
+        self._unsafe.clear()
+        self._canonical.clear()
+
+    def _record(self, path, bids, bid, start, length, date, content_hash):
+        if bid in bids: self._unsafe.add(path)
+        bids.add(bid)
+        self._blocks[bid] = (path, start, length, date, content_hash)
+
+    def record_file(self, path, entries):
+        """ingestion 结果：[(task_date, bid, task)]，块占文件的 [task['line'], task['end']) 行"""
+        self.forget(path)
+        bids = self._by_path[path] = set()
+        for task_date, bid, task in entries:
+            start = task.get('line')
+            if start is None:
+                self._unsafe.add(path)
+                continue
+            self._record(path, bids, bid, start, task['end'] - start, task_date, task.get('hash'))
+
+    def reindex(self, path, lines, hash_of=None, canonical=False):
+        """
+        按写入后的内容重新登记整个文件的任务块；hash_of(bid) 提供内容哈希 (如状态库中的记录)。
+        canonical=True 表示 lines 是 inject_into_task_section 的输出。
+        """
+        self.forget(path)
+        bids = self._by_path[path] = set()
+        in_section, current_date = False, None
+        seen_dated = undated_after_dated = False
+        i = 0
+        while i < len(lines):
+            stripped = lines[i].strip()
+            if stripped == '# Tasks':
+                in_section, current_date = True, None
+            elif stripped == '----------':
+                in_section, current_date = False, None
+            elif in_section:
+                header = DATE_HEADER_RE.match(stripped)
+                if header:
+                    current_date = header.group(1)
+                    seen_dated = True
+                elif stripped.startswith('#'):
+                    current_date = None
+                else:
+                    # inject 输出中无日期的块跟在最后一个分组之后，以空行隔开 (前面不是日期标题)
+                    if (seen_dated and stripped.startswith('- [') and i >= 2 and not lines[i - 1].strip()
+                            and not DATE_HEADER_RE.match(lines[i - 2].strip())):
+                        undated_after_dated = True
+                    bid = line_bid(lines[i])
+                    if bid:
+                        _, length = capture_block(lines, i)
+                        self._record(path, bids, bid, i, length, current_date, hash_of(bid) if hash_of else None)
+                        i += length
+                        continue
+            i += 1
+        # 无日期的块排在最后一个日期分组之后时，再次 inject 会把它们并入该分组 (不是不动点)
+        if canonical and not undated_after_dated:
+            self._canonical[path] = FileUtils.known_digest(path)
+        else:
+            self._canonical.pop(path, None)
+
+    def is_canonical(self, path):
+        """文件仍是我们最后一次写出的规范化内容"""
+        digest = self._canonical.get(path)
+        return digest is not None and FileUtils.known_digest(path) == digest
+
+    def get(self, bid):
+        return self._blocks.get(bid)
+
+    def locate(self, path, lines, bids):
+        """{bid: (start, length)}，全部块在当前内容上校验通过才返回，否则 None"""
+        if path in self._unsafe:
+            Metrics.count('block_index_misses')
+            return None
+        found = {}
+        for bid in bids:
+            entry = self._blocks.get(bid)
+            if entry is None or entry[0] != path:
+                Metrics.count('block_index_misses')
+                return None
+            start = entry[1]
+            if start >= len(lines) or line_bid(lines[start]) != bid:
+                Metrics.count('block_index_misses')
+                return None
+            _, length = capture_block(lines, start)
+            found[bid] = (start, length)
+        Metrics.count('block_index_hits', len(found))
+        return found
+
+    @staticmethod
+    def splice(lines, located, replace):
+        """
+        按位置替换/删除块：replace(bid) 返回新块的行 (删除时返回 [])。
+        起点落在前一个被替换块内部的 (嵌套子任务) 跳过，与逐行扫描的行为一致。
+        返回 (新内容, 实际处理的 bid 集合)。
+        """
+        out, pos, handled = [], 0, set()
+        for bid, (start, length) in sorted(located.items(), key=lambda kv: kv[1][0]):
+            if start < pos: continue
+            out.extend(lines[pos:start])
+            out.extend(replace(bid))
+            pos = start + length
+            handled.add(bid)
+        out.extend(lines[pos:])
+        return out, handled
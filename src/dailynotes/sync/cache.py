@@ -0,0 +1,93 @@
+from config import Config
+from ..utils import FileUtils
+from ..metrics import Metrics
+
+
+class ParseCache:
+    """
+    [Parse Cache] 按文件缓存 discovery (是否 main 文件) 与 ingestion (任务表) 的解析结果。
+
+    以读取时的 (mtime_ns, size) 校验：文件未变则跳过读取与解析。
+    只缓存“干净”的解析结果——需要回写 (补 ID / 补日期 / 重组) 的文件下个周期会重新解析。
+    缓存中的任务 dict 为只读共享对象，下游不得原地修改。
+    可按仓库导出、合并导入，供热交接与启动快照复用。
+    """
+    _main = {}   # path -> (sig, is_main)
+    _tasks = {}  # path -> (sig, proj, start_date, [(task_date, bid, task)])
+
+    @staticmethod
+    def _valid(path, sig):
+        return sig is not None and FileUtils.signature(path) == sig
+
+    @classmethod
+    def lookup_main(cls, path):
+        """已知结果返回 True/False，需要重新读取返回 None"""
+        entry = cls._main.get(path)
+        if entry is not None and cls._valid(path, entry[0]):
+            Metrics.count('parse_cache_hits')
+            return entry[1]
+        Metrics.count('parse_cache_misses')
+        return None
+
+    @classmethod
+    def store_main(cls, path, is_main):
+        sig = FileUtils.read_signature(path)
+        if sig is None:
+            cls._main.pop(path, None)
+        else:
+            cls._main[path] = (sig, is_main)
+
+    @classmethod
+    def lookup_tasks(cls, path, proj):
+        """返回 [(task_date, bid, task)]；文件变化 / 所属项目或时间门控变化时返回 None"""
+        entry = cls._tasks.get(path)
+        if (entry is not None and entry[1] == proj and entry[2] == Config.SYNC_START_DATE
+                and cls._valid(path, entry[0])):
+            Metrics.count('parse_cache_hits')
+            return entry[3]
+        Metrics.count('parse_cache_misses')
+        return None
+
+    @classmethod
+    def store_tasks(cls, path, proj, entries):
+        sig = FileUtils.read_signature(path)
+        if sig is None:
+            cls._tasks.pop(path, None)
+        else:
+            cls._tasks[path] = (sig, proj, Config.SYNC_START_DATE, entries)
+
+    @classmethod
+    def discard(cls, path):
+        cls._main.pop(path, None)
+        cls._tasks.pop(path, None)
+
+    @classmethod
+    def clear(cls):
+        cls._main.clear()
+        cls._tasks.clear()
+
+    @classmethod
+    def export(cls, root=None):
+        """root 非空时只导出该目录下的条目 (多仓库共享同一个缓存，快照按仓库分别保存)"""
+        if root is None: return {'main': dict(cls._main), 'tasks': dict(cls._tasks)}
+        return {'main': {p: v for p, v in cls._main.items() if FileUtils.under_root(p, root)},
+                'tasks': {p: v for p, v in cls._tasks.items() if FileUtils.under_root(p, root)}}
+
+    @classmethod
+    def prune_stale(cls):
+        """逐个 stat 校验，丢弃已变化或已删除文件的条目；返回 (保留数, 总数)"""
+        total = kept = 0
+        for table in (cls._main, cls._tasks):
+            for path in list(table):
+                total += 1
+                if cls._valid(path, table[path][0]):
+                    kept += 1
+                else:
+                    del table[path]
+        return kept, total
+
+    @classmethod
+    def load(cls, data):
+        """合并 export() 的结果 (不清掉其他仓库已载入的条目)；条目在使用时按 stat 校验，无需在此逐一检查"""
+        cls._main.update(data.get('main') or {})
+        cls._tasks.update(data.get('tasks') or {})
@@ -2,7 +2,26 @@ import os
 import unicodedata
 from config import Config
 from ..utils import FileUtils
+from ..metrics import Metrics
 from .parsing import parse_yaml_tags
+from .cache import ParseCache
+
+
+def _read_main_candidate(path):
+    """
+    [Prefilter] 只有首行是 '---' 且包含 'main' 字样的文件才可能带 main 标签；
+    其余文件不解码直接跳过。
+    """
+    data = FileUtils.read_bytes(path)
+    if not data: return []
+    first_line = data.split(b'\n', 1)[0]
+    if first_line.strip() != b'---' or b'main' not in data:
+        Metrics.count('files_prefiltered')
+        return []
+    try:
+        return FileUtils.decode_lines(data)
+    except UnicodeDecodeError:
+        return []
 
 def scan_projects():
     project_map = {}
@@ -10,7 +29,7 @@ def scan_projects():
     file_path_map = {}
     
     # 1. 强制全量递归扫描
-    for root, dirs, files in os.walk(Config.ROOT_DIR):
+    for root, dirs, files in Metrics.timed_iter('walk', FileUtils.walk(Config.ROOT_DIR)):
         # 排除常规忽略目录
         dirs[:] = [d for d in dirs if not FileUtils.is_excluded(os.path.join(root, d))]
         if FileUtils.is_excluded(root): continue
@@ -22,8 +41,12 @@ def scan_projects():
                 stem = unicodedata.normalize('NFC', os.path.splitext(f)[0])
                 file_path_map[stem] = path # 记录所有文件路径
                 
-                # 检查 main 标签 (需要读取文件)
-                if 'main' in parse_yaml_tags(FileUtils.read_file(path) or []):
+                # 检查 main 标签 (需要读取文件，未变化的文件直接用缓存结果)
+                is_main = ParseCache.lookup_main(path)
+                if is_main is None:
+                    is_main = 'main' in parse_yaml_tags(_read_main_candidate(path))
+                    ParseCache.store_main(path, is_main)
+                if is_main:
                     main_files.append(f)
 
         # 只要当前目录有 main 文件，就注册为项目（不管父级是否也是项目）
@@ -9,13 +9,12 @@ import time
 from typing import Dict, List, Optional, Any, Set
 from config import Config
 from ..utils import Logger, FileUtils
+from ..metrics import Metrics
 from .discovery import scan_projects
 from .ingestion import scan_all_source_tasks
 from .parsing import (
     clean_task_text, 
     normalize_block_content, 
-    extract_routing_target,
-    extract_routing_info,
     capture_block, 
     get_indent_depth
 )
@@ -25,8 +24,11 @@ from .rendering import (
     normalize_child_lines, 
     ensure_structure, 
     cleanup_empty_headers, 
-    inject_into_task_section
+    inject_into_task_section,
+    TaskSection
 )
+from .routing import RoutingIndex
+from .block_index import BlockIndex, line_bid
 
 class SyncCore:
     def __init__(self, state_manager):
@@ -34,6 +36,19 @@ class SyncCore:
         self.project_map = {}
         self.project_path_map = {}
         self.file_path_map = {}
+        self.routing = RoutingIndex()
+        self.blocks = BlockIndex()
+        self.sections = {}  # path -> (内容 md5, TaskSection)，仅在一个周期内有效
+        self.documents = {}  # path -> 最近一次扫描时的文件内容 (按需载入)，供切出任务块的原始行
+        self.plan = None  # [Plan] 演练模式下的操作记录 (planner.SyncPlan)
+
+    def begin_tick(self):
+        self.sections.clear()
+
+    def set_index(self, project_map, project_path_map, file_path_map):
+        """替换项目索引 (扫描结果 / 热缓存导入)，路由索引按差异增量更新"""
+        self.project_map, self.project_path_map, self.file_path_map = project_map, project_path_map, file_path_map
+        self.routing.update(project_path_map, file_path_map)
 
     def trigger_delayed_verification(self, filepath, delay=10):
         def _job():
@@ -47,14 +62,97 @@ class SyncCore:
     def generate_block_id(self):
         return '^' + ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
 
+    def record(self, kind, date_str, bid, path, lines=()):
+        """[Plan] 演练模式下登记一个同步操作；lines 为涉及的块 (可为返回块的函数，仅演练时求值)"""
+        if self.plan is not None: self.plan.op(kind, date_str, bid, path, lines)
+
     def scan_projects(self):
         # Delegate to discovery module
-        self.project_map, self.project_path_map, self.file_path_map = scan_projects()
+        with Metrics.span('discovery'):
+            self.set_index(*scan_projects())
 
-    def scan_all_source_tasks(self) -> Dict[str, Dict]:
+    def scan_all_source_tasks(self, only_paths=None) -> Dict[str, Dict]:
         # Delegate to ingestion module
-        self.scan_projects()
-        return scan_all_source_tasks(self.project_map, self.sm)
+        # only_paths: 仅扫描指定文件 (快速启动)，此时沿用已有的项目索引，调用方需先 scan_projects()
+        if only_paths is None:
+            self.scan_projects()
+        self.documents = {}
+        with Metrics.span('ingestion'):
+            return scan_all_source_tasks(self.project_map, self.sm, only_paths, self.blocks, self.documents)
+
+    def task_lines(self, sd):
+        """
+        [Lazy Body] 源任务块的原始行：从扫描时记录的起始行按 capture_block 重新取出整块。
+        文件内容在首次需要时读取并在本次扫描的结果内复用；我们回写源文件前会先留存写入前的内容。
+        取出的块与扫描时的内容哈希对不上 (文件已在别处被改动) 时按块 ID 在当前内容中重新查找。
+        """
+        path = sd['path']
+        lines = self.documents.get(path)
+        if lines is None:
+            lines = self.documents[path] = FileUtils.read_file(path) or []
+        start = sd['line']
+        if start < len(lines) and line_bid(lines[start]) == sd['bid']:
+            block = capture_block(lines, start)[0]
+            if self._block_hash(block, sd) == sd['hash']: return block
+        Metrics.count('task_lines_rescanned')
+        candidates = [capture_block(lines, i)[0] for i, line in enumerate(lines) if line_bid(line) == sd['bid']]
+        for block in candidates:
+            if self._block_hash(block, sd) == sd['hash']: return block
+        return candidates[0] if candidates else []
+
+    def _block_hash(self, block, sd):
+        """与 ingestion 相同的内容哈希 (首行文本 + 规范化的子行)"""
+        m = re.search(r'-\s*\[(.)\]', block[0])
+        clean = clean_task_text(block[0], sd['bid'], context_name=sd['fname'])
+        return self.sm.calc_hash(m.group(1) if m else ' ', clean + "|||" + normalize_block_content(block[1:]))
+
+    def write_source(self, path, lines, stage, section=None, previous=None):
+        """
+        回写源文件，并按写入内容刷新块位置索引；section 为 lines 对应的 Tasks 区结构。
+        previous 为写入前的内容：本次扫描中首次改写该文件时留存，之后仍按扫描时的起始行取出任务块。
+        """
+        if previous is not None: self.documents.setdefault(path, previous)
+        if FileUtils.write_file(path, lines, stage=stage):
+            self.blocks.reindex(path, lines, self.sm.get_task_hash, canonical=True)
+            if section is not None: self.keep_section(path, section)
+            return True
+        self.blocks.forget(path)
+        return False
+
+    def task_section(self, path, lines):
+        """
+        [Task Section] 文件仍是本周期内我们写出的内容时复用缓存的结构，否则按 lines 解析。
+        取出即从缓存移除：调用方修改结构后须经 write_source / keep_section 重新登记。
+        """
+        cached = self.sections.pop(path, None)
+        if cached is not None and cached[0] == FileUtils.known_digest(path):
+            Metrics.count('sections_reused')
+            return cached[1]
+        return TaskSection.parse(lines)
+
+    def keep_section(self, path, section):
+        """文件当前内容即 section.render() 时登记结构"""
+        digest = FileUtils.known_digest(path)
+        if digest is not None and section.stable():
+            self.sections[path] = (digest, section)
+
+    def referenced_sources(self, daily_path):
+        """
+        [Fast Start] 日记引用到的源文件：
+        块 ID 经状态库反查 source_path，加上 [[链接]] 指向的项目/文件。返回 (bids, paths)。
+        """
+        text = FileUtils.read_content(daily_path) or ""
+        bids = set(re.findall(r'#\^([a-zA-Z0-9]{6,})\|', text))
+        paths = set()
+        for bid in bids:
+            source_path = self.sm.state.get(bid, {}).get('source_path')
+            if source_path and Config.DAILY_NOTE_DIR not in source_path:
+                paths.add(source_path)
+        for name in re.findall(r'\[\[([^\]|#]+)', text):
+            name = unicodedata.normalize('NFC', name.strip())
+            target = self.project_path_map.get(name) or self.file_path_map.get(name)
+            if target: paths.add(target)
+        return bids, paths
         
     def calculate_nearest_project(self, routing_path):
         """
@@ -121,7 +219,7 @@ class SyncCore:
                 
                 if is_task_candidate:
                     # 1. Routing Info
-                    routing_path, raw_link_text = extract_routing_info(lines[i], self.file_path_map)
+                    routing_path, raw_link_text = self.routing.route(lines[i])
                     
                     # 2. Calculate Correct Target
                     target_p_name = self.calculate_nearest_project(routing_path)
@@ -134,7 +232,7 @@ class SyncCore:
                         should_move = True
                     elif ctx == 'PROJECT' and current_header_project:
                         if current_header_project != target_p_name:
-                            Logger.info(f"   ⚖️ 纠偏移动 ({date_tag}): {current_header_project} -> {target_p_name}")
+                            Logger.info("   ⚖️ 纠偏移动 (%s): %s -> %s", date_tag, current_header_project, target_p_name)
                             should_move = True
                             
                     if should_move:
@@ -177,11 +275,8 @@ class SyncCore:
                                         clean_pure = clean_pure.replace(raw_link_text, "").strip()
 
                             # Standard Cleaning
-                            known_projects = set(self.project_path_map.keys())
-                            existing_links = re.findall(r'\[\[(.*?)\]\]', clean_pure)
-                            for link in existing_links:
-                                link_clean = link.split('|')[0].split('#')[0] 
-                                if link_clean in known_projects and link_clean != target_p_name:
+                            for _, link, link_clean, _ in self.routing.links(clean_pure):
+                                if self.routing.is_project(link_clean) and link_clean != target_p_name:
                                     clean_pure = re.sub(rf'\[\[{re.escape(link)}.*?\]\]', '', clean_pure).strip()
                             
                             indent_len = len(raw_first) - len(raw_first.lstrip())
@@ -208,6 +303,7 @@ class SyncCore:
 
                         content[0] = final_head_line
                         tasks_to_move.append({'idx': i, 'len': length, 'proj': target_p_name, 'raw': content})
+                        self.record('dispatch', date_tag, current_bid, filepath, content)
                         if current_bid: processed_bids.add(current_bid)
                         i += length
                         continue
@@ -265,9 +361,9 @@ class SyncCore:
                 lines[ins_pt + offset:ins_pt + offset] = chunk
                 offset += len(chunk)
                 
-        Logger.info(f"归档 {len(tasks_to_move)} 个流浪/纠偏任务", date_tag)
+        Logger.info("归档 %d 个流浪/纠偏任务", len(tasks_to_move), date_tag=date_tag)
         Logger.info(f"   💾 [WRITE] 更新归档文件 (Orphans): {os.path.basename(filepath)}")
-        if FileUtils.write_file(filepath, lines): return processed_bids
+        if FileUtils.write_file(filepath, lines, stage="dispatch"): return processed_bids
         return set()
 
     def process_date(self, target_date, src_tasks_for_date):
@@ -275,30 +371,31 @@ class SyncCore:
         daily_path = os.path.join(Config.DAILY_NOTE_DIR, f"{target_date}.md")
 
         # [NEW] 模版初始化
-        if not os.path.exists(daily_path) and src_tasks_for_date:
-            if os.path.exists(Config.TEMPLATE_FILE):
+        if not FileUtils.exists(daily_path) and src_tasks_for_date:
+            if FileUtils.exists(Config.TEMPLATE_FILE):
                 try:
                     tmpl_lines = FileUtils.read_file(Config.TEMPLATE_FILE)
                     if tmpl_lines:
                         Logger.info(f"   📄 [TEMPLATE] 检测到未来/缺失日记，正在从模版创建: {target_date}.md")
-                        FileUtils.write_file(daily_path, tmpl_lines)
+                        FileUtils.write_file(daily_path, tmpl_lines, stage="template")
                         time.sleep(0.1)
                 except Exception as e:
                     Logger.error_once(f"tmpl_fail_{target_date}", f"模版创建失败: {e}")
             else:
                 Logger.info(f"   ⚠️ 未找到模版文件 ({Config.REL_TEMPLATE_FILE})，创建基础骨架: {target_date}.md")
                 base_scaffold = ["# Day planner\n", "\n", "# Journey\n", "\n"]
-                FileUtils.write_file(daily_path, base_scaffold)
+                FileUtils.write_file(daily_path, base_scaffold, stage="template")
 
         organized_bids = set()
-        if os.path.exists(daily_path): 
+        if FileUtils.exists(daily_path): 
             # Use new dispatch method with Correction logic & Link Preservation
-            organized_bids = self.dispatch_project_tasks(daily_path, target_date)
+            with Metrics.span('dispatch'):
+                organized_bids = self.dispatch_project_tasks(daily_path, target_date)
             
         dn_tasks = {}
         new_dn_tasks = []
         dn_lines = []
-        if os.path.exists(daily_path):
+        if FileUtils.exists(daily_path):
             dn_lines = FileUtils.read_file(daily_path) or []
             curr_ctx = None;
             current_section = None;
@@ -364,7 +461,7 @@ class SyncCore:
                 p_name = nt['proj'];
                 txt = nt['raw'][0];
                 clean = clean_task_text(txt)
-                tgt = extract_routing_target(txt, self.file_path_map) or self.project_path_map.get(p_name)
+                tgt = self.routing.route_target(txt) or self.project_path_map.get(p_name)
                 if not tgt: continue
                 bid = self.generate_block_id().replace('^', '')
                 fname = os.path.splitext(os.path.basename(tgt))[0]
@@ -376,24 +473,29 @@ class SyncCore:
                 d_l = format_line(nt['indent'], nt['st'], clean, "", fname, bid, True)
                 d_blk = [d_l] + normalize_child_lines(nt['raw'][1:], nt['indent'],
                                                            source_parent_indent=nt['indent'], as_quoted=False)
+                self.record('register', target_date, bid, tgt, s_blk)
 
                 dn_lines[nt['idx']:nt['idx'] + nt['len']] = d_blk
                 dn_mod = True
-                sl = FileUtils.read_file(tgt) or []
-                sl = inject_into_task_section(sl, s_blk)
-                # [FIX] 显式比对，防止 None 导致丢包
-                orig_sl = FileUtils.read_file(tgt) or []
-                if "".join(sl) != "".join(orig_sl):
+                before = FileUtils.read_file(tgt) or []
+                # [Task Section] 同一源文件连续注册时沿用上次写出的结构，新块按序插入所在日期分组
+                section = self.task_section(tgt, before)
+                if not section.insert(s_blk): section = TaskSection.parse(before, s_blk)
+                sl = section.render()
+                # [FIX] 显式比对 (读取时登记的内容指纹)，防止 None 导致丢包
+                if not FileUtils.content_matches(tgt, sl):
                     # === 🎯 第一次日志修改 (New Task) ===
                     Logger.info(f"   💾 [WRITE] 写入源文件 (New Task) (from {target_date}): {os.path.basename(tgt)}")
-                    FileUtils.write_file(tgt, sl)
+                    self.write_source(tgt, sl, stage="register", section=section, previous=before)
+                else:
+                    self.keep_section(tgt, section)
                 self.trigger_delayed_verification(tgt)
                 combined_text = clean + "|||" + normalize_block_content(nt['raw'][1:])
                 h = self.sm.calc_hash(nt['st'], combined_text)
                 self.sm.update_task(bid, h, tgt, target_date)
         if dn_mod:
             Logger.info(f"   💾 [WRITE] 更新日记文件 (Sync Pre-Save): {os.path.basename(daily_path)}")
-            FileUtils.write_file(daily_path, dn_lines)
+            FileUtils.write_file(daily_path, dn_lines, stage="daily_presave")
             self.sm.save()
 
         src_tasks = src_tasks_for_date
@@ -415,7 +517,8 @@ class SyncCore:
                     d_changed = (dd['hash'] != last_hash)
                     if s_changed and not d_changed:
                         Logger.info(f"   🔄 S->D 同步 ({bid}):")
-                        blk = reconstruct_daily_block(sd, target_date)
+                        blk = reconstruct_daily_block(sd, target_date, self.task_lines(sd))
+                        self.record('s2d', target_date, bid, daily_path, blk)
                         dn_lines[dd['idx']:dd['idx'] + dd['len']] = blk
                         dn_mod = True
                         self.sm.update_task(bid, sd['hash'], sd['path'], target_date)
@@ -426,6 +529,7 @@ class SyncCore:
                         # [MODIFIED] Pass source_parent_indent (using daily indent)
                         blk = [n_l] + normalize_child_lines(dd['raw'][1:], sd['indent'],
                                                                  source_parent_indent=dd['indent'], as_quoted=False)
+                        self.record('d2s', target_date, bid, sd['path'], blk)
                         if sd['path'] not in src_updates: src_updates[sd['path']] = {}
                         src_updates[sd['path']][bid] = blk
                         self.sm.update_task(bid, dd['hash'], sd['path'], target_date)
@@ -437,6 +541,7 @@ class SyncCore:
                             # [MODIFIED] Conflict resolution using Daily structure
                             blk = [n_l] + normalize_child_lines(dd['raw'][1:], sd['indent'],
                                                                      source_parent_indent=dd['indent'], as_quoted=False)
+                            self.record('conflict', target_date, bid, sd['path'], blk)
                             if sd['path'] not in src_updates: src_updates[sd['path']] = {}
                             src_updates[sd['path']][bid] = blk
                             self.sm.update_task(bid, dd['hash'], sd['path'], target_date)
@@ -449,6 +554,7 @@ class SyncCore:
                 else:
                     if last_date == target_date:
                         Logger.info(f"   🗑️ 删除 Source ({bid}): 因 Daily 移除")
+                        self.record('delete', target_date, bid, sd['path'], lambda: self.task_lines(sd))
                         if sd['path'] not in src_deletes: src_deletes[sd['path']] = {}
                         src_deletes[sd['path']][bid] = sd['path']
                         self.sm.remove_task(bid)
@@ -458,9 +564,10 @@ class SyncCore:
                         is_misjudged = False
                         if linked_dates and target_date not in linked_dates: is_misjudged = True
                         if is_misjudged:
-                            Logger.info(f"   🛡️ 拦截追加 ({bid}): 归属 {linked_dates} != 当前 {target_date}")
+                            Logger.info("   🛡️ 拦截追加 (%s): 归属 %s != 当前 %s", bid, linked_dates, target_date)
                             continue
-                        Logger.info(f"   ➕ 追加 Daily ({bid}): 来自 {sd['fname']}")
+                        Logger.info("   ➕ 追加 Daily (%s): 来自 %s", bid, sd['fname'])
+                        self.record('append', target_date, bid, daily_path, lambda: self.task_lines(sd))
                         if sd['proj'] not in append_to_dn: append_to_dn[sd['proj']] = []
                         append_to_dn[sd['proj']].append(sd)
                         self.sm.update_task(bid, sd['hash'], sd['path'], target_date)
@@ -471,14 +578,14 @@ class SyncCore:
                 db_data = self.sm.state.get(bid, {})
                 last_path = db_data.get('source_path', '')
                 is_daily_native = (not last_path) or (Config.DAILY_NOTE_DIR in last_path)
-                target_file_direct = extract_routing_target(raw_first, self.file_path_map)
+                target_file_direct = self.routing.route_target(raw_first)
                 is_deleted_from_source = False
                 if target_file_direct and last_path:
                     p1 = os.path.normcase(os.path.abspath(target_file_direct))
                     p2 = os.path.normcase(os.path.abspath(last_path))
                     if p1 == p2: is_deleted_from_source = True
                 should_push = (bid in organized_bids) or is_daily_native or (
-                        target_file_direct and os.path.exists(target_file_direct) and not is_deleted_from_source)
+                        target_file_direct and FileUtils.exists(target_file_direct) and not is_deleted_from_source)
                 if should_push:
                     target_file = None
                     if target_file_direct:
@@ -486,7 +593,7 @@ class SyncCore:
                     else:
                         p_name = dd.get('proj')
                         target_file = self.project_path_map.get(p_name)
-                    if target_file and os.path.exists(target_file):
+                    if target_file and FileUtils.exists(target_file):
                         Logger.info(f"   🚀 [GRADUATE] 归档任务晋升上行 ({bid}) -> {os.path.basename(target_file)}")
                         fname = os.path.splitext(os.path.basename(target_file))[0]
                         clean = dd['pure']
@@ -501,6 +608,7 @@ class SyncCore:
                         blk = [n_l] + normalize_child_lines(dd['raw'][1:], raw_indent,
                                                                  source_parent_indent=dd['indent'], as_quoted=False)
 
+                        self.record('graduate', target_date, bid, target_file, blk)
                         if target_file not in src_updates: src_updates[target_file] = {}
                         src_updates[target_file][bid] = blk
                         self.sm.update_task(bid, dd['hash'], target_file, target_date)
@@ -508,38 +616,56 @@ class SyncCore:
                         Logger.info(f"   ⚠️ [ORPHAN] 无法同步，找不到目标文件")
                 else:
                     Logger.info(f"   🗑️ 删除 Daily ({bid}): 因 Source 移除")
+                    self.record('delete', target_date, bid, daily_path, dd['raw'])
                     for k in range(dd['idx'], dd['idx'] + dd['len']): dn_lines[k] = None
                     dn_mod = True
 
         if dn_mod:
             # [CRITICAL FIX] 写入日记文件前的幂等性检查
             final_dn_lines = [l for l in dn_lines if l is not None]
-            original_dn_content = FileUtils.read_content(daily_path) or ""
-            new_dn_content = "".join(final_dn_lines)
 
-            if original_dn_content != new_dn_content:
-                FileUtils.write_file(daily_path, final_dn_lines)
+            if not FileUtils.content_matches(daily_path, final_dn_lines):
+                FileUtils.write_file(daily_path, final_dn_lines, stage="daily")
                 Logger.info(f"   ✅ 日记文件已回写: {os.path.basename(daily_path)}")
 
         if src_deletes:
             for path, bids in src_deletes.items():
                 sl = FileUtils.read_file(path)
                 if not sl: continue
-                out, i, chg = [], 0, False
-                deleted_bids = list(bids.keys())
-                while i < len(sl):
-                    im = re.search(r'\^([a-zA-Z0-9]{6,})\s*$', sl[i])
-                    if not im: im = re.search(r'\(connect::.*?\^([a-zA-Z0-9]{6,})\)', sl[i])
-                    if im and im.group(1) in deleted_bids:
-                        _, c = capture_block(sl, i);
-                        i += c;
-                        chg = True
+                # [Block Index] 已知位置直接删除对应行区间，位置校验失败才逐行扫描
+                located = self.blocks.locate(path, sl, bids)
+                # [In-place] 文件仍是我们写出的规范化内容：直接从 Tasks 区结构中删块，不重建整个区
+                out, section = None, None
+                if located is not None and self.blocks.is_canonical(path):
+                    section = self.task_section(path, sl)
+                    if all(bid in section.by_id for bid in bids):
+                        for bid in bids: section.remove(bid)
+                        out = section.render()
                     else:
-                        out.append(sl[i]);
-                        i += 1
+                        section = None
+                chg = out is not None
+                if chg: Metrics.count('blocks_spliced')
+                if out is None:
+                    if located is not None:
+                        out, handled = BlockIndex.splice(sl, located, lambda bid: [])
+                        chg = bool(handled)
+                    else:
+                        out, i, chg = [], 0, False
+                        deleted_bids = list(bids.keys())
+                        while i < len(sl):
+                            im = re.search(r'\^([a-zA-Z0-9]{6,})\s*$', sl[i])
+                            if not im: im = re.search(r'\(connect::.*?\^([a-zA-Z0-9]{6,})\)', sl[i])
+                            if im and im.group(1) in deleted_bids:
+                                _, c = capture_block(sl, i);
+                                i += c;
+                                chg = True
+                            else:
+                                out.append(sl[i]);
+                                i += 1
+                    if chg:
+                        stem = os.path.splitext(os.path.basename(path))[0]
+                        out = inject_into_task_section(out, [], stem)
                 if chg:
-                    stem = os.path.splitext(os.path.basename(path))[0]
-                    out = inject_into_task_section(out, [], stem)
 
                     # [FIX] 显式比对
                     orig_content = "".join(sl)
@@ -547,34 +673,52 @@ class SyncCore:
                     if orig_content != new_content:
                         # === 🎯 第二次日志修改 (Delete) ===
                         Logger.info(f"   💾 [WRITE] 写入源文件 (Delete) (from {target_date}): {os.path.basename(path)}")
-                        FileUtils.write_file(path, out)
+                        self.write_source(path, out, stage="src_delete", section=section, previous=sl)
 
         if src_updates:
             for path, ups in src_updates.items():
                 sl = FileUtils.read_file(path)
                 if not sl: sl = []
-                out, i, chg = [], 0, False
-                handled_bids = set()
-                while i < len(sl):
-                    im = re.search(r'\^([a-zA-Z0-9]{6,})\s*$', sl[i])
-                    if not im: im = re.search(r'\(connect::.*?\^([a-zA-Z0-9]{6,})\)', sl[i])
-                    if im and im.group(1) in ups:
-                        bid = im.group(1)
-                        _, c = capture_block(sl, i)
-                        out.extend(ups[bid])
-                        handled_bids.add(bid)
-                        i += c;
-                        chg = True
+                located = self.blocks.locate(path, sl, ups) if sl else None
+                out, section = None, None
+                if located is not None and self.blocks.is_canonical(path):
+                    section = self.task_section(path, sl)
+                    if all(section.replaceable(bid, blk) for bid, blk in ups.items()):
+                        for blk in ups.values(): section.insert(blk)
+                        out = section.render()
+                    else:
+                        section = None
+                chg = out is not None
+                if chg: Metrics.count('blocks_spliced')
+                if out is None:
+                    if located is not None:
+                        out, handled_bids = BlockIndex.splice(sl, located, ups.__getitem__)
+                        chg = bool(handled_bids)
                     else:
-                        out.append(sl[i]);
-                        i += 1
-                pending_inserts = []
-                for bid, blk in ups.items():
-                    if bid not in handled_bids: pending_inserts.extend(blk); chg = True
+                        out, i, chg = [], 0, False
+                        handled_bids = set()
+                        while i < len(sl):
+                            im = re.search(r'\^([a-zA-Z0-9]{6,})\s*$', sl[i])
+                            if not im: im = re.search(r'\(connect::.*?\^([a-zA-Z0-9]{6,})\)', sl[i])
+                            if im and im.group(1) in ups:
+                                bid = im.group(1)
+                                _, c = capture_block(sl, i)
+                                out.extend(ups[bid])
+                                handled_bids.add(bid)
+                                i += c;
+                                chg = True
+                            else:
+                                out.append(sl[i]);
+                                i += 1
+                    pending_inserts = []
+                    for bid, blk in ups.items():
+                        if bid not in handled_bids: pending_inserts.extend(blk); chg = True
+
+                    if chg:
+                        stem = os.path.splitext(os.path.basename(path))[0]
+                        out = inject_into_task_section(out, pending_inserts, stem)
 
                 if chg:
-                    stem = os.path.splitext(os.path.basename(path))[0]
-                    out = inject_into_task_section(out, pending_inserts, stem)
 
                     # [FIX] 显式比对，防止死循环
                     orig_content = "".join(sl)
@@ -584,7 +728,7 @@ class SyncCore:
                         # === 🎯 第三次日志修改 (Update/Insert) - 你的主要需求 ===
                         Logger.info(
                             f"   💾 [WRITE] 写入源文件 (Update/Insert) (from {target_date}): {os.path.basename(path)}")
-                        FileUtils.write_file(path, out)
+                        self.write_source(path, out, stage="src_update", section=section, previous=sl)
                         self.trigger_delayed_verification(path)
 
         self.sm.save()
@@ -3,22 +3,116 @@ import re
 import datetime
 import random
 import string
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import Dict
 from config import Config
 from ..utils import Logger, FileUtils
+from ..metrics import Metrics
 from .parsing import capture_block, clean_task_text, normalize_block_content, get_indent_depth
 from .rendering import format_line, inject_into_task_section
+from .cache import ParseCache
+
+# [Prefilter] 解析器只关心 "# Tasks" 区；没有这个标记的文件 (绝大多数纯文本笔记) 不解码直接跳过
+TASKS_MARKER = b'# Tasks'
+
+
+def _split_task_region(data):
+    """在原始字节上定位任务区：(标记所在行的行首偏移, 解码后的行)；没有任务区为 (-1, None)，解码失败行为 None"""
+    idx = data.find(TASKS_MARKER)
+    if idx == -1 or data.find(b'[', idx) == -1: return -1, None
+    # 从标记所在行的行首开始解码：第一个 "# Tasks" 子串之前不可能存在合法的标题行
+    off = data.rfind(b'\n', 0, idx) + 1
+    try:
+        return off, FileUtils.decode_lines(memoryview(data)[off:])
+    except UnicodeDecodeError:
+        return off, None
+
+
+def _prefetch_task_region(path):
+    """[Prefetch] I/O 线程中执行：读取 + 定位 + 解码，不登记指纹与计数 (由主线程使用时登记)"""
+    try:
+        fetched = FileUtils.fetch_raw(path)
+    except Exception:
+        return None
+    return fetched, _split_task_region(fetched[0])
+
+
+def _load_task_region(path, prefetched=None):
+    """
+    在原始字节上定位任务区，返回 (head_bytes, tail_lines)：
+    - 文件没有 "# Tasks" 标记 (或标记之后没有任何 "[") -> (None, None)，不做任何解码
+    - 否则只解码标记所在行及之后的部分；head 为之前的原始字节，仅在需要回写时才解码
+      (这里只校验 head 是合法的 UTF-8：与整体 read_file 一致，无法解码的文件整个跳过，不分配块 ID)
+    prefetched 为 _prefetch_task_region() 的结果；文件有暂存写入或预读失败时照常读取。
+    """
+    if prefetched is not None and not FileUtils.is_staged(path):
+        data = FileUtils.accept_raw(path, prefetched[0])
+        off, lines = prefetched[1]
+    else:
+        data = FileUtils.read_bytes(path)
+        off, lines = _split_task_region(data) if data else (-1, None)
+    if not data: return None, None
+    if off == -1:
+        Metrics.count('files_prefiltered')
+        return None, None
+    if lines is None: return None, None
+    head = data[:off]
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError:
+        return None, None
+    return head, lines
+
+
+def _prefetched(paths):
+    """
+    [Prefetch] 按 paths 的顺序逐个产出预读结果：IO_WORKERS 个线程并发读取 + 解码，
+    最多领先消费方 2 * IO_WORKERS 个文件 (限制内存)。IO_WORKERS <= 1 时不预读，全部产出 None。
+    """
+    workers = Config.IO_WORKERS
+    if workers <= 1 or len(paths) < 2:
+        for _ in paths: yield None
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch') as pool:
+        it = iter(paths)
+        pending = deque(pool.submit(_prefetch_task_region, p) for p in islice(it, 2 * workers))
+        while pending:
+            future = pending.popleft()
+            for p in islice(it, 1):
+                pending.append(pool.submit(_prefetch_task_region, p))
+            yield future.result()
+
 
 def generate_block_id():
     return '^' + ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
 
-def scan_all_source_tasks(project_map, sm) -> Dict[str, Dict]:
+def _iter_paths(paths):
+    """[Fast Start] 把指定文件按目录分组，模拟 walk 的 (root, dirs, files) 输出"""
+    by_dir = {}
+    for p in sorted(paths):
+        by_dir.setdefault(os.path.dirname(p), []).append(os.path.basename(p))
+    for root, files in by_dir.items():
+        yield root, [], files
+
+
+def scan_all_source_tasks(project_map, sm, only_paths=None, blocks=None, documents=None) -> Dict[str, Dict]:
     # Need to run scan_projects before this? No, project_map is passed in.
     # self.scan_projects() # Caller handles this.
-    
+    # only_paths: 只扫描这些文件 (快速启动)，None 表示全库遍历
+    # blocks: BlockIndex，按文件登记任务块位置
+    # documents: path -> 行列表；被本次扫描改写的文件在此保留改写前的内容
+    # [Lazy Body] 任务只记录 (path, line, end) 行区间，不保留块的原始行，需要时由调用方按区间切出
+
     source_data_by_date = {}
     today_str = datetime.date.today().strftime('%Y-%m-%d')
-    for root, dirs, files in os.walk(Config.ROOT_DIR):
+    candidates = []  # (path, 项目名, 解析缓存命中的任务表或 None)，遍历顺序
+    if only_paths is None:
+        tree = Metrics.timed_iter('walk', FileUtils.walk(Config.ROOT_DIR))
+    else:
+        tree = _iter_paths(only_paths)
+    for root, dirs, files in tree:
         dirs[:] = [d for d in dirs if not FileUtils.is_excluded(os.path.join(root, d))]
         if FileUtils.is_excluded(root): continue
         curr_proj = None
@@ -31,112 +125,133 @@ def scan_all_source_tasks(project_map, sm) -> Dict[str, Dict]:
         for f in files:
             if not f.endswith('.md'): continue
             path = os.path.join(root, f)
-            lines = FileUtils.read_file(path)
-            if not lines: continue
-            mod = False
-            fname = os.path.splitext(f)[0]
-            i = 0
-
-            in_task_section = False
-            current_section_date = None
-            seen_section_dates = set()
-            while i < len(lines):
-                line = lines[i]
-                stripped = line.strip()
-                if stripped == '# Tasks':
-                    in_task_section = True;
-                    current_section_date = None;
-                    seen_section_dates.clear();
-                    i += 1;
-                    continue
-                if stripped == '----------':
-                    in_task_section = False;
-                    current_section_date = None;
-                    i += 1;
-                    continue
-                if not in_task_section: i += 1; continue
-                header_match = re.match(r'^#+\s*\[\[\s*(\d{4}-\d{2}-\d{2})\s*\]\]', stripped)
-                if header_match:
-                    date_str = header_match.group(1)
-                    if date_str in seen_section_dates:
-                        Logger.info(f"   🔍 发现重复标题 {date_str}，将触发重组...");
-                        mod = True
-                    else:
-                        seen_section_dates.add(date_str)
-                    current_section_date = date_str;
-                    i += 1;
-                    continue
-                if stripped.startswith('#'): current_section_date = None; i += 1; continue
-                if not re.match(r'^\s*-\s*\[.\]', line): i += 1; continue
-                task_date = None
-                if current_section_date:
-                    task_date = current_section_date
-                else:
-                    date_match = re.search(r'[📅✅]\s*(\d{4}-\d{2}-\d{2})', line)
-                    if date_match:
-                        task_date = date_match.group(1)
-                    else:
-                        link_match = re.search(r'\[\[(\d{4}-\d{2}-\d{2})(?:#|\||\]\])', line)
-                        if link_match: task_date = link_match.group(1)
-                is_in_inbox_area = (current_section_date is None)
-                if is_in_inbox_area and not task_date: i += 1; continue
-                if not task_date: task_date = today_str; mod = True
-
-                # [MODIFIED] Use visual depth
-                indent = get_indent_depth(line)
-
-                status_match = re.search(r'-\s*\[(.)\]', line)
-                st = status_match.group(1) if status_match else ' '
-                id_m = re.search(r'\^([a-zA-Z0-9]{6,7})\s*$', line)
-                bid = id_m.group(1) if id_m else None
-                if not bid:
-                    raw_block, _ = capture_block(lines, i)
-                    temp_clean = clean_task_text(line, None, fname)
-                    temp_clean = re.sub(r'\s+\^?[a-zA-Z0-9]*$', '', temp_clean).strip()
-                    combined_body = normalize_block_content(raw_block[1:])
-                    temp_combined_text = temp_clean + "|||" + combined_body
-                    recovery_hash = sm.calc_hash(st, temp_combined_text)
-                    found_id = sm.find_id_by_hash(path, recovery_hash)
-                    if found_id:
-                        Logger.info(f"   🚑 [RESCUE] 指纹匹配成功! '{temp_clean[:10]}...' -> 复活 ID: {found_id}")
-                        bid = found_id;
-                        mod = True
-                    else:
-                        bid = generate_block_id().replace('^', '');
-                        mod = True
-                clean_txt = clean_task_text(line, bid, context_name=fname)
-                dates_pattern = r'([📅✅]\s*\d{4}-\d{2}-\d{2}|\[\[\d{4}-\d{2}-\d{2}(?:#\^[a-zA-Z0-9]+)?(?:\|[📅⮐])?\]\])'
-                dates = " ".join(re.findall(dates_pattern, line))
-                if current_section_date and current_section_date not in dates: dates = f"[[{task_date}]]"; mod = True
-                if task_date not in line and not dates: dates = f"[[{task_date}]]"; mod = True
-                new_line = format_line(indent, st, clean_txt, dates, fname, bid, False)
-                if new_line.strip() != line.strip(): lines[i] = new_line; mod = True
-
-                # [TIME GATE]
-                if task_date < Config.SYNC_START_DATE:
-                    _, consumed = capture_block(lines, i)
-                    i += consumed
-                    continue
-
-                block, consumed = capture_block(lines, i)
-                combined_text = clean_txt + "|||" + normalize_block_content(block[1:])
-                content_hash = sm.calc_hash(st, combined_text)
+            candidates.append((path, curr_proj, ParseCache.lookup_tasks(path, curr_proj)))
+
+    # [Prefetch] 未命中缓存的文件按遍历顺序交给 I/O 线程预读，解析与回写仍在当前线程逐个进行
+    prefetched = _prefetched([path for path, _, cached in candidates if cached is None])
+    for path, curr_proj, cached in candidates:
+        if cached is not None:
+            for task_date, bid, task in cached:
                 if task_date not in source_data_by_date: source_data_by_date[task_date] = {}
-                source_data_by_date[task_date][bid] = {
-                    'proj': curr_proj, 'bid': bid, 'pure': clean_txt, 'status': st,
-                    'path': path, 'fname': fname, 'raw': block, 'hash': content_hash, 'indent': indent,
-                    'dates': dates, 'is_quoted': False
-                }
+                source_data_by_date[task_date][bid] = task
+            if blocks is not None: blocks.record_file(path, cached)
+            continue
+        head, lines = _load_task_region(path, next(prefetched))
+        if not lines:
+            ParseCache.store_tasks(path, curr_proj, [])
+            if blocks is not None: blocks.forget(path)
+            continue
+        # lines 从任务区标记行开始，块位置需加上之前的行数
+        base_line = head.count(b'\n') if head else 0
+        file_entries = []
+        mod = False
+        fname = os.path.splitext(os.path.basename(path))[0]
+        i = 0
+
+        in_task_section = False
+        current_section_date = None
+        seen_section_dates = set()
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+            if stripped == '# Tasks':
+                in_task_section = True;
+                current_section_date = None;
+                seen_section_dates.clear();
+                i += 1;
+                continue
+            if stripped == '----------':
+                in_task_section = False;
+                current_section_date = None;
+                i += 1;
+                continue
+            if not in_task_section: i += 1; continue
+            header_match = re.match(r'^#+\s*\[\[\s*(\d{4}-\d{2}-\d{2})\s*\]\]', stripped)
+            if header_match:
+                date_str = header_match.group(1)
+                if date_str in seen_section_dates:
+                    Logger.info(f"   🔍 发现重复标题 {date_str}，将触发重组...");
+                    mod = True
+                else:
+                    seen_section_dates.add(date_str)
+                current_section_date = date_str;
+                i += 1;
+                continue
+            if stripped.startswith('#'): current_section_date = None; i += 1; continue
+            if not re.match(r'^\s*-\s*\[.\]', line): i += 1; continue
+            task_date = None
+            if current_section_date:
+                task_date = current_section_date
+            else:
+                date_match = re.search(r'[📅✅]\s*(\d{4}-\d{2}-\d{2})', line)
+                if date_match:
+                    task_date = date_match.group(1)
+                else:
+                    link_match = re.search(r'\[\[(\d{4}-\d{2}-\d{2})(?:#|\||\]\])', line)
+                    if link_match: task_date = link_match.group(1)
+            is_in_inbox_area = (current_section_date is None)
+            if is_in_inbox_area and not task_date: i += 1; continue
+            if not task_date: task_date = today_str; mod = True
+
+            # [MODIFIED] Use visual depth
+            indent = get_indent_depth(line)
+
+            status_match = re.search(r'-\s*\[(.)\]', line)
+            st = status_match.group(1) if status_match else ' '
+            id_m = re.search(r'\^([a-zA-Z0-9]{6,7})\s*$', line)
+            bid = id_m.group(1) if id_m else None
+            if not bid:
+                raw_block, _ = capture_block(lines, i)
+                temp_clean = clean_task_text(line, None, fname)
+                temp_clean = re.sub(r'\s+\^?[a-zA-Z0-9]*$', '', temp_clean).strip()
+                combined_body = normalize_block_content(raw_block[1:])
+                temp_combined_text = temp_clean + "|||" + combined_body
+                recovery_hash = sm.calc_hash(st, temp_combined_text)
+                found_id = sm.find_id_by_hash(path, recovery_hash)
+                if found_id:
+                    Logger.info(f"   🚑 [RESCUE] 指纹匹配成功! '{temp_clean[:10]}...' -> 复活 ID: {found_id}")
+                    bid = found_id;
+                    mod = True
+                else:
+                    bid = generate_block_id().replace('^', '');
+                    mod = True
+            clean_txt = clean_task_text(line, bid, context_name=fname)
+            dates_pattern = r'([📅✅]\s*\d{4}-\d{2}-\d{2}|\[\[\d{4}-\d{2}-\d{2}(?:#\^[a-zA-Z0-9]+)?(?:\|[📅⮐])?\]\])'
+            dates = " ".join(re.findall(dates_pattern, line))
+            if current_section_date and current_section_date not in dates: dates = f"[[{task_date}]]"; mod = True
+            if task_date not in line and not dates: dates = f"[[{task_date}]]"; mod = True
+            new_line = format_line(indent, st, clean_txt, dates, fname, bid, False)
+            if new_line.strip() != line.strip(): lines[i] = new_line; mod = True
+
+            # [TIME GATE]
+            if task_date < Config.SYNC_START_DATE:
+                _, consumed = capture_block(lines, i)
                 i += consumed
-            if mod:
-                lines = inject_into_task_section(lines, [])
-                # [CHECK] 比对磁盘文件，防止死循环
-                orig = FileUtils.read_file(path)
-                new_c = "".join(lines)
-                old_c = "".join(orig) if orig else ""
-                if new_c != old_c:
-                    Logger.info(f"   💾 [WRITE] 自动格式化源文件 (Scan): {os.path.basename(path)}")
-                    FileUtils.write_file(path, lines)
+                continue
+
+            block, consumed = capture_block(lines, i)
+            combined_text = clean_txt + "|||" + normalize_block_content(block[1:])
+            content_hash = sm.calc_hash(st, combined_text)
+            if task_date not in source_data_by_date: source_data_by_date[task_date] = {}
+            source_data_by_date[task_date][bid] = {
+                'proj': curr_proj, 'bid': bid, 'pure': clean_txt, 'status': st,
+                'path': path, 'fname': fname, 'hash': content_hash, 'indent': indent,
+                'dates': dates, 'is_quoted': False, 'line': base_line + i, 'end': base_line + i + consumed
+            }
+            file_entries.append((task_date, bid, source_data_by_date[task_date][bid]))
+            i += consumed
+        if blocks is not None: blocks.record_file(path, file_entries)
+        if not mod:
+            ParseCache.store_tasks(path, curr_proj, file_entries)
+        else:
+            if head: lines = FileUtils.decode_lines(head) + lines
+            if documents is not None: documents[path] = lines
+            lines = inject_into_task_section(lines, [])
+            # [CHECK] 与读取时登记的内容指纹比对，防止死循环 (无需二次读盘)
+            if not FileUtils.content_matches(path, lines):
+                Logger.info(f"   💾 [WRITE] 自动格式化源文件 (Scan): {os.path.basename(path)}")
+                FileUtils.write_file(path, lines, stage="ingestion")
+                if blocks is not None: blocks.reindex(path, lines, canonical=True)
     for delta in range(3):
         target_d = datetime.date.today() - datetime.timedelta(days=delta)
         target_s = target_d.strftime('%Y-%m-%d')
@@ -1,4 +1,5 @@
 import re
+import bisect
 import random
 import string
 import datetime
@@ -70,12 +71,14 @@ def _calculate_sort_key(block_data):
 
     return (has_time, time_val, block_id)
 
-def inject_into_task_section(file_lines, block_lines, filename_stem=None):
-    """
-    [v14.5 Indent-Aware Injection]
-    修复 inject 逻辑误将缩进的子任务 (- [ ]) 识别为新 Block 导致的截断问题。
-    现在只有【顶层任务】(缩进 < 2 空格) 才会触发分块。
-    """
+_HEADER_RE = re.compile(r'^#+\s*\[\[\s*(\d{4}-\d{2}-\d{2})\s*\]\]')
+_BLOCK_ID_RE = re.compile(r'\^([a-zA-Z0-9]{6,})\s*$')
+_LINK_DATE_RE = re.compile(r'\[\[(\d{4}-\d{2}-\d{2})(?:#|\||\]\])')
+UNDATED = "0000-00-00"
+
+
+def _locate_task_section(file_lines):
+    """定位 (必要时补建) "# Tasks" ... "----------" 区：返回 (file_lines, start_idx, end_idx)"""
     # --- 1. 定位锚点 ---
     start_idx = -1
     end_idx = -1
@@ -109,120 +112,245 @@ def inject_into_task_section(file_lines, block_lines, filename_stem=None):
         file_lines[insert_pos:insert_pos] = scaffold
         start_idx = insert_pos + 1
         end_idx = insert_pos + 3
+    return file_lines, start_idx, end_idx
 
-    # --- 3. 提取现有内容 ---
-    existing_content = file_lines[start_idx + 1: end_idx]
-    existing_structure_map = {}
-    current_header_date = None
-    header_pattern = re.compile(r'^#+\s*\[\[\s*(\d{4}-\d{2}-\d{2})\s*\]\]')
-    id_pattern = re.compile(r'\^([a-zA-Z0-9]{6,})\s*$')
 
-    for line in existing_content:
-        stripped = line.strip()
-        h_m = header_pattern.match(stripped)
-        if h_m: current_header_date = h_m.group(1); continue
-        if stripped.startswith('- ['):
-            bid_m = id_pattern.search(stripped)
-            if bid_m and current_header_date:
-                existing_structure_map[bid_m.group(1)] = current_header_date
+def _is_block_head(line):
+    """顶层任务 (缩进 < 2，Tab 计 1 个字符) 才开启新块，缩进的子任务 (\t\t- [ ]) 归属当前块"""
+    return line.strip().startswith('- [') and len(line) - len(line.lstrip()) < 2
 
-    # --- 4. 合并与分组 ---
-    candidates = existing_content + block_lines
+
+def _split_task_blocks(lines):
+    """
+    [v14.5 Indent-Aware Injection] 分块规则：
+    空行与分隔线丢弃；标题行结束当前块；顶层任务行开启新块；
+    缩进的子任务与纯文本归属当前块 (没有当前块的孤儿子任务暂且自成一块，纯文本丢弃)。
+    """
     blocks = []
     current_block = []
-    date_pattern = re.compile(r'\[\[(\d{4}-\d{2}-\d{2})(?:#|\||\]\])')
-
-    def flush_block(blk_lines):
-        if not blk_lines: return
-        head = blk_lines[0]
-        bid_m = id_pattern.search(head)
-        if bid_m:
-            bid = bid_m.group(1)
-            final_date = "0000-00-00"
-            if bid in existing_structure_map:
-                final_date = existing_structure_map[bid]
+    for line in lines:
+        s_line = line.strip()
+        if not s_line or s_line == '-----' or s_line == '----------': continue
+        if s_line.startswith('#'):
+            if current_block: blocks.append(current_block)
+            current_block = []
+        elif s_line.startswith('- ['):
+            if _is_block_head(line):
+                if current_block: blocks.append(current_block)
+                current_block = [line]
+            elif current_block:
+                current_block.append(line)
             else:
-                date_m = date_pattern.search(head)
-                if date_m: final_date = date_m.group(1)
-            blocks.append({'id': bid, 'date': final_date, 'lines': blk_lines})
+                current_block = [line]
+        elif current_block:
+            current_block.append(line)
+    if current_block: blocks.append(current_block)
+    return blocks
 
-    for line in candidates:
-        s_line = line.strip()
-        if not s_line: continue
-        if s_line == '-----': continue
-        if s_line == '----------': continue
 
-        # 处理标题行：强制分块
-        if s_line.startswith('#'):
-            flush_block(current_block);
-            current_block = [];
-            continue
+def _task_line_ids(lines):
+    ids = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('- ['):
+            bid_m = _BLOCK_ID_RE.search(stripped)
+            if bid_m: ids.append(bid_m.group(1))
+    return ids
 
-        # 处理任务行：增加缩进检测
-        if s_line.startswith('- ['):
-            # [关键修复] 计算原始缩进深度
-            # 不使用 .strip() 后的 s_line，而是使用原始 line
-            # 只有缩进非常浅 (小于2个空格或半个Tab) 的才视为新 Block
-            # 这样可以保护缩进的子任务 (		- [ ]) 不被拆分
 
-            # 简单计算前导空白长度 (Tab算1个字符，但在startswith逻辑下足够区分顶层)
-            raw_indent_len = len(line) - len(line.lstrip())
+class TaskSection:
+    """
+    [Task Section] Tasks 区的结构化表示：日期分组 (输出时降序) -> 按 _calculate_sort_key 有序的块。
 
-            # 如果是顶层任务 (Indent 0 or 1 space/tab usually 0)
-            # 使用更宽松的阈值：比如 < 2。
-            # 注意：如果您的顶层任务也有缩进，这里需要调整。通常顶层任务是贴边的。
-            is_toplevel = (raw_indent_len < 2)
+    - parse() 的分块 / 归组 / 去重规则即 inject_into_task_section 的规则，render() 输出相同内容；
+    - insert / remove 在已解析的结构上增量维护 (bisect 定位，不重排整个分组)，
+      engine 在同一周期内按文件缓存结构，连续注册 / 更新同一源文件时无需反复全量解析。
+    已有块的归属日期取其所在的日期标题 (existing_structure_map)，新块取行内的 [[日期]]，都没有则归入无日期分组。
+    """
 
-            if is_toplevel:
-                flush_block(current_block)
-                current_block = [line]
-            else:
-                # 是子任务，加入当前块
-                if current_block:
-                    current_block.append(line)
-                # 如果没有 current_block (即孤儿缩进任务)，暂且作为新块（虽然不合规范）
-                else:
-                    current_block = [line]
+    def __init__(self, head, tail):
+        self.head = head      # "# Tasks" 及之前的行
+        self.tail = tail      # "----------" 及之后的行
+        self.dates = []       # 升序
+        self.groups = {}      # date -> ([sort key], [block])
+        self.by_id = {}       # bid -> block {'id', 'date', 'key', 'lines'}
+        self.dated = {}       # 任务行 bid -> 所在日期标题
+        self._refs = None     # 任务行 bid -> 所在块数 (None: dated 仍是解析输入时的映射)
+        self._exact = True    # 渲染结果再次解析得到同一结构
+
+    @classmethod
+    def parse(cls, file_lines, block_lines=()):
+        """解析文件 (不修改传入的列表)；block_lines 接在现有内容之后参与分块，等价于 inject_into_task_section"""
+        file_lines, start_idx, end_idx = _locate_task_section(list(file_lines))
+        section = cls(file_lines[:start_idx + 1], file_lines[end_idx:])
+
+        # --- 3. 提取现有内容 ---
+        existing_content = file_lines[start_idx + 1: end_idx]
+        current_header_date = None
+        for line in existing_content:
+            stripped = line.strip()
+            h_m = _HEADER_RE.match(stripped)
+            if h_m: current_header_date = h_m.group(1); continue
+            if stripped.startswith('- ['):
+                bid_m = _BLOCK_ID_RE.search(stripped)
+                if bid_m and current_header_date:
+                    section.dated[bid_m.group(1)] = current_header_date
+
+        # --- 4. 合并与分组 (同一 ID 后出现的为准) ---
+        unique_map = {}
+        for blk in _split_task_blocks(existing_content + list(block_lines)):
+            block = section._make_block(blk)
+            if block: unique_map[block['id']] = block
+
+        # --- 5. 组内按绝对排序规则一次性排好 ---
+        date_groups = {}
+        for block in unique_map.values():
+            date_groups.setdefault(block['date'], []).append(block)
+        for d, group_blocks in date_groups.items():
+            group_blocks.sort(key=lambda b: b['key'])
+            section.groups[d] = ([b['key'] for b in group_blocks], group_blocks)
+            for b in group_blocks:
+                if not _is_block_head(b['lines'][0]): section._exact = False
+        section.dates = sorted(date_groups)
+        section.by_id = unique_map
+        return section
+
+    def _make_block(self, blk_lines):
+        head = blk_lines[0]
+        bid_m = _BLOCK_ID_RE.search(head)
+        if not bid_m: return None
+        bid = bid_m.group(1)
+        if bid in self.dated:
+            final_date = self.dated[bid]
         else:
-            # 纯文本或其他内容，归属当前块
-            if current_block: current_block.append(line)
-
-    flush_block(current_block)
-
-    # --- 5. 分组与排序 ---
-    unique_map = {}
-    for b in blocks: unique_map[b['id']] = b
-    date_groups = {}
-    for b in unique_map.values():
-        d = b['date']
-        if d not in date_groups: date_groups[d] = []
-        date_groups[d].append(b)
-
-    # [SORTING] 执行绝对排序
-    for date_key, group_blocks in date_groups.items():
-        group_blocks.sort(key=_calculate_sort_key)
-
-    # --- 6. 构建输出 ---
-    output_lines = []
-    sorted_dates = sorted(date_groups.keys(), reverse=True)
-    for d in sorted_dates:
-        group_blocks = date_groups[d]
-        if d and d != "0000-00-00":
-            if output_lines: output_lines.append("\n")
-            output_lines.append(f"## [[{d}]]\n")
-            output_lines.append("\n")
-        elif output_lines:
-            output_lines.append("\n")
-        for b in group_blocks:
-            output_lines.extend(b['lines'])
-            if output_lines and not output_lines[-1].endswith('\n'):
-                output_lines[-1] += '\n'
-
-    section_body = ["\n"] + output_lines + ["\n"]
-
-    # --- [FIX] 移除内部判断，总是应用变更到 list ---
-    file_lines[start_idx + 1: end_idx] = section_body
-    return file_lines
+            date_m = _LINK_DATE_RE.search(head)
+            final_date = date_m.group(1) if date_m else UNDATED
+        lines = list(blk_lines)
+        if not lines[-1].endswith('\n'): lines[-1] += '\n'
+        block = {'id': bid, 'date': final_date, 'lines': lines}
+        block['key'] = _calculate_sort_key(block)
+        return block
+
+    def _sync_dated(self):
+        """渲染后的映射：日期分组内每个任务行 bid -> 该日期"""
+        self.dated, self._refs = {}, {}
+        for d in self.dates:
+            if d == UNDATED: continue
+            for block in self.groups[d][1]:
+                self._link(block)
+
+    def _link(self, block):
+        if block['date'] == UNDATED: return
+        for tid in _task_line_ids(block['lines']):
+            if tid in self._refs: self._exact = False
+            self._refs[tid] = self._refs.get(tid, 0) + 1
+            self.dated[tid] = block['date']
+
+    def _unlink(self, block):
+        if block['date'] == UNDATED: return
+        for tid in _task_line_ids(block['lines']):
+            n = self._refs.get(tid, 0) - 1
+            if n > 0:
+                self._refs[tid] = n
+            else:
+                self._refs.pop(tid, None)
+                self.dated.pop(tid, None)
+
+    def _place(self, block):
+        d = block['date']
+        group = self.groups.get(d)
+        if group is None:
+            group = self.groups[d] = ([], [])
+            bisect.insort(self.dates, d)
+        keys, blocks = group
+        pos = bisect.bisect_left(keys, block['key'])
+        keys.insert(pos, block['key'])
+        blocks.insert(pos, block)
+        self.by_id[block['id']] = block
+        if not _is_block_head(block['lines'][0]): self._exact = False
+        if self._refs is not None: self._link(block)
+
+    def _unplace(self, bid):
+        block = self.by_id.pop(bid)
+        keys, blocks = self.groups[block['date']]
+        pos = bisect.bisect_left(keys, block['key'])
+        del keys[pos], blocks[pos]
+        if not keys:
+            del self.groups[block['date']]
+            self.dates.remove(block['date'])
+        if self._refs is not None: self._unlink(block)
+        return block
+
+    @staticmethod
+    def split(block_lines):
+        """
+        把新内容切成块；开头若是不开启新块的行 (会并入现有内容的最后一块) 返回 None，
+        此时只能回退到 TaskSection.parse(file_lines, block_lines)。
+        """
+        for line in block_lines:
+            s_line = line.strip()
+            if not s_line or s_line == '-----' or s_line == '----------': continue
+            if not (s_line.startswith('#') or _is_block_head(line)): return None
+            break
+        return _split_task_blocks(block_lines)
+
+    def replaceable(self, bid, block_lines):
+        """bid 是现有块，且 block_lines 恰好构成一个以 bid 为首的块 (原位替换与整体重建结果一致)"""
+        if bid not in self.by_id: return False
+        split = self.split(block_lines)
+        if not split or len(split) != 1: return False
+        bid_m = _BLOCK_ID_RE.search(split[0][0])
+        return bool(bid_m) and bid_m.group(1) == bid
+
+    def insert(self, block_lines):
+        """追加新块 (同一 ID 的现有块被替换)；无法增量处理时返回 False，结构保持不变"""
+        split = self.split(block_lines)
+        if split is None: return False
+        # 归属日期按插入前的内容判定
+        new_blocks = [b for b in (self._make_block(blk) for blk in split) if b]
+        for block in new_blocks:
+            if block['id'] in self.by_id: self._unplace(block['id'])
+            self._place(block)
+        if self._refs is None: self._sync_dated()
+        return True
+
+    def remove(self, bid):
+        if bid not in self.by_id: return False
+        self._unplace(bid)
+        if self._refs is None: self._sync_dated()
+        return True
+
+    def stable(self):
+        """
+        以渲染结果为当前内容时，再次解析仍得到同一结构 (可跨调用复用)：
+        无孤儿块 / 重复任务 ID，无日期块不与日期分组混排。
+        """
+        if self._refs is None: self._sync_dated()
+        return self._exact and not (UNDATED in self.groups and len(self.dates) > 1)
+
+    def render(self):
+        # --- 6. 构建输出 ---
+        output_lines = []
+        for d in reversed(self.dates):
+            if d != UNDATED:
+                if output_lines: output_lines.append("\n")
+                output_lines.append(f"## [[{d}]]\n")
+                output_lines.append("\n")
+            elif output_lines:
+                output_lines.append("\n")
+            for b in self.groups[d][1]:
+                output_lines.extend(b['lines'])
+        return self.head + ["\n"] + output_lines + ["\n"] + self.tail
+
+
+def inject_into_task_section(file_lines, block_lines, filename_stem=None):
+    """
+    [v14.5 Indent-Aware Injection]
+    把 block_lines 并入 Tasks 区并按日期分组 / 绝对排序重建该区 (规则见 TaskSection)。
+    只有【顶层任务】(缩进 < 2 空格) 才会触发分块，缩进的子任务不会被截断。
+    """
+    return TaskSection.parse(file_lines, block_lines).render()
+
 
 def aggressive_daily_clean(lines: list) -> list:
     if not lines: return []
@@ -247,7 +375,7 @@ def aggressive_daily_clean(lines: list) -> list:
         if is_empty:
             empty_count += 1
             if empty_count > 2:
-                Logger.debug(f"[CLEAN] Removing excess daily line {i + 1}: {repr(line)}")
+                Logger.debug("[CLEAN] Removing excess daily line %d: %r", i + 1, line)
                 continue
             else:
                 cleaned_body.append(line)
@@ -353,7 +481,7 @@ def normalize_child_lines(raw_lines, target_parent_indent, source_parent_indent=
 
     return children
 
-def reconstruct_daily_block(sd, target_date):
+def reconstruct_daily_block(sd, target_date, raw_lines):
     fname = sd['fname']
     bid = sd['bid']
     status = sd['status']
@@ -364,7 +492,7 @@ def reconstruct_daily_block(sd, target_date):
     # 传递 sd['indent'] 作为 source_parent_indent
     parent_line = format_line(sd['indent'], status, text, "", fname, bid, True)
     children = normalize_child_lines(
-        sd['raw'][1:],
+        raw_lines[1:],
         target_parent_indent=sd['indent'],
         source_parent_indent=sd['indent'],
         as_quoted=False
@@ -0,0 +1,71 @@
+import re
+import unicodedata
+
+# 回链 [[Proj#^bid|⮐]] 不参与路由 (与 parsing.extract_routing_info 一致)
+RETURN_LINK_RE = re.compile(r'\[\[[^\]]*?\#\^[a-zA-Z0-9]{6,}\|[⚓\*🔗⮐📅]\]\]')
+LINK_RE = re.compile(r'\[\[(.*?)\]\]')
+
+
+class RoutingIndex:
+    """
+    [Routing Index] 链接目标索引：NFC 文件名 (stem) -> 路径、项目名 -> main 文件路径。
+
+    - links(line): 一次扫描取出行内全部 [[链接]] 并逐个查表，结果按行文本缓存
+      (日记中的任务行每个周期都会被重复路由)。
+    - update(): 随项目扫描增量应用新增 / 删除 / 重命名的条目；索引有变化时才清空行缓存。
+    链接以 [[ ]] 定界，一次正则切分 + 哈希查表即可覆盖全部目标，无需逐字符的多模式自动机。
+    """
+    LINE_CACHE_MAX = 20000
+
+    def __init__(self):
+        self.files = {}     # stem -> path
+        self.projects = {}  # project name -> main file path
+        self._lines = {}    # line -> [(raw_text, inner, name, path)]
+
+    @staticmethod
+    def _apply(table, new):
+        changed = 0
+        for key in [k for k in table if k not in new]:
+            del table[key]
+            changed += 1
+        for key, value in new.items():
+            if table.get(key) != value:
+                table[key] = value
+                changed += 1
+        return changed
+
+    def update(self, project_path_map, file_path_map):
+        """与当前索引比较，只应用变化的条目；返回变化条目数"""
+        changed = self._apply(self.files, file_path_map) + self._apply(self.projects, project_path_map)
+        if changed: self._lines.clear()
+        return changed
+
+    def links(self, line):
+        """
+        行内全部链接 (回链除外)，按出现顺序返回 [(raw_text, inner, name, path)]。
+        name 为 NFC 规范化的链接目标 (去掉 |别名 与 #标题)，path 为对应文件路径 (未知文件为 None)。
+        """
+        cached = self._lines.get(line)
+        if cached is not None: return cached
+        result = []
+        if '[[' in line:
+            for m in LINK_RE.finditer(RETURN_LINK_RE.sub('', line)):
+                inner = m.group(1)
+                name = unicodedata.normalize('NFC', inner.split('|')[0].split('#')[0])
+                result.append((m.group(0), inner, name, self.files.get(name)))
+        if len(self._lines) >= self.LINE_CACHE_MAX: self._lines.clear()
+        self._lines[line] = result
+        return result
+
+    def route(self, line):
+        """第一个指向已知文件的链接：(path, raw_text)，没有则 (None, None)"""
+        for raw_text, _, _, path in self.links(line):
+            if path is not None:
+                return path, raw_text
+        return None, None
+
+    def route_target(self, line):
+        return self.route(line)[0]
+
+    def is_project(self, name):
+        return name in self.projects
@@ -1,10 +1,17 @@
 import os
+import io
+import sys
+import atexit
 import datetime
 import time
+import queue
+import hashlib
 import tempfile
-import inspect
+import threading
+from collections import deque
 from typing import List, Union
 from config import Config
+from .metrics import Metrics
 
 # 尝试导入 fcntl (仅限 Unix/macOS)
 try:
@@ -15,101 +22,459 @@ except ImportError:
 
 class Logger:
     _shown_errors = set()
+    # [多仓库] 当前仓库名，非空时附加在调用方前
+    scope = None
+    # [异步] 队列写出线程 (None = 同步 print)
+    _queue = None
+    _writer = None
 
     @staticmethod
     def _get_caller_info():
-        # Stack: 0=here, 1=caller(info/debug), 2=actual caller
+        # [性能] 使用 sys._getframe 逐帧回溯，避免 inspect.stack() 为每一帧读取源码上下文
         try:
-            stack = inspect.stack()
-            # Find the first frame outside of utils.py/Logger
-            for frame in stack[1:]:
-                fn = os.path.basename(frame.filename)
+            frame = sys._getframe(1)
+            # 跳过 utils.py/Logger 内部的帧，找到真正的调用方
+            while frame is not None:
+                code = frame.f_code
+                fn = os.path.basename(code.co_filename)
                 if fn != 'utils.py':
-                    func = frame.function
+                    func = code.co_name
                     if func == '<module>': func = 'Main'
+                    if Logger.scope: return f"[{Logger.scope}] [{fn}:{func}]"
                     return f"[{fn}:{func}]"
+                frame = frame.f_back
             return "[Unknown:Unknown]"
         except Exception:
             return "[Unknown:Unknown]"
 
     @staticmethod
-    def error_once(key, message):
+    def _render(message, args):
+        """[惰性格式化] message 可为可调用对象或 %-模板，仅在确定输出时才求值"""
+        if callable(message): message = message()
+        if args:
+            try:
+                return message % args
+            except (TypeError, ValueError):
+                return f"{message} {args}"
+        return message
+
+    @classmethod
+    def _emit(cls, text):
+        q = cls._queue
+        if q is not None:
+            q.put(text)
+        else:
+            print(text)
+
+    @classmethod
+    def start_async_writer(cls):
+        """
+        [异步写出] 启动后台写出线程，日志只入队，不再阻塞同步路径。
+        进程退出时 (atexit) 自动排空队列。
+        """
+        if cls._writer is not None: return
+        cls._queue = queue.SimpleQueue()
+        cls._writer = threading.Thread(target=cls._drain, args=(cls._queue,), name="LoggerWriter", daemon=True)
+        cls._writer.start()
+        atexit.register(cls.stop_async_writer)
+
+    @classmethod
+    def stop_async_writer(cls, timeout=2.0):
+        q, writer = cls._queue, cls._writer
+        if writer is None: return
+        cls._queue = None
+        cls._writer = None
+        q.put(None)
+        writer.join(timeout)
+        try:
+            sys.stdout.flush()
+        except Exception:
+            pass
+
+    @classmethod
+    def use_sync_output(cls):
+        """fork 出的子进程中没有写出线程：丢弃继承来的队列，改回同步 print"""
+        cls._queue = None
+        cls._writer = None
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            text = q.get()
+            if text is None: break
+            try:
+                print(text)
+            except Exception:
+                pass
+
+    @staticmethod
+    def error_once(key, message, *args):
         if key not in Logger._shown_errors:
-            caller = Logger._get_caller_info()
-            print(f"\033[91m[ERROR] {caller} {message}\033[0m")
             Logger._shown_errors.add(key)
+            caller = Logger._get_caller_info()
+            Logger._emit(f"\033[91m[ERROR] {caller} {Logger._render(message, args)}\033[0m")
 
     @staticmethod
-    def info(message, date_tag=None):
+    def info(message, *args, date_tag=None):
         # [特性] 聚焦日志：仅显示今天的日志（当前文件）
-        t = datetime.datetime.now().strftime('%H:%M:%S')
-        today_str = datetime.date.today().strftime('%Y-%m-%d')
-        
-        if date_tag and date_tag != today_str:
+        # [性能] 先做日期过滤，再取时间戳、调用方并格式化 (message 同 debug：%-模板 + args)
+        if date_tag and date_tag != datetime.date.today().strftime('%Y-%m-%d'):
             return # 跳过历史日志以减少干扰
-            
+
+        t = datetime.datetime.now().strftime('%H:%M:%S')
         prefix = f"[{date_tag}] " if date_tag else ""
         caller = Logger._get_caller_info()
-        print(f"\033[92m[{t} INFO] {caller} {prefix}{message}\033[0m")
+        Logger._emit(f"\033[92m[{t} INFO] {caller} {prefix}{Logger._render(message, args)}\033[0m")
 
     @staticmethod
-    def debug(message):
+    def debug(message, *args):
         if Config.DEBUG_MODE:
             caller = Logger._get_caller_info()
-            print(f"\033[90m[DEBUG] {caller} {message}\033[0m")
+            Logger._emit(f"\033[90m[DEBUG] {caller} {Logger._render(message, args)}\033[0m")
 
     @staticmethod
     def debug_block(title, lines):
         if Config.DEBUG_MODE:
             caller = Logger._get_caller_info()
-            print(f"\033[96m--- [DEBUG] {caller} {title} ---\033[0m")
-            for line in lines:
-                print(f"  | {line.rstrip()}")
-            print(f"\033[96m-----------------------\033[0m")
+            # 整块一次性入队，保证异步模式下不被其他日志穿插
+            out = [f"\033[96m--- [DEBUG] {caller} {title} ---\033[0m"]
+            out.extend(f"  | {line.rstrip()}" for line in lines)
+            out.append(f"\033[96m-----------------------\033[0m")
+            Logger._emit("\n".join(out))
 
 
 class FileUtils:
+    # [Group Commit] batched 模式下本周期已暂存、尚未落盘的写入: abs_path -> entry
+    # 读取 / exists / mtime 会优先看这里，保证同一周期内的后续步骤读到最新内容
+    _staged = {}
+    _atexit_registered = False
+    # [No-op 判定] 读取时登记的内容指纹: abs_path -> (mtime_ns, size, md5)，以 mtime+size 校验有效性
+    _content_cache = {}
+    # [Stat Cache] 周期内的 stat 结果: abs_path -> os.DirEntry (遍历所得，mtime 按需取) / os.stat_result / None (不存在)
+    # 仅在 begin_stat_cache() 与 end_stat_cache() 之间 (即一个周期内) 生效；自身写入后刷新
+    _stat_cache = None
+    # [Plan] 演练覆盖层：非 None 时写入只进入内存 (经 _staged 对后续读取可见)，并以 (path, stage, 字节数) 回调
+    _overlay = None
+    # [Record] 读取回调：accept_raw 登记内容指纹前调用，此时 read_signature 仍是上一次已知的签名
+    _read_observer = None
+
+    @staticmethod
+    def begin_overlay(on_write):
+        """开始演练：此后的写入不落盘。开始前先提交已有的暂存写入"""
+        FileUtils.commit_staged()
+        FileUtils._overlay = on_write
+
+    @staticmethod
+    def end_overlay():
+        """结束演练：丢弃覆盖层中的全部内容"""
+        FileUtils._overlay = None
+        FileUtils._staged = {}
+
+    @staticmethod
+    def in_overlay():
+        return FileUtils._overlay is not None
+
+    @staticmethod
+    def observe_reads(callback):
+        """[Record] 登记读取回调 callback(filepath, st, raw)，在登记内容指纹之前调用；None 取消"""
+        FileUtils._read_observer = callback
+
+    @staticmethod
+    def begin_stat_cache():
+        FileUtils._stat_cache = {}
+
+    @staticmethod
+    def end_stat_cache():
+        FileUtils._stat_cache = None
+
+    @staticmethod
+    def invalidate_stat(filepath):
+        """外部可能已修改 (如冷却等待之后)：丢弃缓存，下次重新 stat"""
+        if FileUtils._stat_cache is not None:
+            FileUtils._stat_cache.pop(os.path.abspath(filepath), None)
+
+    @staticmethod
+    def _cache_stat(filepath, st):
+        if FileUtils._stat_cache is not None:
+            FileUtils._stat_cache[os.path.abspath(filepath)] = st
+
+    @staticmethod
+    def stat(filepath):
+        """带周期缓存的 os.stat()，不存在返回 None"""
+        cache = FileUtils._stat_cache
+        key = None
+        if cache is not None:
+            key = os.path.abspath(filepath)
+            if key in cache:
+                entry = cache[key]
+                if entry is None or isinstance(entry, os.stat_result):
+                    Metrics.count('stat_cache_hits')
+                    return entry
+                # DirEntry: 存在性在遍历时已知，首次需要 mtime 时才真正 stat
+                Metrics.count('stats')
+                try:
+                    st = entry.stat()
+                except OSError:
+                    st = None
+                cache[key] = st
+                return st
+        Metrics.count('stats')
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            st = None
+        if cache is not None: cache[key] = st
+        return st
+
+    @staticmethod
+    def walk(top):
+        """
+        [Stat Cache] 基于 scandir 的 os.walk (自顶向下、顺序一致、可原地修改 dirs 剪枝、不跟随目录软链)。
+        周期内遍历时把文件的 DirEntry 登记进 stat 缓存，后续 exists() 无需再 stat。
+        """
+        stack = [top]
+        while stack:
+            root = stack.pop()
+            try:
+                it = os.scandir(root)
+            except OSError:
+                continue
+            dirs, files, links = [], [], set()
+            cache = FileUtils._stat_cache
+            with it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirs.append(entry.name)
+                        if entry.is_symlink(): links.add(entry.name)
+                    else:
+                        files.append(entry.name)
+                        if cache is not None and entry.is_file():
+                            cache[os.path.abspath(entry.path)] = entry
+            yield root, dirs, files
+            for d in reversed(dirs):
+                if d not in links: stack.append(os.path.join(root, d))
+
+    @staticmethod
+    def list_dir(dirpath):
+        """os.listdir 的 scandir 版本，同时把文件登记进周期 stat 缓存"""
+        for _, _, files in FileUtils.walk(dirpath):
+            return files
+        return []
+
+    @staticmethod
+    def _split_lines(text):
+        # 与文本模式 readlines() 一致：通用换行转换后仅按 \n 切分 (str.splitlines 还会切 \x0c 等字符)
+        return io.StringIO(text.replace('\r\n', '\n').replace('\r', '\n')).readlines()
+
+    @staticmethod
+    def _get_staged(filepath):
+        if not FileUtils._staged: return None
+        return FileUtils._staged.get(os.path.abspath(filepath))
+
+    @staticmethod
+    def fetch_raw(filepath):
+        """
+        [Prefetch] _read_raw 的纯读取部分，不触碰任何共享状态，可在 I/O 线程中调用：
+        返回 (原始字节 (换行已规范化), stat, md5)，须交给 accept_raw() 在主线程登记。
+        """
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+            st = os.fstat(f.fileno())
+        if b'\r' in raw:
+            raw = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return raw, st, hashlib.md5(raw).hexdigest()
+
+    @staticmethod
+    def accept_raw(filepath, fetched):
+        """登记 fetch_raw() 的结果 (stat 缓存 / 读取计数 / 内容指纹)，返回原始字节"""
+        raw, st, digest = fetched
+        FileUtils._cache_stat(filepath, st)
+        Metrics.count('files_read')
+        Metrics.count('bytes_in', st.st_size)
+        if FileUtils._read_observer is not None: FileUtils._read_observer(filepath, st, raw)
+        FileUtils.remember(filepath, st, digest)
+        return raw
+
+    @staticmethod
+    def _read_raw(filepath):
+        """读取原始字节 (通用换行已转换为 \\n)，同时登记内容指纹供 write_file 判定空写"""
+        return FileUtils.accept_raw(filepath, FileUtils.fetch_raw(filepath))
+
+    @staticmethod
+    def is_staged(filepath):
+        """有未提交的暂存写入 (读取应以暂存内容为准)"""
+        return FileUtils._get_staged(filepath) is not None
+
+    @staticmethod
+    def _read_text(filepath):
+        """读取并解码 (通用换行，与文本模式一致)"""
+        return FileUtils._read_raw(filepath).decode('utf-8')
+
+    @staticmethod
+    def read_bytes(filepath):
+        """
+        [Prefilter] 读取未解码的字节 (换行已规范化)，供调用方先做标记检查再决定是否解码。
+        解码请用 decode_lines()，与 read_file() 的结果一致。
+        """
+        staged = FileUtils._get_staged(filepath)
+        if staged is not None: return staged['text'].encode('utf-8').replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        try:
+            return FileUtils._read_raw(filepath)
+        except Exception:
+            return None
+
+    @staticmethod
+    def decode_lines(data):
+        """把 read_bytes() 的结果 (或其切片/memoryview) 解码为 readlines() 风格的行列表"""
+        return io.StringIO(str(data, 'utf-8')).readlines()
+
+    @staticmethod
+    def remember(filepath, st, digest):
+        """登记 (stat, 内容指纹)：st 为 os.stat_result"""
+        FileUtils._content_cache[os.path.abspath(filepath)] = (st.st_mtime_ns, st.st_size, digest)
+
+    @staticmethod
+    def signature(filepath):
+        """当前磁盘 (mtime_ns, size)，走周期 stat 缓存；不存在或有未提交的暂存写入时返回 None"""
+        if FileUtils._get_staged(filepath) is not None: return None
+        st = FileUtils.stat(filepath)
+        return (st.st_mtime_ns, st.st_size) if st is not None else None
+
+    @staticmethod
+    def read_signature(filepath):
+        """最近一次读取/写入时登记的 (mtime_ns, size)，供解析缓存校验；未知返回 None"""
+        if FileUtils._get_staged(filepath) is not None: return None
+        cached = FileUtils._content_cache.get(os.path.abspath(filepath))
+        return cached[:2] if cached else None
+
+    @staticmethod
+    def under_root(path, root):
+        """path 位于目录 root 之内"""
+        path, root = os.path.normpath(path), os.path.normpath(root)
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    @staticmethod
+    def export_content_cache(root=None):
+        """root 非空时只导出该目录下的条目 (多仓库共享进程时，每个仓库的快照只带自己的文件)"""
+        if root is None: return dict(FileUtils._content_cache)
+        return {p: v for p, v in FileUtils._content_cache.items() if FileUtils.under_root(p, root)}
+
+    @staticmethod
+    def load_content_cache(data):
+        # 条目自带 mtime+size，使用时校验，过期条目无害
+        FileUtils._content_cache.update(data or {})
+
     @staticmethod
     def read_file(filepath):
+        staged = FileUtils._get_staged(filepath)
+        if staged is not None: return FileUtils._split_lines(staged['text'])
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.readlines()
+            return io.StringIO(FileUtils._read_text(filepath)).readlines()
         except Exception:
             return None
 
     @staticmethod
     def read_content(filepath):
+        staged = FileUtils._get_staged(filepath)
+        if staged is not None: return staged['text'].replace('\r\n', '\n').replace('\r', '\n')
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
+            return FileUtils._read_text(filepath)
         except Exception:
             return None
 
     @staticmethod
-    def write_file(filepath, lines_or_content):
+    def _to_text(lines_or_content):
+        if lines_or_content is None:
+            return ""
+        if isinstance(lines_or_content, list):
+            return "".join([str(l) for l in lines_or_content if l is not None])
+        return str(lines_or_content)
+
+    @staticmethod
+    def _known_digest(filepath):
+        """磁盘当前内容的指纹 (仅当读取后文件未变)；未知返回 None"""
+        key = os.path.abspath(filepath)
+        staged = FileUtils._staged.get(key) if FileUtils._staged else None
+        if staged is not None: return staged['digest']
+        cached = FileUtils._content_cache.get(key)
+        if cached is None: return None
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        Metrics.count('stats')
+        if (st.st_mtime_ns, st.st_size) != cached[:2]: return None
+        return cached[2]
+
+    @staticmethod
+    def known_digest(filepath):
+        """当前内容的 md5 (已知且文件未变时)，否则 None"""
+        return FileUtils._known_digest(filepath)
+
+    @staticmethod
+    def content_matches(filepath, lines_or_content):
+        """新内容是否与磁盘上 (最近一次读取/写入时) 的内容一致，无需再次读取文件"""
+        data = FileUtils._to_text(lines_or_content).encode('utf-8')
+        known = FileUtils._known_digest(filepath)
+        return known is not None and known == hashlib.md5(data).hexdigest()
+
+    @staticmethod
+    def write_file(filepath, lines_or_content, stage=None):
         # [原子性] 使用 tempfile + os.replace 以确保原子写入
+        # stage: 触发写入的阶段 (ingestion / dispatch / format ...)，供 WriteGuard 定位写入循环
+        # [持久化] Config.WRITE_DURABILITY:
+        #   strict  - 每次写入 fsync 后再替换 (默认)
+        #   batched - 仅写临时文件，周期末由 commit_staged() 统一 fsync -> 替换 -> 目录 fsync
+        #   relaxed - 不 fsync (tmpfs / CI)
         dir_name = os.path.dirname(filepath) or '.'
         temp_name = None
+        mode = Config.WRITE_DURABILITY
         
         try:
+            text = FileUtils._to_text(lines_or_content)
+            data = text.encode('utf-8')
+            digest = hashlib.md5(data).hexdigest()
+
+            # [No-op] 内容与磁盘一致则跳过 (指纹在读取时登记，mtime+size 校验)
+            if FileUtils._known_digest(filepath) == digest:
+                Metrics.count('writes_skipped')
+                return True
+
+            if not WriteGuard.allow(filepath, digest, stage):
+                return False
+
+            if FileUtils._overlay is not None:
+                FileUtils._overlay_write(filepath, text, digest, stage, len(data))
+                return True
+
             # 在同一目录中创建临时文件（原子重命名所需）
             # delete=False 因为我们想要重命名它，而不是在关闭时删除它
-            with tempfile.NamedTemporaryFile('w', dir=dir_name, delete=False, encoding='utf-8') as tf:
+            with tempfile.NamedTemporaryFile('wb', dir=dir_name, delete=False) as tf:
                 temp_name = tf.name
+                tf.write(data)
                 
-                if lines_or_content is None:
-                    tf.write("")
-                elif isinstance(lines_or_content, list):
-                    tf.writelines([str(l) for l in lines_or_content if l is not None])
-                else:
-                    tf.write(str(lines_or_content))
-                
-                # 刷新并 fsync 以确保数据物理写入
-                tf.flush()
-                os.fsync(tf.fileno())
+                if mode not in ('batched', 'relaxed'):
+                    # 刷新并 fsync 以确保数据物理写入
+                    tf.flush()
+                    os.fsync(tf.fileno())
+                    Metrics.count('fsyncs')
+
+            Metrics.count('files_written')
+            Metrics.count('bytes_out', len(data))
+            if stage: Metrics.count(f'writes.{stage}')
+
+            if mode == 'batched':
+                FileUtils._stage(filepath, temp_name, text, digest, stage)
+                return True
             
             # 原子交换
             os.replace(temp_name, filepath)
+            FileUtils._remember_written(filepath, digest)
+            WriteGuard.record(filepath, digest, stage)
             return True
             
         except Exception as e:
@@ -123,11 +488,160 @@ class FileUtils:
             return False
 
     @staticmethod
-    def get_mtime(filepath):
+    def _stage(filepath, temp_name, text, digest, stage):
+        key = os.path.abspath(filepath)
+        prev = FileUtils._staged.get(key)
+        stages = []
+        if prev is not None:
+            # 同一文件本周期内再次写入：旧临时文件作废
+            stages = prev['stages']
+            try:
+                os.remove(prev['temp'])
+            except OSError:
+                pass
+        stages.append(stage)
+        FileUtils._staged[key] = {'path': filepath, 'temp': temp_name, 'text': text, 'digest': digest,
+                                  'stages': stages, 'mtime': time.time()}
+        if not FileUtils._atexit_registered:
+            FileUtils._atexit_registered = True
+            atexit.register(FileUtils.commit_staged)
+
+    @staticmethod
+    def _overlay_write(filepath, text, digest, stage, nbytes):
+        key = os.path.abspath(filepath)
+        prev = FileUtils._staged.get(key)
+        stages = prev['stages'] if prev is not None else []
+        stages.append(stage)
+        FileUtils._staged[key] = {'path': filepath, 'temp': None, 'text': text, 'digest': digest,
+                                  'stages': stages, 'mtime': time.time()}
+        Metrics.count('files_written')
+        Metrics.count('bytes_out', nbytes)
+        if stage: Metrics.count(f'writes.{stage}')
+        FileUtils._overlay(filepath, stage, nbytes)
+
+    @staticmethod
+    def take_staged(discard=False):
+        """
+        [Parallel] 取出本进程的暂存写入 (不提交)：子进程把它交给主进程 adopt_staged() 统一提交。
+        discard=True 时删除临时文件 (放弃写入)。
+        """
+        entries = list(FileUtils._staged.values())
+        FileUtils._staged = {}
+        if discard:
+            for e in entries:
+                try:
+                    os.remove(e['temp'])
+                except OSError:
+                    pass
+            return []
+        return entries
+
+    @staticmethod
+    def adopt_staged(entries):
+        """登记其他进程 take_staged() 交来的暂存写入，由 commit_staged() 提交"""
+        for e in entries:
+            key = os.path.abspath(e['path'])
+            prev = FileUtils._staged.get(key)
+            if prev is not None:
+                e['stages'] = prev['stages'] + e['stages']
+                try:
+                    os.remove(prev['temp'])
+                except OSError:
+                    pass
+            FileUtils._staged[key] = e
+            FileUtils.invalidate_stat(e['path'])
+
+    @staticmethod
+    def commit_staged():
+        """
+        [Group Commit] 提交本周期暂存的所有写入：
+        1. 所有临时文件一起 fsync  2. 依次原子替换  3. 每个涉及的目录 fsync 一次
+        """
+        staged = FileUtils._staged
+        # 演练中：覆盖层内容只留在内存
+        if not staged or FileUtils._overlay is not None: return 0
+        entries = list(staged.items())
+
+        ready = []
+        for key, e in entries:
+            try:
+                fd = os.open(e['temp'], os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                Metrics.count('fsyncs')
+                ready.append((key, e))
+            except OSError as err:
+                staged.pop(key, None)
+                FileUtils._discard_failed(e, err)
+
+        dirs = set()
+        committed = 0
+        for key, e in ready:
+            try:
+                os.replace(e['temp'], e['path'])
+            except OSError as err:
+                FileUtils._discard_failed(e, err)
+                continue
+            finally:
+                staged.pop(key, None)
+            dirs.add(os.path.dirname(e['path']) or '.')
+            committed += 1
+            FileUtils._remember_written(e['path'], e['digest'])
+            for st in e['stages']:
+                WriteGuard.record(e['path'], e['digest'], st)
+
+        for d in dirs:
+            try:
+                fd = os.open(d, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                Metrics.count('dir_fsyncs')
+            except OSError:
+                pass
+        return committed
+
+    @staticmethod
+    def _discard_failed(e, err):
+        """提交失败：磁盘上仍是旧内容，丢弃临时文件与该路径的内容 / stat 缓存，不登记为自身写入"""
+        Logger.error_once(f"commit_{e['path']}", f"写入失败 {e['path']}: {err}")
+        try:
+            os.remove(e['temp'])
+        except OSError:
+            pass
+        FileUtils._content_cache.pop(os.path.abspath(e['path']), None)
+        FileUtils.invalidate_stat(e['path'])
+
+    @staticmethod
+    def _remember_written(filepath, digest):
         try:
-            return os.path.getmtime(filepath)
+            st = os.stat(filepath)
+            FileUtils.remember(filepath, st, digest)
+            FileUtils._cache_stat(filepath, st)
         except OSError:
-            return 0
+            FileUtils._content_cache.pop(os.path.abspath(filepath), None)
+            FileUtils.invalidate_stat(filepath)
+
+    @staticmethod
+    def get_mtime(filepath):
+        staged = FileUtils._get_staged(filepath)
+        if staged is not None: return staged['mtime']
+        st = FileUtils.stat(filepath)
+        return st.st_mtime if st is not None else 0
+
+    @staticmethod
+    def exists(filepath):
+        if FileUtils._get_staged(filepath) is not None: return True
+        cache = FileUtils._stat_cache
+        if cache is not None:
+            entry = cache.get(os.path.abspath(filepath), False)
+            if entry is not False:
+                Metrics.count('stat_cache_hits')
+                return entry is not None
+        return FileUtils.stat(filepath) is not None
 
     @staticmethod
     def is_excluded(path):
@@ -141,33 +655,130 @@ class FileUtils:
         return False
 
 
+class WriteGuard:
+    """
+    [Write-Loop Detector] 写放大/振荡检测。
+
+    为每个由本进程写入的文件按周期记录 (周期号, 时间, 周期末内容指纹, 触发阶段列表)。
+    同一周期内的多次写入合并为一条 (首轮全量同步会合法地多次改写同一文件)。
+    两次写入之间若文件被外部修改 (mtime/size 变化，如用户编辑)，历史清零——只有“自己和自己较劲”才会被计数：
+      - 振荡: 连续三个周期的指纹 A -> B -> A (两个阶段对格式意见不一)
+      - 放大: 窗口期内有写入的周期数超过 WRITE_GUARD_MAX_WRITES
+    命中后该文件进入隔离期，自动改写被拒绝，直到超时或被外部修改。
+    """
+    _tick_id = 0
+    _history = {}     # norm_path -> {'writes': deque[(tick, ts, digest, [stage])], 'sig': (mtime_ns, size)}
+    _quarantine = {}  # norm_path -> {'until': ts, 'reason': str, 'chain': str, 'sig': (mtime_ns, size)}
+
+    @classmethod
+    def next_tick(cls):
+        cls._tick_id += 1
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _disk_sig(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @classmethod
+    def allow(cls, path, digest, stage):
+        if not Config.WRITE_GUARD_ENABLED: return True
+        key = cls._key(path)
+        hist = cls._history.get(key)
+        q = cls._quarantine.get(key)
+        if hist is None and q is None: return True
+
+        sig = cls._disk_sig(path)
+        if hist is not None and hist['sig'] != sig:
+            del cls._history[key]
+
+        if q:
+            if q['sig'] != sig or time.time() >= q['until']:
+                del cls._quarantine[key]
+                Logger.info(f"🔓 [WriteGuard] 解除隔离: {os.path.basename(path)}")
+            else:
+                Metrics.count('writes_blocked')
+                Logger.debug("[WriteGuard] 拒绝写入 (隔离中) %s <- %s", os.path.basename(path), stage)
+                return False
+        return True
+
+    @classmethod
+    def record(cls, path, digest, stage):
+        if not Config.WRITE_GUARD_ENABLED: return
+        now = time.time()
+        key = cls._key(path)
+        entry = cls._history.setdefault(key, {'writes': deque(), 'sig': None})
+        entry['sig'] = cls._disk_sig(path)
+        writes = entry['writes']
+        if writes and writes[-1][0] == cls._tick_id:
+            # 同一周期内的再次写入：只更新周期末指纹
+            _, _, _, stages = writes[-1]
+            stages.append(stage or '?')
+            writes[-1] = (cls._tick_id, now, digest, stages)
+            return
+        writes.append((cls._tick_id, now, digest, [stage or '?']))
+        while writes and now - writes[0][1] > Config.WRITE_GUARD_WINDOW:
+            writes.popleft()
+
+        reason = None
+        if len(writes) >= 3 and writes[-1][2] == writes[-3][2] and writes[-1][2] != writes[-2][2]:
+            reason = "振荡 A→B→A"
+        elif len(writes) > Config.WRITE_GUARD_MAX_WRITES:
+            reason = f"{Config.WRITE_GUARD_WINDOW}s 内 {len(writes)} 个周期都改写了它"
+        if reason:
+            chain = " | ".join("+".join(w[3]) for w in list(writes)[-4:])
+            cls._quarantine[key] = {'until': now + Config.WRITE_GUARD_QUARANTINE_SECONDS,
+                                    'reason': reason, 'chain': chain, 'path': path, 'sig': entry['sig']}
+            del cls._history[key]
+            Metrics.count('files_quarantined')
+            Logger.error_once(f"write_loop_{key}_{int(now)}",
+                              f"🔁 [WriteGuard] 检测到写入循环 ({reason})，暂停自动改写 "
+                              f"{Config.WRITE_GUARD_QUARANTINE_SECONDS}s: {os.path.basename(path)} | 阶段: {chain}")
+
+    @classmethod
+    def quarantined(cls):
+        """当前被隔离的文件 {path: {'until', 'reason', 'chain'}}"""
+        now = time.time()
+        return {q['path']: q for q in cls._quarantine.values() if q['until'] > now}
+
+
 class ProcessLock:
-    _lock_fd = None
+    # 锁文件路径 -> fd (多仓库模式下一个进程同时持有多把锁)，均以调用时的 Config.LOCK_FILE 为准
+    _lock_fds = {}
 
     @classmethod
     def acquire(cls):
         if not fcntl: return True
+        lock_file = Config.LOCK_FILE
+        if lock_file in cls._lock_fds: return True
+        fd = None
         try:
             if not os.path.exists(Config.DAILY_NOTE_DIR): return False
             # 打开文件，准备读写
-            cls._lock_fd = os.open(Config.LOCK_FILE, os.O_CREAT | os.O_RDWR)
+            fd = os.open(lock_file, os.O_CREAT | os.O_RDWR)
             
             # 尝试获取排他锁（非阻塞）
-            fcntl.flock(cls._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
             
             # [新增] 获取锁成功，清空文件并写入当前 PID
-            os.ftruncate(cls._lock_fd, 0)
-            os.write(cls._lock_fd, str(os.getpid()).encode())
-            
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+
+            cls._lock_fds[lock_file] = fd
             return True
         except (BlockingIOError, OSError):
             # 获取失败，关闭文件描述符
-            if cls._lock_fd is not None:
+            if fd is not None:
                 try:
-                    os.close(cls._lock_fd)
+                    os.close(fd)
                 except OSError:
                     pass
-                cls._lock_fd = None
             return False
 
     @staticmethod
@@ -184,13 +795,20 @@ class ProcessLock:
         return None
 
     @classmethod
-    def release(cls):
-        if cls._lock_fd is not None:
-            fcntl.flock(cls._lock_fd, fcntl.LOCK_UN)
-            os.close(cls._lock_fd)
-            cls._lock_fd = None
+    def release(cls, lock_file=None):
+        # 只清理自己持有的锁：热交接后锁文件可能已属于新实例
+        lock_file = lock_file or Config.LOCK_FILE
+        fd = cls._lock_fds.pop(lock_file, None)
+        if fd is None: return
         try:
-            if os.path.exists(Config.LOCK_FILE):
-                os.remove(Config.LOCK_FILE)
+            if os.path.exists(lock_file):
+                os.remove(lock_file)
         except OSError:
             pass
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @classmethod
+    def release_all(cls):
+        for lock_file in list(cls._lock_fds):
+            cls.release(lock_file)